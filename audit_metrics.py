@@ -19,6 +19,7 @@ from datetime import datetime
 
 # Import backtesting modules
 from src.backtester import Backtester
+from src.data_loader import dataset_fingerprint
 from src.metrics import calculate_advanced_metrics, calculate_trade_metrics, calculate_additional_risk_metrics
 
 def audit_metrics():
@@ -47,6 +48,21 @@ def audit_metrics():
     df = pd.read_csv('data/raw_nifty.csv', index_col=0, parse_dates=True)
     print(f"[OK] Data loaded: {len(df)} rows from {df.index[0].date()} to {df.index[-1].date()}")
     
+    # The report records the fingerprint of the data it was generated from
+    fingerprint = dataset_fingerprint(df)
+    try:
+        with open('outputs/full_metrics.json', 'r') as f:
+            reported_fingerprint = json.load(f).get('Data_Fingerprint')
+    except (OSError, ValueError):
+        reported_fingerprint = None
+    if reported_fingerprint is None:
+        print(f"[INFO] Data fingerprint: {fingerprint} (not recorded in outputs/full_metrics.json)")
+    elif reported_fingerprint == fingerprint:
+        print(f"[OK] Data fingerprint matches the report: {fingerprint}")
+    else:
+        print(f"[WARN] Data changed since the report was generated "
+              f"({reported_fingerprint} -> {fingerprint})")
+    
     # Run backtest with documented parameters
     print("\n[3/5] Running backtest with documented parameters...")
     print("  Parameters:")
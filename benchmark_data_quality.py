@@ -0,0 +1,100 @@
+"""
+Data-Quality Benchmark
+Times clean_ohlcv on a long synthetic daily OHLCV frame.
+
+Each case starts from the same random walk of weekday bars:
+- clean: nothing to repair (the default pre-stage cost)
+- dirty: 0.1% of rows with a NaN Close, a zero Open, High < Low or a
+  missing weekday
+- unsorted: dirty plus re-sent rows appended out of order (duplicates)
+
+Dirty cases run with and without fill_gaps; the best of several runs is
+reported in seconds. Bars are stamped in seconds so 10M weekdays fit in
+the index.
+
+Usage:
+    python benchmark_data_quality.py                     # 10M rows
+    python benchmark_data_quality.py --rows 1000000
+    python benchmark_data_quality.py --max-seconds 1     # exit 1 if any case is slower
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'src'))
+
+from data_quality import clean_ohlcv
+
+
+def make_frames(n_rows, seed=0):
+    """Clean, dirty and unsorted OHLCV frames of about n_rows weekday bars."""
+    rng = np.random.default_rng(seed)
+    days = np.busday_offset('1970-01-01', np.arange(n_rows), roll='forward').astype('datetime64[s]')
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, n_rows)))
+    clean = pd.DataFrame({
+        'Open': close * 0.999, 'High': close * 1.01, 'Low': close * 0.99, 'Close': close,
+        'Volume': rng.integers(1, 1000, n_rows).astype(float)
+    }, index=pd.DatetimeIndex(days, name='Date'))
+
+    # One defect kind per quarter of the sampled rows
+    rows = rng.choice(n_rows, n_rows // 1000, replace=False)
+    nan_close, zero_open, swapped, dropped = np.array_split(rows, 4)
+    dirty = clean.copy()
+    dirty.iloc[nan_close, 3] = np.nan
+    dirty.iloc[zero_open, 0] = 0.0
+    dirty.iloc[swapped, 1] = clean['Low'].values[swapped]
+    dirty.iloc[swapped, 2] = clean['High'].values[swapped]
+    keep = np.ones(n_rows, dtype=bool)
+    keep[dropped] = False
+    dirty = dirty[keep]
+
+    resent = dirty.iloc[rng.choice(len(dirty), max(len(rows) // 10, 1))]
+    return {'clean': clean, 'dirty': dirty, 'unsorted': pd.concat([dirty, resent])}
+
+
+def time_case(df, fill_gaps, repeats=3):
+    """
+    Run time of clean_ohlcv on one frame.
+
+    Returns:
+        (best_seconds, report): fastest of `repeats` runs and its report
+    """
+    runs = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        _, report = clean_ohlcv(df, fill_gaps=fill_gaps)
+        runs.append(time.perf_counter() - start)
+    return min(runs), report
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the data-quality pre-stage')
+    parser.add_argument('--rows', type=int, default=10_000_000, help='Weekday bars in the frame')
+    parser.add_argument('--repeats', type=int, default=3, help='Runs per case (best is reported)')
+    parser.add_argument('--max-seconds', type=float, default=None, help='Fail if any case exceeds this')
+    args = parser.parse_args()
+
+    frames = make_frames(args.rows)
+    print(f"{args.rows:,} rows")
+    print(f"{'Case':<10}{'Fill gaps':>10}{'Rows out':>12}{'Seconds':>10}")
+    print("-" * 42)
+    slow = []
+    for name, df in frames.items():
+        for fill_gaps in ([False] if name == 'clean' else [False, True]):
+            seconds, report = time_case(df, fill_gaps, args.repeats)
+            print(f"{name:<10}{str(fill_gaps):>10}{report['Rows_Out']:>12,}{seconds:>10.2f}")
+            if args.max_seconds is not None and seconds > args.max_seconds:
+                slow.append(f"{name}{' (fill_gaps)' if fill_gaps else ''}")
+
+    if slow:
+        print(f"\n[ERROR] Slower than {args.max_seconds:.1f} s: {', '.join(slow)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
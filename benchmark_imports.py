@@ -0,0 +1,81 @@
+"""
+Import-Time Benchmark
+Measures how long each module in src/ takes to import in a fresh interpreter.
+
+Each module is imported in its own subprocess (so shared dependencies are
+not cached by an earlier import) and the best of several runs is reported
+in milliseconds, together with any heavy optional dependency it pulled in.
+
+Usage:
+    python benchmark_imports.py                 # all src/ modules
+    python benchmark_imports.py metrics panel   # selected modules
+    python benchmark_imports.py --max-ms 500    # exit 1 if any module is slower
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'src')
+
+# Dependencies that must only load when actually used
+HEAVY_MODULES = ['scipy', 'yfinance', 'matplotlib', 'seaborn', 'plotly', 'streamlit']
+
+_PROBE = """
+import json, sys, time
+sys.path.insert(0, {src!r})
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+print(json.dumps({{'ms': elapsed * 1000, 'heavy': [m for m in {heavy!r} if m in sys.modules]}}))
+"""
+
+
+def src_modules():
+    """Names of the importable modules in src/."""
+    return sorted(os.path.splitext(name)[0] for name in os.listdir(SRC_DIR)
+                  if name.endswith('.py') and not name.startswith('_'))
+
+
+def time_import(module, repeats=3):
+    """
+    Import time of one module in fresh interpreters.
+
+    Returns:
+        (best_ms, heavy): fastest of `repeats` runs and the heavy
+        dependencies loaded by the import
+    """
+    code = _PROBE.format(src=SRC_DIR, module=module, heavy=HEAVY_MODULES)
+    runs = []
+    for _ in range(repeats):
+        out = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True)
+        runs.append(json.loads(out.stdout.strip().splitlines()[-1]))
+    return min(run['ms'] for run in runs), runs[0]['heavy']
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark per-module import time')
+    parser.add_argument('modules', nargs='*', help='Modules to time (default: all of src/)')
+    parser.add_argument('--repeats', type=int, default=3, help='Runs per module (best is reported)')
+    parser.add_argument('--max-ms', type=float, default=None, help='Fail if any module exceeds this')
+    args = parser.parse_args()
+
+    modules = args.modules or src_modules()
+    print(f"{'Module':<22}{'Import (ms)':>12}  Heavy dependencies loaded")
+    print("-" * 60)
+    slow = []
+    for module in modules:
+        ms, heavy = time_import(module, args.repeats)
+        print(f"{module:<22}{ms:>12.1f}  {', '.join(heavy) or '-'}")
+        if args.max_ms is not None and ms > args.max_ms:
+            slow.append(module)
+
+    if slow:
+        print(f"\n[ERROR] Slower than {args.max_ms:.0f} ms: {', '.join(slow)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
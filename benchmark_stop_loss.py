@@ -0,0 +1,80 @@
+"""
+Stop-Loss / Take-Profit Benchmark
+Times apply_stop_loss_take_profit on a long synthetic price series.
+
+The worst case for the SL/TP stage is one long run of Position == 1 with
+many forced exits and re-entries inside it, so every case here is
+always long on a random walk of daily returns. The best of several runs is
+reported in seconds together with the number of exits.
+
+Usage:
+    python benchmark_stop_loss.py                     # 10M bars, default bands
+    python benchmark_stop_loss.py --bars 1000000
+    python benchmark_stop_loss.py --max-seconds 10    # exit 1 if any case is slower
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'src'))
+
+from backtester import apply_stop_loss_take_profit
+
+# (stop_loss, take_profit) bands: few long trades ... many short ones
+CASES = [(-0.05, 0.10), (-0.02, 0.04), (-0.01, 0.01)]
+
+
+def random_walk(n_bars, seed=0):
+    """Open and Close prices of a 1%-volatility daily random walk."""
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, n_bars)))
+    open_ = np.concatenate(([close[0]], close[:-1])) * np.exp(rng.normal(0, 0.002, n_bars))
+    return open_, close
+
+
+def time_case(position, open_, close, stop_loss, take_profit, repeats=3):
+    """
+    Run time of one SL/TP band.
+
+    Returns:
+        (best_seconds, exits): fastest of `repeats` runs and the number of
+        forced exits
+    """
+    runs = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        _, reasons = apply_stop_loss_take_profit(position, open_, close, stop_loss, take_profit)
+        runs.append(time.perf_counter() - start)
+    return min(runs), int(np.count_nonzero(reasons))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the vectorized SL/TP stage')
+    parser.add_argument('--bars', type=int, default=10_000_000, help='Bars in the price series')
+    parser.add_argument('--repeats', type=int, default=3, help='Runs per case (best is reported)')
+    parser.add_argument('--max-seconds', type=float, default=None, help='Fail if any case exceeds this')
+    args = parser.parse_args()
+
+    open_, close = random_walk(args.bars)
+    position = np.ones(args.bars)
+    print(f"{args.bars:,} bars, always long")
+    print(f"{'Stop loss':>10}{'Take profit':>13}{'Exits':>12}{'Seconds':>10}")
+    print("-" * 45)
+    slow = []
+    for stop_loss, take_profit in CASES:
+        seconds, exits = time_case(position, open_, close, stop_loss, take_profit, args.repeats)
+        print(f"{stop_loss:>10.0%}{take_profit:>13.0%}{exits:>12,}{seconds:>10.2f}")
+        if args.max_seconds is not None and seconds > args.max_seconds:
+            slow.append(f"{stop_loss:.0%}/{take_profit:.0%}")
+
+    if slow:
+        print(f"\n[ERROR] Slower than {args.max_seconds:.1f} s: {', '.join(slow)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -16,8 +16,7 @@ sys.path.append(os.path.join(os.path.dirname(os.path.dirname(__file__)), 'src'))
 
 from data_loader import fetch_data
 from backtester import Backtester
-from metrics import (calculate_advanced_metrics, calculate_drawdown_recovery, 
-                     calculate_trade_metrics, generate_insights)
+from metrics import calculate_all_metrics, generate_insights
 from analysis import (
     compare_with_benchmark, analyze_market_regimes,
     transaction_cost_sensitivity, multi_strategy_comparison,
@@ -103,9 +102,8 @@ try:
         res_df = bt.run_rsi(rsi_period=params['rsi_period'], 
                            oversold=params['oversold'], overbought=params['overbought'])
     
-    metrics = calculate_advanced_metrics(res_df)
-    trade_metrics = calculate_trade_metrics(bt.trades)
-    dd_recovery = calculate_drawdown_recovery(res_df)
+    # Headline, trade and drawdown-recovery metrics in one fused pass
+    metrics = calculate_all_metrics(res_df, bt.trades)
     benchmark_metrics = compare_with_benchmark(res_df)
     insights = generate_insights(res_df, metrics, bt.trades, strategy)
     
@@ -169,7 +167,7 @@ with tab1:
         st.markdown(create_metric_card("Max Drawdown", metrics['Max_Drawdown'] * 100, delta, False), unsafe_allow_html=True)
     
     with col4:
-        st.markdown(create_metric_card("Total Trades", trade_metrics['Total_Trades'], None, False), unsafe_allow_html=True)
+        st.markdown(create_metric_card("Total Trades", metrics['Total_Trades'], None, False), unsafe_allow_html=True)
     
     st.markdown('<div class="section-divider"></div>', unsafe_allow_html=True)
     
@@ -337,10 +335,10 @@ with tab4:
     if len(bt.trades) > 0:
         # Trade Metrics
         col1, col2, col3, col4 = st.columns(4)
-        col1.metric("Total Trades", trade_metrics['Total_Trades'])
-        col2.metric("Win Rate", f"{trade_metrics['Win_Rate_Trade']:.1%}")
-        col3.metric("Profit Factor", f"{trade_metrics['Profit_Factor']:.2f}")
-        col4.metric("Avg Duration", f"{trade_metrics['Avg_Trade_Duration']:.1f} days")
+        col1.metric("Total Trades", metrics['Total_Trades'])
+        col2.metric("Win Rate", f"{metrics['Win_Rate_Trade']:.1%}")
+        col3.metric("Profit Factor", f"{metrics['Profit_Factor']:.2f}")
+        col4.metric("Avg Duration", f"{metrics['Avg_Trade_Duration']:.1f} days")
         
         st.markdown('<div class="section-divider"></div>', unsafe_allow_html=True)
         
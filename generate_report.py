@@ -7,12 +7,10 @@ import pandas as pd
 # Add src to path just in case
 sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
 
-from src.data_loader import fetch_data
+from src.data_loader import dataset_fingerprint, fetch_data
+from src.data_quality import clean_ohlcv, format_quality_report
 from src.backtester import Backtester
-from src.metrics import (calculate_advanced_metrics, calculate_trade_metrics, 
-                         calculate_additional_risk_metrics, compare_strategy_benchmark,
-                         generate_insights)
-from src.plots import generate_all_plots
+from src.metrics import calculate_all_metrics, compare_strategy_benchmark, generate_insights
 
 def main():
     parser = argparse.ArgumentParser(description='Run NIFTY 50 Backtest with Comprehensive Analysis')
@@ -22,6 +20,10 @@ def main():
     parser.add_argument('--config', type=str, default='configs/sma.json', help='Path to config JSON file')
     parser.add_argument('--generate-plots', action='store_true', default=True, help='Generate comprehensive plots')
     parser.add_argument('--benchmark', action='store_true', default=True, help='Include benchmark comparison')
+    parser.add_argument('--no-clean', action='store_true', help='Skip the data-quality repair stage')
+    parser.add_argument('--fill-gaps', action='store_true', help='Insert flat bars for missing weekdays')
+    parser.add_argument('--timeframe', type=str, default='D', choices=['D', 'W', 'M', 'Q'],
+                        help='Bar size: daily, or cached weekly/monthly/quarterly bars')
     args = parser.parse_args()
 
     # Create output directory
@@ -43,16 +45,28 @@ def main():
                  raise ValueError("Data file is empty")
         else:
              df = fetch_data()
+        if not args.no_clean:
+            df, quality = clean_ohlcv(df, fill_gaps=args.fill_gaps)
     except Exception as e:
         print(f"Error loading data: {e}")
         return
 
+    if not args.no_clean:
+        issues = format_quality_report(quality)
+        print(f"Data quality: {'; '.join(issues) if issues else 'no issues found'}")
+        with open(os.path.join(args.out, 'data_quality.json'), 'w') as f:
+            json.dump(quality, f, indent=4)
+
     print(f"\n{'='*70}")
     print(f"NIFTY 50 Professional Backtesting Engine")
     print(f"{'='*70}")
     print(f"Data Period: {df.index[0].strftime('%Y-%m-%d')} to {df.index[-1].strftime('%Y-%m-%d')}")
     print(f"Total Days: {len(df)}")
+    fingerprint = dataset_fingerprint(df)
+    print(f"Data Fingerprint: {fingerprint}")
     print(f"Strategy: {args.strategy.upper()}")
+    if args.timeframe != 'D':
+        print(f"Timeframe: {args.timeframe}")
     print(f"{'='*70}\n")
 
     # Initialize Backtester
@@ -60,7 +74,8 @@ def main():
                     initial_capital=config.get('initial_capital', 100000),
                     transaction_cost=config.get('transaction_cost', 0.001),
                     stop_loss=config.get('stop_loss', -0.05), 
-                    take_profit=config.get('take_profit', 0.10)
+                    take_profit=config.get('take_profit', 0.10),
+                    timeframe=args.timeframe
                     )
 
     # Run Strategy
@@ -79,25 +94,20 @@ def main():
 
     # Calculate Comprehensive Metrics
     print("Calculating performance metrics...")
-    metrics = calculate_advanced_metrics(result)
-    trade_metrics = calculate_trade_metrics(bt.trades)
-    risk_metrics = calculate_additional_risk_metrics(result)
-    
-    # Merge all metrics
-    all_metrics = {**metrics, **trade_metrics, **risk_metrics}
+    # One fused pass: headline, trade, risk and drawdown-recovery metrics
+    metrics = calculate_all_metrics(result, bt.trades, periods_per_year=bt.periods_per_year)
+    all_metrics = {**metrics, 'Data_Fingerprint': fingerprint}
     
     print("✓ Metrics calculation complete\n")
 
     # Benchmark Comparison
     if args.benchmark:
         print("Calculating benchmark (Buy & Hold) metrics...")
-        # Create a simple buy-and-hold result from the Market_Equity column
-        benchmark_df = result.copy()
-        benchmark_df['Strategy_Return'] = benchmark_df['Market_Return']
-        benchmark_df['Strategy_Equity'] = benchmark_df['Market_Equity']
-        benchmark_df['Position'] = 1.0  # Always invested
-        
-        benchmark_metrics = calculate_advanced_metrics(benchmark_df)
+        # Buy & hold from the Market_Return/Market_Equity columns, always invested
+        benchmark_metrics = calculate_all_metrics(result, periods_per_year=bt.periods_per_year,
+                                                  returns_column='Market_Return',
+                                                  equity_column='Market_Equity',
+                                                  position_column=None)
         comparison_df = compare_strategy_benchmark(metrics, benchmark_metrics)
         
         # Save comparison
@@ -124,16 +134,16 @@ def main():
     print(f"\n🛡️  RISK METRICS")
     print(f"  • Max Drawdown:            {metrics['Max_Drawdown']:>8.2%}")
     print(f"  • Volatility (Annual):     {metrics['Volatility']:>8.2%}")
-    print(f"  • VaR (95%):               {risk_metrics['VaR_95']:>8.2%}")
-    print(f"  • CVaR (95%):              {risk_metrics['CVaR_95']:>8.2%}")
-    print(f"  • Ulcer Index:             {risk_metrics['Ulcer_Index']:>8.2f}")
+    print(f"  • VaR (95%):               {metrics['VaR_95']:>8.2%}")
+    print(f"  • CVaR (95%):              {metrics['CVaR_95']:>8.2%}")
+    print(f"  • Ulcer Index:             {metrics['Ulcer_Index']:>8.2f}")
     
     print(f"\n📈 TRADE STATISTICS")
-    print(f"  • Total Trades:            {trade_metrics['Total_Trades']:>8.0f}")
-    print(f"  • Win Rate (Trade):        {trade_metrics['Win_Rate_Trade']:>8.2%}")
-    print(f"  • Hit Rate (Daily):        {risk_metrics['Hit_Rate']:>8.2%}")
-    print(f"  • Profit Factor:           {trade_metrics['Profit_Factor']:>8.2f}")
-    print(f"  • Avg Trade Duration:      {trade_metrics['Avg_Trade_Duration']:>8.1f} days")
+    print(f"  • Total Trades:            {metrics['Total_Trades']:>8.0f}")
+    print(f"  • Win Rate (Trade):        {metrics['Win_Rate_Trade']:>8.2%}")
+    print(f"  • Hit Rate (Daily):        {metrics['Hit_Rate']:>8.2%}")
+    print(f"  • Profit Factor:           {metrics['Profit_Factor']:>8.2f}")
+    print(f"  • Avg Trade Duration:      {metrics['Avg_Trade_Duration']:>8.1f} days")
     
     print(f"\n💡 KEY INSIGHTS")
     for insight in insights:
@@ -166,9 +176,9 @@ def main():
         "sharpe": round(metrics['Sharpe'], 2),
         "max_drawdown": round(metrics['Max_Drawdown'], 4),
         "total_return": round(metrics['Total_Return'], 4),
-        "win_rate": round(trade_metrics['Win_Rate_Trade'], 4),
-        "profit_factor": round(trade_metrics['Profit_Factor'], 2),
-        "trades": trade_metrics['Total_Trades'],
+        "win_rate": round(metrics['Win_Rate_Trade'], 4),
+        "profit_factor": round(metrics['Profit_Factor'], 2),
+        "trades": metrics['Total_Trades'],
         "volatility": round(metrics['Volatility'], 4),
         "sortino": round(metrics['Sortino'], 2),
         "calmar": round(metrics['Calmar'], 2)
@@ -179,8 +189,9 @@ def main():
     
     # Save full metrics (for analysis)
     with open(full_metrics_path, 'w') as f:
-        # Convert numpy types to Python types for JSON serialization
-        json_metrics = {k: float(v) if isinstance(v, (int, float)) else v 
+        # Convert numpy types to Python types and dates to strings for JSON serialization
+        json_metrics = {k: float(v) if isinstance(v, (int, float)) else
+                           str(v.date()) if isinstance(v, pd.Timestamp) else v
                        for k, v in all_metrics.items()}
         json.dump(json_metrics, f, indent=4)
     
@@ -192,6 +203,8 @@ def main():
     if args.generate_plots:
         print(f"\nGenerating comprehensive visualizations...")
         try:
+            # Imported here so runs without plots never load matplotlib
+            from src.plots import generate_all_plots
             generate_all_plots(result, bt.trades, strategy_name, args.out)
             print("✓ All plots generated successfully")
         except Exception as e:
@@ -6,10 +6,13 @@ Usage:
     python run_full_report.py
 """
 
+import importlib.util
 import subprocess
 import sys
 import os
 
+REQUIRED_MODULES = ['pandas', 'numpy', 'yfinance', 'matplotlib', 'scipy', 'seaborn']
+
 def main():
     print("="*80)
     print("NIFTY 50 Backtester - Full Reproducibility Runner")
@@ -17,19 +20,14 @@ def main():
     
     # Step 1: Check if requirements are installed
     print("\n[1/3] Checking dependencies...")
-    try:
-        import pandas
-        import numpy
-        import yfinance
-        import matplotlib
-        import scipy
-        import seaborn
-        print("[OK] All dependencies installed")
-    except ImportError as e:
-        print(f"[ERROR] Missing dependency: {e}")
+    # find_spec locates each package without importing it
+    missing = [name for name in REQUIRED_MODULES if importlib.util.find_spec(name) is None]
+    if missing:
+        print(f"[ERROR] Missing dependency: {', '.join(missing)}")
         print("\nPlease install requirements:")
         print("  pip install -r requirements.txt")
         sys.exit(1)
+    print("[OK] All dependencies installed")
     
     # Step 2: Run backtest
     print("\n[2/3] Running backtest...")
@@ -12,10 +12,18 @@ If you claim "out-of-sample" results, you must have selected parameters using
 only the train set. Otherwise, it's in-sample overfitting.
 """
 
+import os
+from concurrent.futures import ProcessPoolExecutor
+
 import pandas as pd
 import numpy as np
-from backtester import Backtester
-from metrics import calculate_advanced_metrics, calculate_trade_metrics
+
+try:
+    from .backtester import Backtester
+    from .metrics import calculate_advanced_metrics, calculate_all_metrics, calculate_rolling_metrics
+except ImportError:
+    from backtester import Backtester
+    from metrics import calculate_advanced_metrics, calculate_all_metrics, calculate_rolling_metrics
 
 
 def split_data(df, train_end='2023-12-31'):
@@ -50,31 +58,19 @@ def compare_with_benchmark(strategy_df, initial_capital=100000):
     Returns:
         Dict of benchmark metrics
     """
-    market_ret = strategy_df['Market_Return'].dropna()
-    
-    if len(market_ret) == 0:
+    if strategy_df['Market_Return'].count() == 0:
         return {}
     
-    days = (strategy_df.index[-1] - strategy_df.index[0]).days
-    total_return = (strategy_df['Market_Equity'].iloc[-1] / strategy_df['Market_Equity'].iloc[0]) - 1
-    cagr = (1 + total_return) ** (365.0 / days) - 1
-    
-    volatility = market_ret.std() * np.sqrt(252)
-    sharpe = (market_ret.mean() * 252 - 0.06) / volatility if volatility != 0 else 0
-    
-    # Drawdown
-    cum_ret = (1 + market_ret).cumprod()
-    peak = cum_ret.cummax()
-    drawdown = (cum_ret - peak) / peak
-    max_dd = drawdown.min()
+    metrics = calculate_all_metrics(strategy_df, returns_column='Market_Return',
+                                    equity_column='Market_Equity', position_column=None)
     
     return {
         "Strategy": "Buy & Hold",
-        "CAGR": cagr,
-        "Sharpe": sharpe,
-        "Max_Drawdown": max_dd,
-        "Volatility": volatility,
-        "Total_Return": total_return
+        "CAGR": metrics['CAGR'],
+        "Sharpe": metrics['Sharpe'],
+        "Max_Drawdown": metrics['Max_Drawdown'],
+        "Volatility": metrics['Volatility'],
+        "Total_Return": metrics['Total_Return']
     }
 
 def analyze_market_regimes(df):
@@ -155,11 +151,11 @@ def transaction_cost_sensitivity(data, strategy_func, params, costs=[0.0005, 0.0
         
         # Run strategy based on parameters
         if 'rsi_period' in params:
-            res_df = bt.run_rsi(**params)
+            res_df = bt.run_rsi(**params, columns=Backtester.METRIC_COLUMNS)
         elif 'sma_window' in params and 'std_dev' not in params:
-            res_df = bt.run_momentum(**params)
+            res_df = bt.run_momentum(**params, columns=Backtester.METRIC_COLUMNS)
         else:
-            res_df = bt.run_mean_reversion(**params)
+            res_df = bt.run_mean_reversion(**params, columns=Backtester.METRIC_COLUMNS)
         
         metrics = calculate_advanced_metrics(res_df)
         
@@ -172,10 +168,89 @@ def transaction_cost_sensitivity(data, strategy_func, params, costs=[0.0005, 0.0
     
     return pd.DataFrame(results)
 
-def multi_strategy_comparison(data):
+# Datasets installed once per worker process by _init_worker
+_WORKER_DATASETS = None
+
+
+def _init_worker(datasets):
+    """Process-pool initializer: keep the shared datasets for every task."""
+    global _WORKER_DATASETS
+    _WORKER_DATASETS = datasets
+
+
+def _run_in_worker(job):
+    func, task = job
+    return func(_WORKER_DATASETS, task)
+
+
+def run_configs(func, tasks, datasets, workers=None):
+    """
+    Evaluate strategy configs, optionally across a process pool.
+    
+    The datasets are handed to each worker once, through the pool
+    initializer, instead of being pickled with every task. Results come
+    back in task order, so outputs are identical for any worker count.
+    
+    Args:
+        func: Module-level function func(datasets, task) -> result
+        tasks: List of picklable task descriptions
+        datasets: Dict of name -> DataFrame shared by all tasks
+        workers: Number of worker processes; None or 1 runs in-process,
+            0 uses os.cpu_count()
+    
+    Returns:
+        List of results, one per task, in order
+    """
+    if workers == 0:
+        workers = os.cpu_count() or 1
+    if workers is None or workers <= 1 or len(tasks) <= 1:
+        return [func(datasets, task) for task in tasks]
+    
+    workers = min(workers, len(tasks))
+    chunksize = max(1, len(tasks) // (workers * 4))
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(datasets,)) as executor:
+        return list(executor.map(_run_in_worker, [(func, task) for task in tasks], chunksize=chunksize))
+
+
+def _evaluate_strategy_config(datasets, config):
+    """Run one (strategy_name, params) config on datasets['data'] and summarize it."""
+    strategy_name, params = config
+    bt = Backtester(datasets['data'])
+    
+    if strategy_name == "Momentum":
+        res_df = bt.run_momentum(**params, columns=Backtester.METRIC_COLUMNS)
+        param_str = f"SMA={params['sma_window']}"
+    elif strategy_name == "Mean Reversion":
+        res_df = bt.run_mean_reversion(**params, columns=Backtester.METRIC_COLUMNS)
+        param_str = f"SMA={params['sma_window']}, BB={params['std_dev']}"
+    else:  # RSI
+        res_df = bt.run_rsi(**params, columns=Backtester.METRIC_COLUMNS)
+        param_str = f"Period={params['rsi_period']}, OS={params['oversold']}, OB={params['overbought']}"
+    
+    metrics = calculate_all_metrics(res_df, bt.trades)
+    
+    return {
+        "Strategy": strategy_name,
+        "Parameters": param_str,
+        "CAGR": metrics['CAGR'],
+        "Sharpe": metrics['Sharpe'],
+        "Sortino": metrics['Sortino'],
+        "Calmar": metrics['Calmar'],
+        "Max_Drawdown": metrics['Max_Drawdown'],
+        "Total_Trades": metrics['Total_Trades'],
+        "Win_Rate": metrics['Win_Rate_Trade']
+    }
+
+
+def multi_strategy_comparison(data, workers=None):
     """
     Compare multiple strategy configurations.
     
+    Args:
+        data: Market data
+        workers: Worker processes for run_configs (None = run serially)
+    
     Returns:
         DataFrame with all configurations
     """
@@ -192,39 +267,28 @@ def multi_strategy_comparison(data):
         ("RSI", {"rsi_period": 21, "oversold": 30, "overbought": 70}),
     ]
     
-    results = []
-    
-    for strategy_name, params in configs:
-        bt = Backtester(data)
-        
-        if strategy_name == "Momentum":
-            res_df = bt.run_momentum(**params)
-            param_str = f"SMA={params['sma_window']}"
-        elif strategy_name == "Mean Reversion":
-            res_df = bt.run_mean_reversion(**params)
-            param_str = f"SMA={params['sma_window']}, BB={params['std_dev']}"
-        else:  # RSI
-            res_df = bt.run_rsi(**params)
-            param_str = f"Period={params['rsi_period']}, OS={params['oversold']}, OB={params['overbought']}"
-        
-        metrics = calculate_advanced_metrics(res_df)
-        trade_metrics = calculate_trade_metrics(bt.trades)
-        
-        results.append({
-            "Strategy": strategy_name,
-            "Parameters": param_str,
-            "CAGR": metrics['CAGR'],
-            "Sharpe": metrics['Sharpe'],
-            "Sortino": metrics['Sortino'],
-            "Calmar": metrics['Calmar'],
-            "Max_Drawdown": metrics['Max_Drawdown'],
-            "Total_Trades": trade_metrics['Total_Trades'],
-            "Win_Rate": trade_metrics['Win_Rate_Trade']
-        })
+    results = run_configs(_evaluate_strategy_config, configs, {'data': data}, workers=workers)
     
     return pd.DataFrame(results)
 
 
+def compound_by_period(returns, period):
+    """
+    Compounded return per calendar period.
+
+    Groups by period codes and takes one vectorized product per group, so
+    monthly and annual tables need no per-period Python callback.
+
+    Args:
+        returns: Series of per-bar returns with a DatetimeIndex
+        period: pandas period alias, e.g. 'M' or 'Y'
+
+    Returns:
+        Series indexed by PeriodIndex
+    """
+    return (1 + returns).groupby(returns.index.to_period(period)).prod() - 1
+
+
 def calculate_monthly_returns(df):
     """
     Calculate monthly returns for heatmap visualization.
@@ -235,7 +299,7 @@ def calculate_monthly_returns(df):
     Returns:
         DataFrame with years as rows, months as columns
     """
-    monthly_data = df['Strategy_Return'].resample('M').apply(lambda x: (1 + x).prod() - 1)
+    monthly_data = compound_by_period(df['Strategy_Return'], 'M')
     monthly_data = monthly_data * 100  # Convert to percentage
     
     # Create pivot table
@@ -246,6 +310,7 @@ def calculate_monthly_returns(df):
     })
     
     heatmap_data = monthly_pivot.pivot(index='Year', columns='Month', values='Return')
+    heatmap_data = heatmap_data.reindex(columns=range(1, 13))
     heatmap_data.columns = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 
                             'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec']
     
@@ -262,8 +327,8 @@ def calculate_annual_returns(df):
     Returns:
         DataFrame with annual performance
     """
-    annual_strategy = df['Strategy_Return'].resample('Y').apply(lambda x: (1 + x).prod() - 1)
-    annual_market = df['Market_Return'].resample('Y').apply(lambda x: (1 + x).prod() - 1)
+    annual_strategy = compound_by_period(df['Strategy_Return'], 'Y')
+    annual_market = compound_by_period(df['Market_Return'], 'Y')
     
     annual_df = pd.DataFrame({
         'Year': annual_strategy.index.year,
@@ -287,10 +352,5 @@ def calculate_rolling_sharpe(df, window=30, risk_free_rate=0.06):
     Returns:
         Series of rolling Sharpe ratios
     """
-    returns = df['Strategy_Return']
-    rolling_mean = returns.rolling(window).mean() * 252
-    rolling_std = returns.rolling(window).std() * np.sqrt(252)
-    
-    rolling_sharpe = (rolling_mean - risk_free_rate) / rolling_std
-    
-    return rolling_sharpe
+    rolling = calculate_rolling_metrics(df, window, risk_free_rate=risk_free_rate)
+    return rolling['Rolling_Sharpe']
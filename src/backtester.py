@@ -1,6 +1,410 @@
+import itertools
+
 import pandas as pd
 import numpy as np
 
+try:
+    from .data_cache import dataset_fingerprint
+    from .data_loader import PERIODS_PER_YEAR, TIMEFRAME_DIR, load_timeframe
+    from .indicators import INDICATOR_CACHE, latch, rolling_mean, rolling_std, rsi
+    from .precision import resolve_dtype
+except ImportError:
+    from data_cache import dataset_fingerprint
+    from data_loader import PERIODS_PER_YEAR, TIMEFRAME_DIR, load_timeframe
+    from indicators import INDICATOR_CACHE, latch, rolling_mean, rolling_std, rsi
+    from precision import resolve_dtype
+
+# Exit reason codes used by the array-based SL/TP and trade log stages.
+# Index into EXIT_REASONS to get the label written to Exit_Reason.
+EXIT_SIGNAL, EXIT_STOP_LOSS, EXIT_TAKE_PROFIT, EXIT_END_OF_DATA = 0, 1, 2, 3
+EXIT_REASONS = ('Signal', 'Stop_Loss', 'Take_Profit', 'End_of_Data')
+EXIT_REASON_LABELS = np.array(EXIT_REASONS, dtype=object)
+
+
+def _breach_bounds(entry_price, stop_loss, take_profit):
+    """
+    Close thresholds equivalent to the SL/TP checks of a trade entered at
+    each price: close / entry - 1 <= stop_loss exactly when close <= low,
+    and close / entry - 1 >= take_profit exactly when close >= high.
+    
+    The checks are monotone in close (for a positive entry price), so each
+    bound is the float where the check flips; it is found from the rounded
+    product and nudged by ulps until it agrees with the division. Disabled
+    or undefined bounds are NaN, which never compares true.
+    """
+    def bound(limit, breached, outward):
+        value = entry_price * (1 + limit)
+        valid = (entry_price > 0) & np.isfinite(value)
+        value[~valid] = np.nan
+        # Step into the breach region, then along it to its edge
+        move = np.flatnonzero(valid & ~breached(value))
+        while len(move) > 0:
+            value[move] = np.nextafter(value[move], outward)
+            move = move[~breached(value[move], move)]
+        step = np.nextafter(value, -outward)
+        move = np.flatnonzero(valid & breached(step))
+        step = step[move]
+        while len(move) > 0:
+            value[move] = step
+            step = np.nextafter(step, -outward)
+            inside = breached(step, move)
+            move, step = move[inside], step[inside]
+        return value
+    
+    nan = np.full(len(entry_price), np.nan, dtype=entry_price.dtype)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        low = nan if stop_loss is None else bound(
+            stop_loss, lambda close, at=slice(None): close / entry_price[at] - 1 <= stop_loss, -np.inf)
+        high = nan if take_profit is None else bound(
+            take_profit, lambda close, at=slice(None): close / entry_price[at] - 1 >= take_profit, np.inf)
+    return low, high
+
+
+def _first_breach(close, low, high):
+    """
+    For every bar e, the first bar t >= e with close[t] <= low[e] or
+    close[t] >= high[e] (len(close) if there is none).
+    
+    A block of bars holds a breach exactly when its minimum or maximum
+    does. The bars after e are covered, in order, by the aligned
+    power-of-two blocks that follow e's own block at each level where e
+    sits in a left half; the first of these holding a breach is found
+    level by level (on whole arrays while most bars are unresolved, then on
+    the remaining ones), then bisected down to the bar.
+    """
+    m = len(close)
+    size = 1 << max(m - 1, 0).bit_length()
+    
+    def padded(values):
+        # NaN padding never breaches; fmin/fmax skip NaN closes
+        out = np.full(size, np.nan, dtype=close.dtype)
+        out[:m] = values
+        return out
+    
+    prices, low, high = padded(close), padded(low), padded(high)
+    first = np.full(size, m, dtype=np.int64)
+    self_hit = (prices <= low) | (prices >= high)
+    first[self_hit] = np.flatnonzero(self_hit)
+    block_level = np.full(size, -1, dtype=np.int8)
+    block_level[self_hit] = 0
+    block_level[m:] = 0
+    
+    levels = {}
+    block_low = block_high = prices
+    unresolved = m - np.count_nonzero(self_hit[:m])
+    query = None
+    level = 0
+    while unresolved > 0 and (size >> level) > 1:
+        levels[level] = (block_low, block_high)
+        pairs = size >> (level + 1)
+        next_low = block_low[1::2]
+        next_high = block_high[1::2]
+        if query is None and unresolved * 16 > size:
+            # Left halves of every pair against the block on their right
+            shape = (pairs, 2, 1 << level)
+            pending = block_level.reshape(shape)[:, 0, :]
+            hit = next_low[:, None] <= low.reshape(shape)[:, 0, :]
+            hit |= next_high[:, None] >= high.reshape(shape)[:, 0, :]
+            hit &= pending < 0
+            np.copyto(pending, level + 1, where=hit)
+            unresolved -= np.count_nonzero(hit)
+        else:
+            if query is None:
+                query = np.flatnonzero(block_level < 0)
+            q = query[((query >> level) & 1) == 0]
+            pair = q >> (level + 1)
+            hit = (next_low[pair] <= low[q]) | (next_high[pair] >= high[q])
+            block_level[q[hit]] = level + 1
+            query = query[block_level[query] < 0]
+            unresolved = len(query)
+        block_low = np.fmin(block_low[0::2], block_low[1::2])
+        block_high = np.fmax(block_high[0::2], block_high[1::2])
+        level += 1
+    
+    # Bisect the breached blocks down to single bars. Sorted by level, the
+    # blocks still above a level are a suffix.
+    found = np.flatnonzero(block_level > 0)
+    found = found[np.argsort(block_level[found], kind='stable')]
+    found_level = block_level[found].astype(np.int64) - 1
+    found_low, found_high = low[found], high[found]
+    block = (found >> found_level) + 1
+    for level in range(found_level.max(initial=0), 0, -1):
+        start = np.searchsorted(found_level, level)
+        left_low, left_high = levels[level - 1]
+        left = 2 * block[start:]
+        in_left = (left_low[left] <= found_low[start:]) | (left_high[left] >= found_high[start:])
+        block[start:] = left + ~in_left
+    first[found] = block
+    return first[:m]
+
+
+def apply_stop_loss_take_profit(position, open_prices, close_prices,
+                                stop_loss=None, take_profit=None, dtype=None):
+    """
+    Vectorized stop-loss / take-profit stage.
+    
+    Semantics match the original bar-by-bar loop exactly (for positive
+    entry prices):
+    - A trade enters at the Open of the first bar of a run of Position == 1
+    - SL/TP are checked at each Close against that entry Open
+    - On a hit, Position is forced to 0 on that bar; if the signal is still
+      long on the next bar, a new trade enters at that bar's Open
+    
+    The first breach is found for a trade entered at every bar at once
+    (_first_breach, O(n log n) array work). Each hit links a bar to the bar
+    after its exit, and the trades actually taken are the chains of links
+    from the segment starts, followed by pointer doubling: O(log trades)
+    array passes however many exits a segment has.
+    
+    Args:
+        position: Array of 0/1 positions, shape (n,) or (n, k). 2D input is
+            treated as k independent columns (e.g. a parameter grid).
+        open_prices: Open prices, shape (n,) or (n, k)
+        close_prices: Close prices, same shape as open_prices
+        stop_loss: Stop loss as decimal (e.g., -0.05), None to disable
+        take_profit: Take profit as decimal (e.g., 0.10), None to disable
+        dtype: Float dtype of positions and prices (default: precision policy)
+        
+    Returns:
+        (position, reasons): adjusted float positions and int8 exit reason
+        codes (indices into EXIT_REASONS), both shaped like the input
+    """
+    dtype = resolve_dtype(dtype)
+    position = np.array(position, dtype=dtype)
+    shape = position.shape
+    n = shape[0]
+    reasons = np.zeros(shape, dtype=np.int8)
+    if position.size == 0 or (stop_loss is None and take_profit is None):
+        return position, reasons
+    
+    # Work on a flat, column-major view so each column is a contiguous run
+    flat_pos = position.T.ravel()
+    total = flat_pos.size
+    open_ = np.asarray(open_prices, dtype=dtype)
+    close = np.asarray(close_prices, dtype=dtype)
+    shared_prices = open_.ndim == 1
+    if not shared_prices:
+        open_, close = open_.T.ravel(), close.T.ravel()
+    
+    def price_at(idx):
+        # A shared (n,) price series serves every column: map flat index -> bar
+        return idx % n if shared_prices else idx
+    
+    # Trade segments: maximal runs of Position == 1 within a column
+    is_long = flat_pos == 1
+    first_bar = np.zeros(total, dtype=bool)
+    first_bar[::n] = True
+    prev_long = np.concatenate(([False], is_long[:-1])) & ~first_bar
+    next_long = np.concatenate((is_long[1:], [False]))
+    next_long[n - 1::n] = False
+    seg_starts = np.flatnonzero(is_long & ~prev_long)
+    seg_ends = np.flatnonzero(is_long & ~next_long)
+    flat_reasons = np.zeros(total, dtype=np.int8)
+    
+    if len(seg_starts) == 0:
+        return position, reasons
+    
+    # Exit bar of a trade entered at each held bar, if within its segment
+    held = np.flatnonzero(is_long)
+    seg_end = seg_ends[np.cumsum(~prev_long[held]) - 1]
+    breach = _first_breach(close, *_breach_bounds(open_, stop_loss, take_profit))
+    if shared_prices:
+        bar = held % n
+        exit_bar = np.where(breach[bar] < n, held - bar + breach[bar], total)
+    else:
+        exit_bar = breach[held]
+    exits_in_segment = exit_bar <= seg_end
+    
+    # Only segment starts and bars right after an exit can open a trade;
+    # link each of those to the bar that opens the next one. Held bars of a
+    # segment are consecutive in `held`, so bar b + d is node i + d.
+    nodes = np.arange(len(held))
+    follows = np.where(exits_in_segment & (exit_bar < seg_end), nodes + (exit_bar + 1 - held), len(held))
+    starts = np.searchsorted(held, seg_starts)
+    can_open = np.zeros(len(held) + 1, dtype=bool)
+    can_open[follows] = True
+    can_open[starts] = True
+    openers = np.flatnonzero(can_open[:-1])
+    sink = len(openers)
+    index_dtype = np.int32 if sink < np.iinfo(np.int32).max else np.int64
+    label = np.full(len(held) + 1, sink, dtype=index_dtype)
+    label[openers] = np.arange(sink)
+    link = np.append(label[follows[openers]], sink).astype(index_dtype)
+    
+    # Follow the chains from the segment starts by pointer doubling: after
+    # step k every trade within 2**k trades of a start is marked. Chains
+    # never share trades, so each step only adds new ones.
+    marked = label[starts]
+    while True:
+        reached = link[marked]
+        reached = reached[reached != sink]
+        if len(reached) == 0:
+            break
+        marked = np.concatenate((marked, reached))
+        link = link[link]
+    taken = openers[np.sort(marked)]
+    
+    # Record forced exits; stop loss takes precedence over take profit
+    trades = taken[exits_in_segment[taken]]
+    exits = exit_bar[trades]
+    flat_pos[exits] = 0
+    exit_pnl = close[price_at(exits)] / open_[price_at(held[trades])] - 1
+    if stop_loss is not None:
+        is_stop = exit_pnl <= stop_loss
+    else:
+        is_stop = np.zeros(len(exits), dtype=bool)
+    flat_reasons[exits] = np.where(is_stop, EXIT_STOP_LOSS, EXIT_TAKE_PROFIT)
+    
+    position = flat_pos.reshape(shape[::-1]).T
+    reasons = flat_reasons.reshape(shape[::-1]).T
+    return np.ascontiguousarray(position), np.ascontiguousarray(reasons)
+
+
+
+def trade_log_dtype(date_dtype='datetime64[ns]'):
+    """Structured dtype of the array-form trade log."""
+    return np.dtype([
+        ('Entry_Date', date_dtype),
+        ('Entry_Price', 'f8'),
+        ('Exit_Date', date_dtype),
+        ('Exit_Price', 'f8'),
+        ('PnL', 'f8'),
+        ('Return_Pct', 'f8'),
+        ('Exit_Reason', 'i1'),
+    ])
+
+
+def extract_trades(position, exec_price, dates, exit_reasons=None,
+                   initial_capital=100000, position_size=1.0, transaction_cost=0.001):
+    """
+    Build the trade log from position and price arrays without a per-bar loop.
+    
+    Entries and exits are the +1 / -1 steps of np.diff over the held state.
+    Bars whose Position is NaN (or anything other than 0/1) keep the previous
+    state, matching the original loop. A trade still open on the last bar is
+    closed there with Exit_Reason 'End_of_Data'.
+    
+    Args:
+        position: Array of 0/1 positions
+        exec_price: Execution price per bar (Open)
+        dates: Array of bar dates
+        exit_reasons: Optional int codes into EXIT_REASONS per bar (default Signal)
+        initial_capital: Capital used for share count and PnL
+        position_size: Fraction of capital deployed per trade
+        transaction_cost: Cost per side as decimal
+        
+    Returns:
+        NumPy structured array with trade_log_dtype() fields, one row per trade
+    """
+    position = np.asarray(position, dtype=float)
+    exec_price = np.asarray(exec_price, dtype=float)
+    dates = np.asarray(dates)
+    n = len(position)
+    
+    # Held state: forward-fill the last bar that was exactly 0 or 1
+    decisive = np.where((position == 0) | (position == 1), np.arange(n), -1)
+    np.maximum.accumulate(decisive, out=decisive)
+    held = (decisive >= 0) & (position[np.maximum(decisive, 0)] == 1)
+    
+    steps = np.diff(held.astype(np.int8), prepend=np.int8(0))
+    entries = np.flatnonzero(steps == 1)
+    exits = np.flatnonzero(steps == -1)
+    open_at_end = len(entries) > len(exits)
+    if open_at_end:
+        exits = np.append(exits, n - 1)
+    
+    entry_price = exec_price[entries]
+    exit_price = exec_price[exits]
+    
+    # Capital per trade; the End_of_Data close uses full capital as before
+    capital = np.full(len(entries), initial_capital * position_size, dtype=float)
+    if open_at_end:
+        capital[-1] = initial_capital
+    shares = capital / entry_price
+    gross_pnl = (exit_price - entry_price) * shares
+    cost = capital * transaction_cost * 2
+    
+    if exit_reasons is None:
+        reasons = np.full(len(exits), EXIT_SIGNAL, dtype=np.int8)
+    else:
+        reasons = np.asarray(exit_reasons, dtype=np.int8)[exits]
+    if open_at_end:
+        reasons[-1] = EXIT_END_OF_DATA
+    
+    date_dtype = dates.dtype if dates.dtype.kind == 'M' else object
+    trades = np.empty(len(entries), dtype=trade_log_dtype(date_dtype))
+    trades['Entry_Date'] = dates[entries]
+    trades['Entry_Price'] = entry_price
+    trades['Exit_Date'] = dates[exits]
+    trades['Exit_Price'] = exit_price
+    trades['PnL'] = gross_pnl - cost
+    trades['Return_Pct'] = (exit_price / entry_price - 1) - (transaction_cost * 2)
+    trades['Exit_Reason'] = reasons
+    return trades
+
+
+def trade_log_to_frame(trades):
+    """Convert an array-form trade log to the DataFrame written to trades.csv."""
+    if len(trades) == 0:
+        return pd.DataFrame()
+    codes = trades['Exit_Reason']
+    unknown = (codes < 0) | (codes >= len(EXIT_REASONS))
+    if unknown.any():
+        raise ValueError(f"Unknown Exit_Reason codes in trade log: {sorted(set(codes[unknown].tolist()))}")
+    frame = pd.DataFrame({name: trades[name] for name in trades.dtype.names})
+    frame['Exit_Reason'] = EXIT_REASON_LABELS[codes]
+    return frame
+
+
+def compute_returns(open_prices, position, initial_capital=100000, transaction_cost=0.001,
+                    dividend_yield=0.015, position_size=1.0, periods_per_year=252, dtype=None):
+    """
+    Open-to-open market and strategy returns for one or many position columns.
+    
+    Same formulas and NaN handling as the single-run result columns.
+    `position` may be (n,) or (n, k); `open_prices` is either a shared (n,)
+    series (parameter grids) or an (n, k) matrix (one column per symbol).
+    The dividend yield accrues per bar over `periods_per_year` bars
+    (252 for daily data). Returns and costs are in `dtype` (default: the
+    precision policy); equity curves always accumulate in float64.
+    
+    Returns:
+        Dict with Market_Return, Market_Equity (shaped like open_prices) and
+        Cost, Strategy_Return, Strategy_Equity (shaped like position)
+    """
+    dtype = resolve_dtype(dtype)
+    open_prices = np.asarray(open_prices, dtype=dtype)
+    position = np.asarray(position, dtype=dtype)
+    
+    # Market Returns: Open-to-Open + Dividend Yield
+    market_return = np.empty(open_prices.shape, dtype=dtype)
+    market_return[:1] = np.nan
+    market_return[1:] = open_prices[1:] / open_prices[:-1] - 1
+    market_return = market_return + dividend_yield / periods_per_year
+    
+    market = market_return[:, None] if market_return.ndim < position.ndim else market_return
+    strategy_return = market * position * position_size
+    
+    # Transaction costs only on position changes
+    position_change = np.zeros_like(position)
+    position_change[1:] = np.abs(np.diff(position, axis=0))
+    position_change[np.isnan(position_change)] = 0
+    cost = position_change * transaction_cost * position_size
+    strategy_return = strategy_return - cost
+    
+    market_return = np.nan_to_num(market_return, nan=0.0)
+    strategy_return = np.nan_to_num(strategy_return, nan=0.0)
+    
+    return {
+        'Market_Return': market_return,
+        'Strategy_Return': strategy_return,
+        'Cost': cost,
+        'Market_Equity': initial_capital * np.cumprod(1 + market_return, axis=0, dtype=np.float64),
+        'Strategy_Equity': initial_capital * np.cumprod(1 + strategy_return, axis=0, dtype=np.float64),
+    }
+
+
+
 class Backtester:
     """
     Professional-grade backtester with proper execution modeling.
@@ -22,8 +426,18 @@ class Backtester:
     - SL/TP checked at each day's close
     """
     
+    # Columns every run_* result can return (plus the strategy's indicators)
+    RESULT_COLUMNS = ('Open', 'High', 'Low', 'Close', 'Volume', 'Signal', 'Position', 'Exec_Price',
+                      'Exit_Reason', 'Market_Return', 'Strategy_Return', 'Cost',
+                      'Market_Equity', 'Strategy_Equity')
+    
+    # Slim result used by sweeps: enough for every metrics.* function
+    METRIC_COLUMNS = ['Position', 'Market_Return', 'Strategy_Return', 'Market_Equity', 'Strategy_Equity']
+    
     def __init__(self, data, initial_capital=100000, transaction_cost=0.001, 
-                 dividend_yield=0.015, stop_loss=None, take_profit=None, position_size=1.0):
+                 dividend_yield=0.015, stop_loss=None, take_profit=None, position_size=1.0,
+                 trade_log_format='dataframe', cache_indicators=True, timeframe='D', dtype=None,
+                 timeframe_cache_dir=TIMEFRAME_DIR):
         """
         Initialize backtester.
         
@@ -35,67 +449,78 @@ class Backtester:
             stop_loss: Stop loss as decimal (e.g., -0.05 = -5%), None to disable
             take_profit: Take profit as decimal (e.g., 0.10 = 10%), None to disable
             position_size: Fraction of capital to deploy (0.5 = 50%, 1.0 = 100%)
+            trade_log_format: 'dataframe' (default) or 'array' to keep self.trades as a
+                NumPy structured array; sweeps use this to skip DataFrame construction
+            cache_indicators: Share computed indicators through the process-wide
+                INDICATOR_CACHE (keyed by a fingerprint of `data`)
+            timeframe: 'D' to trade the daily bars, or 'W', 'M', 'Q' to trade
+                weekly/monthly/quarterly bars from the data_loader timeframe
+                cache; the dividend yield then accrues per period
+            dtype: np.float32 or np.float64 for prices, indicators, positions
+                and returns (default: the engine-wide precision policy);
+                equity and metrics stay float64
+            timeframe_cache_dir: Directory of the resampled-bar stores used for
+                timeframe != 'D' (default data/timeframes); None resamples in
+                memory without writing any file
         """
-        self.data = data.copy()
+        if trade_log_format not in ('dataframe', 'array'):
+            raise ValueError(f"trade_log_format must be 'dataframe' or 'array', got {trade_log_format!r}")
+        if timeframe not in PERIODS_PER_YEAR:
+            raise ValueError(f"timeframe must be one of {list(PERIODS_PER_YEAR)}, got {timeframe!r}")
+        self.timeframe = timeframe
+        self.periods_per_year = PERIODS_PER_YEAR[timeframe]
+        self.dtype = resolve_dtype(dtype)
+        self.data = load_timeframe(data, timeframe, cache_dir=timeframe_cache_dir).copy()
         self.initial_capital = initial_capital
         self.transaction_cost = transaction_cost
         self.dividend_yield = dividend_yield
         self.stop_loss = stop_loss
         self.take_profit = take_profit
         self.position_size = position_size
+        self.trade_log_format = trade_log_format
+        self.cache_indicators = cache_indicators
+        self._fingerprint = None
         self.trades = pd.DataFrame()  # Store trade log
         
-    def _apply_stop_loss_take_profit(self, df):
+    def _indicator_columns(self, name, params, kernel):
         """
-        Apply stop-loss and take-profit rules to positions.
+        (bars x len(params)) matrix of a per-parameter indicator of Close.
         
-        Modifies the Position column to exit when SL or TP is hit.
-        Adds Exit_Reason column to track why positions were closed.
+        Each column is cached under (name, param), so single runs and the
+        *_grid methods share entries; the misses are computed together by one
+        kernel(close, params, dtype=...) call from the indicators module.
         
         Args:
-            df: DataFrame with Position, Open, and Close columns
-            
+            name: Indicator name, part of the cache key
+            params: Iterable of integer windows/periods
+            kernel: rolling_mean, rolling_std or rsi
+        
         Returns:
-            DataFrame with modified Position and Exit_Reason columns
+            A new, writable array
         """
-        if self.stop_loss is None and self.take_profit is None:
-            df['Exit_Reason'] = 'Signal'
-            return df
-            
-        df['Exit_Reason'] = 'Signal'
-        position = df['Position'].values.copy()
-        entry_price = None
-        
-        for i in range(len(df)):
-            if position[i] == 1:
-                # Track entry price
-                if i == 0 or position[i-1] == 0:
-                    entry_price = df['Open'].iloc[i]
-                    
-                # Check SL/TP at close
-                if entry_price is not None:
-                    current_price = df['Close'].iloc[i]
-                    pnl_pct = (current_price / entry_price) - 1
-                    
-                    # Check stop loss
-                    if self.stop_loss is not None and pnl_pct <= self.stop_loss:
-                        position[i] = 0  # Force exit
-                        df.loc[df.index[i], 'Exit_Reason'] = 'Stop_Loss'
-                        entry_price = None
-                        
-                    # Check take profit
-                    elif self.take_profit is not None and pnl_pct >= self.take_profit:
-                        position[i] = 0  # Force exit
-                        df.loc[df.index[i], 'Exit_Reason'] = 'Take_Profit'
-                        entry_price = None
-                        
-            elif position[i] == 0 and i > 0 and position[i-1] == 1:
-                # Natural exit from signal
-                entry_price = None
-                
-        df['Position'] = position
-        return df
-    def run_momentum(self, sma_window=50):
+        params = [int(p) for p in params]
+        close = self._prices('Close')
+        
+        def compute(missing):
+            return kernel(close, [params[i] for i in missing], dtype=self.dtype)
+        
+        if not self.cache_indicators:
+            return compute(range(len(params)))
+        keys = [(self.fingerprint, name, self.dtype.name, p) for p in params]
+        return np.column_stack(INDICATOR_CACHE.get_or_compute_columns(keys, compute))
+
+    @property
+    def fingerprint(self):
+        """Content fingerprint of the input data (see data_cache.dataset_fingerprint)."""
+        if self._fingerprint is None:
+            self._fingerprint = dataset_fingerprint(self.data)
+        return self._fingerprint
+
+    def _prices(self, column):
+        """A price column as an array in the engine dtype."""
+        return self.data[column].to_numpy(dtype=self.dtype)
+
+    def run_momentum(self, sma_window=50, columns=None):
         """
         Momentum Strategy with proper execution lag.
         
@@ -109,37 +534,23 @@ class Backtester:
         
         Args:
             sma_window: Simple moving average window
+            columns: Optional list of result columns to return (slim mode,
+                see _execute); None returns the full DataFrame
             
         Returns:
             DataFrame with signals, positions, returns, and equity curves
         """
-        df = self.data.copy()
-        df['SMA'] = df['Close'].rolling(window=sma_window).mean()
+        close = self._prices('Close')
+        sma = self._sma(sma_window)
         
         # Signal: 1 if Close > SMA, else 0
         # Set to 0 where SMA is NaN (warmup period)
-        df['Signal'] = np.where(df['Close'] > df['SMA'], 1, 0)
-        df.loc[df['SMA'].isna(), 'Signal'] = 0
-        
-        # CRITICAL: Shift signal to avoid look-ahead bias
-        # Position today = Signal from yesterday
-        df['Position'] = df['Signal'].shift(1).fillna(0)
-        
-        # Execute at NEXT DAY OPEN
-        df['Exec_Price'] = df['Open']
-        
-        # Apply stop-loss and take-profit
-        df = self._apply_stop_loss_take_profit(df)
+        signal = np.where(close > sma, 1, 0)
+        signal[np.isnan(sma)] = 0
         
-        # Handle last open position: force close at end
-        df = self._close_last_position(df)
-        
-        # Generate trade log
-        self.trades = self._generate_trade_log(df)
-        
-        return self._calculate_returns(df)
+        return self._execute({'SMA': sma, 'Signal': signal}, signal, columns)
 
-    def run_mean_reversion(self, sma_window=20, std_dev=2.0):
+    def run_mean_reversion(self, sma_window=20, std_dev=2.0, columns=None):
         """
         Mean Reversion Strategy with proper execution lag.
         
@@ -150,57 +561,24 @@ class Backtester:
         Args:
             sma_window: SMA window for Bollinger Bands
             std_dev: Standard deviation multiplier (default 2.0)
+            columns: Optional list of result columns to return (slim mode)
             
         Returns:
             DataFrame with signals, positions, returns, and equity curves
         """
-        df = self.data.copy()
-        df['SMA'] = df['Close'].rolling(window=sma_window).mean()
-        df['Std'] = df['Close'].rolling(window=sma_window).std()
-        df['Lower'] = df['SMA'] - (std_dev * df['Std'])
-        
-        # State-based signal generation
-        signals = np.zeros(len(df))
-        position = 0
-        
-        close = df['Close'].values
-        sma = df['SMA'].values
-        lower = df['Lower'].values
-        
-        # Start after warmup period
-        for i in range(sma_window, len(df)):
-            # Skip if indicators are NaN
-            if np.isnan(sma[i]) or np.isnan(lower[i]):
-                signals[i] = 0
-                continue
-                
-            if position == 0:
-                # Entry: price below lower band
-                if close[i] < lower[i]:
-                    position = 1
-            elif position == 1:
-                # Exit: price back to mean
-                if close[i] >= sma[i]:
-                    position = 0
-            signals[i] = position
-            
-        df['Signal'] = signals
+        close = self._prices('Close')
+        sma = self._sma(sma_window)
+        std = self._indicator_columns('Std', [sma_window], rolling_std)[:, 0]
+        lower = sma - (std_dev * std)
         
-        # Avoid look-ahead: shift signal
-        df['Position'] = df['Signal'].shift(1).fillna(0)
-        df['Exec_Price'] = df['Open']
+        # State-based signal: enter below lower band, hold until Close >= SMA.
+        # Bars before sma_window or with NaN indicators hold no signal.
+        valid = ~np.isnan(sma) & ~np.isnan(lower) & (np.arange(len(close)) >= sma_window)
+        signal = latch(close < lower, close >= sma, valid).astype(float)
         
-        # Apply stop-loss and take-profit
-        df = self._apply_stop_loss_take_profit(df)
-        
-        # Handle last open position
-        df = self._close_last_position(df)
-        
-        self.trades = self._generate_trade_log(df)
-        
-        return self._calculate_returns(df)
+        return self._execute({'SMA': sma, 'Std': std, 'Lower': lower, 'Signal': signal}, signal, columns)
 
-    def run_rsi(self, rsi_period=14, oversold=30, overbought=70):
+    def run_rsi(self, rsi_period=14, oversold=30, overbought=70, columns=None):
         """
         RSI (Relative Strength Index) Strategy with proper execution lag.
         
@@ -216,201 +594,246 @@ class Backtester:
             rsi_period: Period for RSI calculation (default 14)
             oversold: Oversold threshold for entry (default 30)
             overbought: Overbought threshold for exit (default 70)
+            columns: Optional list of result columns to return (slim mode)
             
         Returns:
             DataFrame with signals, positions, returns, and equity curves
         """
-        df = self.data.copy()
-        
-        # Calculate RSI
-        delta = df['Close'].diff()
-        gain = (delta.where(delta > 0, 0)).rolling(window=rsi_period).mean()
-        loss = (-delta.where(delta < 0, 0)).rolling(window=rsi_period).mean()
-        
-        rs = gain / loss
-        df['RSI'] = 100 - (100 / (1 + rs))
-        
-        # State-based signal generation
-        signals = np.zeros(len(df))
-        position = 0
-        
-        rsi = df['RSI'].values
-        
-        # Start after warmup period
-        for i in range(rsi_period + 1, len(df)):
-            # Skip if RSI is NaN
-            if np.isnan(rsi[i]):
-                signals[i] = 0
-                continue
-                
-            if position == 0:
-                # Entry: RSI below oversold
-                if rsi[i] < oversold:
-                    position = 1
-            elif position == 1:
-                # Exit: RSI above overbought or back to neutral
-                if rsi[i] > overbought or rsi[i] > 50:
-                    position = 0
-            signals[i] = position
-            
-        df['Signal'] = signals
+        rsi_values = self._indicator_columns('RSI', [rsi_period], rsi)[:, 0]
         
-        # Avoid look-ahead: shift signal
-        df['Position'] = df['Signal'].shift(1).fillna(0)
-        df['Exec_Price'] = df['Open']
+        # State-based signal: enter below oversold, hold until RSI > overbought
+        # or back above neutral 50. Warmup bars and NaN RSI hold no signal.
+        valid = ~np.isnan(rsi_values) & (np.arange(len(rsi_values)) >= rsi_period + 1)
+        with np.errstate(invalid='ignore'):
+            entry = rsi_values < oversold
+            exit_ = (rsi_values > overbought) | (rsi_values > 50)
+        signal = latch(entry, exit_, valid).astype(float)
         
-        # Apply stop-loss and take-profit
-        df = self._apply_stop_loss_take_profit(df)
+        return self._execute({'RSI': rsi_values, 'Signal': signal}, signal, columns)
+
+    def _sma(self, window):
+        """Simple moving average of Close (cached)."""
+        return self._indicator_columns('SMA', [window], rolling_mean)[:, 0]
+
+    def run_momentum_grid(self, sma_windows):
+        """
+        Momentum Strategy over many SMA windows in one batched run.
+        
+        Every SMA is taken from the same prefix sums of Close, and positions,
+        SL/TP exits, costs and equity are computed as (bars x configs) matrices.
+        Column j matches run_momentum(sma_window=sma_windows[j]).
         
-        # Handle last open position
-        df = self._close_last_position(df)
+        Args:
+            sma_windows: Iterable of SMA windows (e.g., range(5, 301))
+            
+        Returns:
+            Dict of grid results (see _run_grid)
+        """
+        windows = np.asarray(list(sma_windows), dtype=np.int64)
+        close = self._prices('Close')
         
-        self.trades = self._generate_trade_log(df)
+        sma = self._indicator_columns('SMA', windows, rolling_mean)
+        signal = close[:, None] > sma
         
-        return self._calculate_returns(df)
+        return self._run_grid(signal, pd.DataFrame({'sma_window': windows}))
 
-    def _close_last_position(self, df):
+    def run_mean_reversion_grid(self, sma_windows, std_devs):
         """
-        Force close any open position at the end of the data.
+        Mean Reversion Strategy over the grid sma_windows x std_devs.
         
-        This ensures:
-        - Equity curve is complete
-        - Trade log includes the final trade
-        - No hanging positions
+        SMA and standard deviation are computed once per window; each band
+        width reuses them. Column order is window-major, as in itertools.product.
         
         Args:
-            df: DataFrame with Position column
+            sma_windows: Iterable of SMA windows for Bollinger Bands
+            std_devs: Iterable of standard deviation multipliers
             
         Returns:
-            DataFrame with last position closed
+            Dict of grid results (see _run_grid)
         """
-        # If last position is 1, set it to 0 to force close
-        if df['Position'].iloc[-1] == 1:
-            df.loc[df.index[-1], 'Position'] = 0
-            
-        return df
+        params = pd.DataFrame(list(itertools.product(sma_windows, std_devs)),
+                              columns=['sma_window', 'std_dev'])
+        windows, window_col = np.unique(params['sma_window'].to_numpy(dtype=np.int64), return_inverse=True)
+        close = self._prices('Close')
+        
+        sma = self._indicator_columns('SMA', windows, rolling_mean)[:, window_col]
+        std = self._indicator_columns('Std', windows, rolling_std)[:, window_col]
+        lower = sma - params['std_dev'].to_numpy(dtype=float)[None, :] * std
+        
+        # Loop in run_mean_reversion starts at bar sma_window
+        bars = np.arange(len(close))[:, None]
+        valid = ~np.isnan(sma) & ~np.isnan(lower) & (bars >= windows[window_col][None, :])
+        signal = latch(close[:, None] < lower, close[:, None] >= sma, valid)
+        
+        return self._run_grid(signal, params)
 
-    def _generate_trade_log(self, df):
+    def run_rsi_grid(self, rsi_periods, oversold_levels=(30,), overbought_levels=(70,)):
         """
-        Generate detailed trade log with entry/exit dates and P/L.
+        RSI Strategy over the grid rsi_periods x oversold_levels x overbought_levels.
+        
+        RSI is computed once per period; thresholds reuse it.
         
+        Args:
+            rsi_periods: Iterable of RSI periods
+            oversold_levels: Iterable of oversold entry thresholds
+            overbought_levels: Iterable of overbought exit thresholds
+            
         Returns:
-            DataFrame with columns: Entry_Date, Entry_Price, Exit_Date, Exit_Price, PnL, Return_Pct, Exit_Reason
+            Dict of grid results (see _run_grid)
         """
-        trades = []
-        position = df['Position'].values
-        dates = df.index
-        prices = df['Exec_Price'].values
-        exit_reasons = df['Exit_Reason'].values if 'Exit_Reason' in df.columns else ['Signal'] * len(df)
-        
-        in_trade = False
-        entry_date = None
-        entry_price = None
-        
-        for i in range(len(df)):
-            if pd.isna(position[i]):
-                continue
-                
-            # Entry: position goes from 0 to 1
-            if position[i] == 1 and not in_trade:
-                in_trade = True
-                entry_date = dates[i]
-                entry_price = prices[i]
-            
-            # Exit: position goes from 1 to 0
-            elif position[i] == 0 and in_trade:
-                in_trade = False
-                exit_date = dates[i]
-                exit_price = prices[i]
-                exit_reason = exit_reasons[i] if i < len(exit_reasons) else 'Signal'
-                
-                # Calculate P&L
-                # Number of shares = capital * position_size / entry_price
-                shares = (self.initial_capital * self.position_size) / entry_price
-                gross_pnl = (exit_price - entry_price) * shares
-                
-                # Transaction costs: entry + exit
-                cost = (self.initial_capital * self.position_size) * self.transaction_cost * 2
-                net_pnl = gross_pnl - cost
-                
-                # Return percentage (net of costs)
-                return_pct = (exit_price / entry_price - 1) - (self.transaction_cost * 2)
-                
-                trades.append({
-                    'Entry_Date': entry_date,
-                    'Entry_Price': entry_price,
-                    'Exit_Date': exit_date,
-                    'Exit_Price': exit_price,
-                    'PnL': net_pnl,
-                    'Return_Pct': return_pct,
-                    'Exit_Reason': exit_reason
-                })
-        
-        # Handle case where position is still open at end (shouldn't happen with _close_last_position)
-        if in_trade:
-            # Force close at last available price
-            exit_date = dates[-1]
-            exit_price = prices[-1]
-            
-            shares = self.initial_capital / entry_price
-            gross_pnl = (exit_price - entry_price) * shares
-            cost = self.initial_capital * self.transaction_cost * 2
-            net_pnl = gross_pnl - cost
-            return_pct = (exit_price / entry_price - 1) - (self.transaction_cost * 2)
-            
-            trades.append({
-                'Entry_Date': entry_date,
-                'Entry_Price': entry_price,
-                'Exit_Date': exit_date,
-                'Exit_Price': exit_price,
-                'PnL': net_pnl,
-                'Return_Pct': return_pct,
-                'Exit_Reason': 'End_of_Data'
-            })
-        
-        return pd.DataFrame(trades)
-
-    def _calculate_returns(self, df):
+        params = pd.DataFrame(list(itertools.product(rsi_periods, oversold_levels, overbought_levels)),
+                              columns=['rsi_period', 'oversold', 'overbought'])
+        periods, period_col = np.unique(params['rsi_period'].to_numpy(dtype=np.int64), return_inverse=True)
+        close = self._prices('Close')
+        
+        rsi_values = self._indicator_columns('RSI', periods, rsi)[:, period_col]
+        oversold = params['oversold'].to_numpy(dtype=float)[None, :]
+        overbought = params['overbought'].to_numpy(dtype=float)[None, :]
+        
+        # Loop in run_rsi starts at bar rsi_period + 1
+        bars = np.arange(len(close))[:, None]
+        valid = ~np.isnan(rsi_values) & (bars >= periods[period_col][None, :] + 1)
+        with np.errstate(invalid='ignore'):
+            entry = rsi_values < oversold
+            exit_ = (rsi_values > overbought) | (rsi_values > 50)
+        signal = latch(entry, exit_, valid)
+        
+        return self._run_grid(signal, params)
+
+    def _run_grid(self, signal, params):
         """
-        Calculate returns with consistent open-to-open basis.
+        Shared execution stage for the *_grid methods.
         
-        IMPORTANT: Both market and strategy returns use open-to-open basis
-        for internal consistency and fair comparison.
-        
-        Market Return: (Today's Open / Yesterday's Open) - 1 + Daily Dividend Yield
-        Strategy Return: Market Return * Position * Position_Size - Transaction Costs
+        Applies the same lag, SL/TP, forced final exit and open-to-open
+        return model as the single-config run_* methods, column-wise.
         
         Args:
-            df: DataFrame with Position and Open columns
+            signal: Boolean (bars x configs) signal matrix
+            params: DataFrame with one row per config column
             
         Returns:
-            DataFrame with Market_Return, Strategy_Return, and equity curves
+            Dict with:
+                Params: the params DataFrame
+                Index: the bar index of self.data
+                Position, Strategy_Return, Strategy_Equity: (bars x configs) arrays
+                Market_Return, Market_Equity: (bars,) arrays
+                Total_Trades: (configs,) number of trades per config
+        """
+        # Position today = Signal from yesterday
+        position = np.zeros(signal.shape, dtype=self.dtype)
+        position[1:] = signal[:-1]
+        open_ = self._prices('Open')
+        
+        position, _ = apply_stop_loss_take_profit(
+            position, open_, self._prices('Close'),
+            stop_loss=self.stop_loss, take_profit=self.take_profit, dtype=self.dtype
+        )
+        # Force close any position open on the last bar
+        position[-1] = 0
+        
+        returns = compute_returns(
+            open_, position,
+            initial_capital=self.initial_capital, transaction_cost=self.transaction_cost,
+            dividend_yield=self.dividend_yield, position_size=self.position_size,
+            periods_per_year=self.periods_per_year, dtype=self.dtype
+        )
+        
+        return {
+            'Params': params.reset_index(drop=True),
+            'Index': self.data.index,
+            'Position': position,
+            'Strategy_Return': returns['Strategy_Return'],
+            'Strategy_Equity': returns['Strategy_Equity'],
+            'Market_Return': returns['Market_Return'],
+            'Market_Equity': returns['Market_Equity'],
+            'Total_Trades': (np.diff(position, axis=0) == 1).sum(axis=0),
+        }
+
+    def _execute(self, indicators, signal, columns=None):
         """
-        # Market Returns: Open-to-Open + Dividend Yield
-        df['Market_Return'] = df['Open'].pct_change()
+        Shared execution stage for the single-config run_* methods.
         
-        # Add dividend yield (annualized, so divide by 252 trading days)
-        daily_dividend = self.dividend_yield / 252
-        df['Market_Return'] = df['Market_Return'] + daily_dividend
+        Steps (all on NumPy arrays, no copy of the OHLCV frame):
+        - Position today = Signal from yesterday (no look-ahead)
+        - Stop-loss / take-profit checked at each close
+        - Any position open on the last bar is force-closed
+        - Trade log and open-to-open returns
         
-        # Strategy Returns: Open-to-Open when in position, scaled by position size
-        # When Position = 1, we earn the market return * position_size
-        # When Position = 0, we earn 0
-        df['Strategy_Return'] = df['Market_Return'] * df['Position'] * self.position_size
+        Args:
+            indicators: Ordered dict of indicator arrays, ending with 'Signal'
+            signal: Signal array (1 = long, 0 = flat)
+            columns: None for the full result DataFrame (OHLCV plus every
+                column). Otherwise a list of column names: only those are
+                returned, nothing else is materialized, and Exit_Reason is a
+                Categorical (int8 codes into EXIT_REASONS). Use
+                Backtester.METRIC_COLUMNS for what the metrics functions need.
+            
+        Returns:
+            DataFrame indexed like self.data, with the input's fingerprint in
+            attrs['Data_Fingerprint']
+        """
+        if columns is not None:
+            unknown = [c for c in columns if c not in self.RESULT_COLUMNS + tuple(indicators)]
+            if unknown:
+                raise ValueError(f"Unknown result columns: {unknown}")
         
-        # Apply transaction costs ONLY on position changes
-        position_change = df['Position'].diff().abs().fillna(0)
-        df['Cost'] = position_change * self.transaction_cost * self.position_size
-        df['Strategy_Return'] = df['Strategy_Return'] - df['Cost']
+        open_ = self._prices('Open')
         
-        # Fill NaN returns with 0
-        df['Market_Return'] = df['Market_Return'].fillna(0)
-        df['Strategy_Return'] = df['Strategy_Return'].fillna(0)
+        # CRITICAL: Shift signal to avoid look-ahead bias
+        position = np.zeros(len(signal), dtype=self.dtype)
+        position[1:] = signal[:-1]
         
-        # Equity Curves
-        df['Market_Equity'] = self.initial_capital * (1 + df['Market_Return']).cumprod()
-        df['Strategy_Equity'] = self.initial_capital * (1 + df['Strategy_Return']).cumprod()
+        # Apply stop-loss and take-profit
+        position, reasons = apply_stop_loss_take_profit(
+            position, open_, self._prices('Close'),
+            stop_loss=self.stop_loss, take_profit=self.take_profit, dtype=self.dtype
+        )
+        
+        # Handle last open position: force close at end
+        if len(position) > 0 and position[-1] == 1:
+            position[-1] = 0
+        
+        # Generate trade log (executes at next day's open); trade PnL uses
+        # the float64 source prices whatever the engine dtype
+        trades = extract_trades(
+            position, self.data['Open'].values, self.data.index.values, reasons,
+            initial_capital=self.initial_capital, position_size=self.position_size,
+            transaction_cost=self.transaction_cost
+        )
+        self.trades = trades if self.trade_log_format == 'array' else trade_log_to_frame(trades)
+        
+        returns = compute_returns(
+            open_, position,
+            initial_capital=self.initial_capital, transaction_cost=self.transaction_cost,
+            dividend_yield=self.dividend_yield, position_size=self.position_size,
+            periods_per_year=self.periods_per_year, dtype=self.dtype
+        )
+        
+        if columns is None:
+            df = self.data.copy()
+            for name, values in indicators.items():
+                df[name] = values
+            df['Position'] = position
+            df['Exec_Price'] = df['Open']
+            df['Exit_Reason'] = EXIT_REASON_LABELS[reasons]
+            for name in ('Market_Return', 'Strategy_Return', 'Cost', 'Market_Equity', 'Strategy_Equity'):
+                df[name] = returns[name]
+            df.attrs['Data_Fingerprint'] = self.fingerprint
+            return df
         
+        # Input columns are copied so the result is editable and never
+        # aliases self.data; everything else is freshly computed
+        available = dict(indicators, Position=position, Exec_Price=open_.copy(), **returns)
+        result = {}
+        for name in columns:
+            if name == 'Exit_Reason':
+                result[name] = pd.Categorical.from_codes(reasons, categories=EXIT_REASONS)
+            elif name in available:
+                result[name] = available[name]
+            else:
+                result[name] = self.data[name].to_numpy(copy=True)
+        df = pd.DataFrame(result, index=self.data.index, copy=False)
+        df.attrs['Data_Fingerprint'] = self.fingerprint
         return df
 
     def save_trade_log(self, filepath='data/trades.csv'):
@@ -421,7 +844,10 @@ class Backtester:
             filepath: Path to save CSV file
         """
         if len(self.trades) > 0:
-            self.trades.to_csv(filepath, index=False)
+            trades = self.trades
+            if isinstance(trades, np.ndarray):
+                trades = trade_log_to_frame(trades)
+            trades.to_csv(filepath, index=False)
         else:
             # Create empty file with headers
             pd.DataFrame(columns=[
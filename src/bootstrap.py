@@ -0,0 +1,200 @@
+"""
+Bootstrap confidence intervals for strategy metrics.
+
+A backtest gives one Sharpe, CAGR and max drawdown from one path of
+returns. Resampling that path shows how much they move under other
+orderings and draws of the same daily returns:
+
+- 'iid': bars drawn independently with replacement
+- 'stationary': Politis-Romano stationary block bootstrap (blocks of
+  geometric length with mean `block_size`, wrapping around the end), which
+  keeps the volatility clustering and autocorrelation of daily returns
+
+Resampled paths are generated as (bars x resamples) index matrices and
+evaluated in chunks by path_metrics, a column-wise kernel restricted to
+the interval metrics, so each chunk is a handful of array operations.
+Every chunk draws from its own child of one SeedSequence, so results
+depend only on `seed` and `chunk_size`, not on the number of worker
+processes.
+"""
+
+import numpy as np
+import pandas as pd
+
+try:
+    from .analysis import run_configs
+    from .metrics import calculate_all_metrics
+except ImportError:
+    from analysis import run_configs
+    from metrics import calculate_all_metrics
+
+
+BOOTSTRAP_METHODS = ('iid', 'stationary')
+BOOTSTRAP_METRICS = ('CAGR', 'Sharpe', 'Sortino', 'Calmar', 'Max_Drawdown', 'Volatility')
+
+
+def resample_indices(n_bars, n_resamples, method='iid', block_size=None, rng=None):
+    """
+    Index matrix of bootstrap paths.
+
+    Args:
+        n_bars: Length of the return series
+        n_resamples: Number of resampled paths
+        method: 'iid' or 'stationary'
+        block_size: Mean block length for 'stationary' (default n_bars ** (1/3))
+        rng: np.random.Generator (default: a fresh unseeded one)
+
+    Returns:
+        (n_bars x n_resamples) integer array; column j is path j
+    """
+    if method not in BOOTSTRAP_METHODS:
+        raise ValueError(f"Unknown bootstrap method {method!r}; choose from {BOOTSTRAP_METHODS}")
+    rng = np.random.default_rng() if rng is None else rng
+    if method == 'iid':
+        return rng.integers(0, n_bars, size=(n_bars, n_resamples))
+
+    block_size = block_size or max(1.0, round(n_bars ** (1 / 3)))
+    if block_size < 1:
+        raise ValueError(f"block_size must be at least 1, got {block_size}")
+    # A new block starts with probability 1/block_size; otherwise the path
+    # continues from the previous bar's successor
+    starts = rng.random((n_bars, n_resamples)) < 1.0 / block_size
+    starts[0] = True
+    start_at = rng.integers(0, n_bars, size=(n_bars, n_resamples))
+
+    rows = np.arange(n_bars)[:, None]
+    block_row = np.maximum.accumulate(np.where(starts, rows, 0), axis=0)
+    first = np.take_along_axis(start_at, block_row, axis=0)
+    return (first + (rows - block_row)) % n_bars
+
+
+def path_metrics(paths, days, risk_free_rate=0.06, periods_per_year=252):
+    """
+    BOOTSTRAP_METRICS for every column of a (bars x paths) return matrix.
+
+    The calculate_all_metrics definitions, restricted to what the intervals
+    need so a chunk costs about ten array passes. Paths have no NaNs and
+    their equity is the compounded return itself.
+
+    Returns:
+        Dict of metric -> array with one value per path
+    """
+    n = len(paths)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mean = paths.mean(axis=0)
+        volatility = paths.std(axis=0, ddof=1) * np.sqrt(periods_per_year)
+        excess_return = mean * periods_per_year - risk_free_rate
+        sharpe = excess_return / volatility
+
+        negative = paths < 0
+        n_neg = negative.sum(axis=0)
+        downside = np.where(negative, paths, 0.0)
+        neg_mean = downside.sum(axis=0) / n_neg
+        neg_var = (np.where(negative, downside - neg_mean, 0.0) ** 2).sum(axis=0) / (n_neg - 1)
+        sortino = excess_return / (np.sqrt(neg_var) * np.sqrt(periods_per_year))
+
+        cum_ret = np.cumprod(1 + paths, axis=0)
+        max_drawdown = (cum_ret / np.maximum.accumulate(cum_ret, axis=0)).min(axis=0) - 1
+        total_return = cum_ret[-1] / cum_ret[0] - 1
+        cagr = (1 + total_return) ** (365.0 / days) - 1 if days != 0 else np.zeros(paths.shape[1])
+        calmar = cagr / np.abs(max_drawdown)
+
+    metrics = {
+        'CAGR': cagr,
+        'Sharpe': sharpe,
+        'Sortino': sortino,
+        'Calmar': calmar,
+        'Max_Drawdown': max_drawdown,
+        'Volatility': volatility if n > 1 else np.full(paths.shape[1], np.nan)
+    }
+    for key in ('Sharpe', 'Sortino', 'Calmar'):
+        metrics[key] = np.where(np.isfinite(metrics[key]), metrics[key], 0.0)
+    return metrics
+
+
+def _bootstrap_chunk(datasets, task):
+    """Metrics of one chunk of resampled paths (run_configs task)."""
+    seed, n_resamples = task
+    returns = datasets['returns']
+    settings = datasets['settings']
+
+    rng = np.random.default_rng(seed)
+    paths = returns[resample_indices(len(returns), n_resamples, settings['method'],
+                                     settings['block_size'], rng)]
+    return path_metrics(paths, settings['days'], risk_free_rate=settings['risk_free_rate'],
+                        periods_per_year=settings['periods_per_year'])
+
+
+def bootstrap_samples(df, n_resamples=10_000, method='iid', block_size=None, seed=None,
+                      chunk_size=500, workers=None, risk_free_rate=0.06, periods_per_year=252):
+    """
+    Metrics of every bootstrap path.
+
+    Args:
+        df: DataFrame with Strategy_Return (a Backtester result)
+        n_resamples: Number of resampled paths
+        method: 'iid' or 'stationary'
+        block_size: Mean block length for 'stationary' (default bars ** (1/3))
+        seed: Seed for reproducible draws (None for fresh entropy)
+        chunk_size: Paths evaluated per array batch (bounds memory at about
+            bars x chunk_size x 8 bytes per temporary)
+        workers: Process-pool size for the chunks; None or 1 runs
+            in-process, 0 uses os.cpu_count()
+        risk_free_rate: Annual risk-free rate
+        periods_per_year: Bars per year used for annualization
+
+    Returns:
+        DataFrame with one row per resample and the BOOTSTRAP_METRICS columns
+    """
+    returns = df['Strategy_Return'].dropna().to_numpy(dtype=np.float64)
+    if len(returns) == 0:
+        raise ValueError("No returns to resample")
+
+    sizes = [chunk_size] * (n_resamples // chunk_size)
+    if n_resamples % chunk_size:
+        sizes.append(n_resamples % chunk_size)
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+
+    datasets = {
+        'returns': returns,
+        'settings': {
+            'method': method,
+            'block_size': block_size,
+            'days': (df.index[-1] - df.index[0]).days,
+            'risk_free_rate': risk_free_rate,
+            'periods_per_year': periods_per_year,
+        }
+    }
+    chunks = run_configs(_bootstrap_chunk, list(zip(seeds, sizes)), datasets, workers=workers)
+    return pd.DataFrame({key: np.concatenate([chunk[key] for chunk in chunks])
+                         for key in BOOTSTRAP_METRICS})
+
+
+def bootstrap_confidence_intervals(df, n_resamples=10_000, method='iid', confidence_level=0.95,
+                                   block_size=None, seed=None, chunk_size=500, workers=None,
+                                   risk_free_rate=0.06, periods_per_year=252):
+    """
+    Percentile bootstrap confidence intervals for the main metrics.
+
+    Args:
+        df: DataFrame with Strategy_Return and Strategy_Equity (a Backtester result)
+        confidence_level: Two-sided interval coverage (default 95%)
+        n_resamples, method, block_size, seed, chunk_size, workers,
+        risk_free_rate, periods_per_year: as in bootstrap_samples
+
+    Returns:
+        DataFrame indexed by metric with Estimate (calculate_all_metrics on
+        the actual path), Lower, Upper and Std_Error
+    """
+    samples = bootstrap_samples(df, n_resamples=n_resamples, method=method, block_size=block_size,
+                                seed=seed, chunk_size=chunk_size, workers=workers,
+                                risk_free_rate=risk_free_rate, periods_per_year=periods_per_year)
+    estimate = calculate_all_metrics(df, risk_free_rate=risk_free_rate, periods_per_year=periods_per_year)
+
+    alpha = (1 - confidence_level) / 2
+    return pd.DataFrame({
+        'Estimate': [estimate[key] for key in BOOTSTRAP_METRICS],
+        'Lower': samples.quantile(alpha).values,
+        'Upper': samples.quantile(1 - alpha).values,
+        'Std_Error': samples.std().values
+    }, index=pd.Index(BOOTSTRAP_METRICS, name='Metric'))
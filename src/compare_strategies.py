@@ -3,17 +3,32 @@ Multi-Strategy Comparison Script
 Generates comprehensive comparison across all strategy configurations.
 """
 
+import argparse
 import sys
 import os
 sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
 
 from data_loader import fetch_data
-from analysis import multi_strategy_comparison, split_data
+from analysis import multi_strategy_comparison, split_data, run_configs
 from backtester import Backtester
 from metrics import calculate_advanced_metrics, calculate_trade_metrics
 import pandas as pd
 
+
+def evaluate_split(datasets, task):
+    """Run one (method, params, split) task and return its headline metrics."""
+    method, params, split = task
+    bt = Backtester(datasets[split])
+    result = getattr(bt, method)(**params, columns=Backtester.METRIC_COLUMNS)
+    return calculate_advanced_metrics(result)
+
+
 def main():
+    parser = argparse.ArgumentParser(description='Multi-strategy and train/test comparison')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='Worker processes for config evaluation (0 = all cores)')
+    args = parser.parse_args()
+
     print("Loading NIFTY 50 data...")
     df = fetch_data()
     
@@ -21,7 +36,7 @@ def main():
     print("FULL PERIOD ANALYSIS (2015-2023)")
     print("="*80)
     
-    comparison_df = multi_strategy_comparison(df)
+    comparison_df = multi_strategy_comparison(df, workers=args.workers)
     print(comparison_df.to_string(index=False))
     
     # Save to CSV
@@ -46,18 +61,14 @@ def main():
         ("RSI", "run_rsi", {"rsi_period": 14, "oversold": 30, "overbought": 70})
     ]
     
+    tasks = [(method, params, split) for _, method, params in configs for split in ('train', 'test')]
+    split_metrics = run_configs(evaluate_split, tasks, {'train': train_df, 'test': test_df},
+                                workers=args.workers)
+    
     results = []
     
-    for name, method, params in configs:
-        # Train
-        bt_train = Backtester(train_df)
-        res_train = getattr(bt_train, method)(**params)
-        metrics_train = calculate_advanced_metrics(res_train)
-        
-        # Test
-        bt_test = Backtester(test_df)
-        res_test = getattr(bt_test, method)(**params)
-        metrics_test = calculate_advanced_metrics(res_test)
+    for i, (name, method, params) in enumerate(configs):
+        metrics_train, metrics_test = split_metrics[2 * i], split_metrics[2 * i + 1]
         
         results.append({
             "Strategy": name,
@@ -0,0 +1,164 @@
+"""
+Source validation for caches derived from CSV price files.
+
+A cache built from a CSV (e.g. the memory-mapped OHLCV store,
+data/raw_nifty.csv -> data/raw_nifty.ohlcv) keeps a JSON sidecar next to
+it, data/raw_nifty.ohlcv.json, with the CSV's mtime, size and hash.
+
+The cache is rebuilt when the CSV changes. The mtime/size check is free;
+the content hash is only computed when they differ, so a `touch` or a fresh
+git checkout re-validates the cache instead of rebuilding it.
+
+dataset_fingerprint identifies a loaded frame by content (also exported by
+data_loader) and keys every cache derived from it.
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+CACHE_VERSION = 2
+
+
+def file_hash(path, chunk_size=1 << 20):
+    """blake2b hex digest of a file's bytes."""
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(chunk_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def dataset_fingerprint(data):
+    """
+    Content fingerprint of a loaded OHLCV DataFrame.
+
+    Hashes the date range and row count, then the raw bytes of the index
+    and of every column. Numeric columns are hashed as float64 and dates as
+    datetime64[ns], so the same bars share a fingerprint whether Volume
+    was loaded as integers (CSV, store) or floats (e.g. a provider). Use it as the key
+    of anything derived from the data (indicators, results, plots).
+
+    Args:
+        data: DataFrame (typically OHLCV with a DatetimeIndex)
+
+    Returns:
+        Hex digest string
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    index = data.index
+    if isinstance(index, pd.DatetimeIndex):
+        stamps = np.ascontiguousarray(index.values.astype('datetime64[ns]'))
+        first, last = (str(stamps[0]), str(stamps[-1])) if len(stamps) else ('', '')
+        digest.update(f"{first}|{last}|{len(stamps)}".encode())
+        digest.update(stamps.view(np.uint8))
+    elif index.dtype.kind in 'iuf':
+        digest.update(np.ascontiguousarray(index.values, dtype=np.float64).view(np.uint8))
+    else:
+        digest.update(repr(list(index)).encode())
+    for column in data.columns:
+        values = data[column].values
+        digest.update(str(column).encode())
+        if values.dtype.kind in 'iufb':
+            digest.update(np.ascontiguousarray(values, dtype=np.float64).view(np.uint8))
+        else:
+            digest.update(repr(values.tolist()).encode())
+    return digest.hexdigest()
+
+
+def cache_paths(csv_path, fmt):
+    """Return (data_path, meta_path) of the `fmt` cache for a CSV."""
+    stem = os.path.splitext(csv_path)[0]
+    return f"{stem}.{fmt}", f"{stem}.{fmt}.json"
+
+
+def atomic_write(path, write):
+    """
+    Write a file via a temp file in the same directory and os.replace.
+
+    Readers never see a partially written file.
+
+    Args:
+        path: Destination path
+        write: Callable taking the temp path and writing the content there
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.tmp-', suffix=os.path.splitext(path)[1])
+    os.close(fd)
+    try:
+        write(tmp_path)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def _read_meta(meta_path):
+    try:
+        with open(meta_path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_meta(meta_path, meta):
+    def write(path):
+        with open(path, 'w') as f:
+            json.dump(meta, f, indent=2)
+    atomic_write(meta_path, write)
+
+
+def cached_meta(csv_path, fmt):
+    """
+    Sidecar metadata of a cache that still matches its CSV, else None.
+
+    A changed mtime with unchanged size and content hash re-validates the
+    cache (and records the new mtime) instead of invalidating it.
+    """
+    data_path, meta_path = cache_paths(csv_path, fmt)
+    meta = _read_meta(meta_path)
+    if (meta is None or meta.get('version') != CACHE_VERSION or meta.get('format') != fmt
+            or not os.path.exists(data_path)):
+        return None
+
+    stat = os.stat(csv_path)
+    if meta['mtime_ns'] == stat.st_mtime_ns and meta['size'] == stat.st_size:
+        return meta
+    if meta['size'] == stat.st_size and meta['hash'] == file_hash(csv_path):
+        meta['mtime_ns'] = stat.st_mtime_ns
+        try:
+            _write_meta(meta_path, meta)
+        except OSError:
+            pass
+        return meta
+    return None
+
+
+def record_source(csv_path, fmt, stat=None, **fields):
+    """
+    Write the sidecar for a freshly built cache of csv_path.
+
+    Args:
+        csv_path: Source CSV
+        fmt: Cache format
+        stat: os.stat of the CSV taken before it was read, so a write that
+            races with the build invalidates the cache on the next load
+        **fields: Extra format-specific metadata
+    """
+    stat = stat if stat is not None else os.stat(csv_path)
+    meta = {
+        'version': CACHE_VERSION,
+        'format': fmt,
+        'mtime_ns': stat.st_mtime_ns,
+        'size': stat.st_size,
+        'hash': file_hash(csv_path),
+        **fields
+    }
+    _write_meta(cache_paths(csv_path, fmt)[1], meta)
+    return meta
+
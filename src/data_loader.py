@@ -1,42 +1,350 @@
-import yfinance as yf
+import numpy as np
 import pandas as pd
 import os
+import shutil
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
+try:
+    from .data_cache import atomic_write, dataset_fingerprint, record_source
+    from .ohlcv_store import (STORE_FORMAT, OHLCVStore, append_store, load_store_cached, open_store,
+                              write_store)
+    from .providers import OHLCV_COLUMNS, YFinanceProvider
+except ImportError:
+    from data_cache import atomic_write, dataset_fingerprint, record_source
+    from ohlcv_store import (STORE_FORMAT, OHLCVStore, append_store, load_store_cached, open_store,
+                             write_store)
+    from providers import OHLCV_COLUMNS, YFinanceProvider
+
 DATA_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'data', 'raw_nifty.csv')
+SYMBOLS_DIR = os.path.join(os.path.dirname(DATA_PATH), 'symbols')
+TIMEFRAME_DIR = os.path.join(os.path.dirname(DATA_PATH), 'timeframes')
+# Resampled stores kept per cache directory; older ones are deleted on write
+TIMEFRAME_CACHE_FILES = 16
+
+# Derived timeframes: pandas period alias and bars per year
+TIMEFRAMES = {'D': None, 'W': 'W', 'M': 'M', 'Q': 'Q'}
+PERIODS_PER_YEAR = {'D': 252, 'W': 52, 'M': 12, 'Q': 4}
 
-def fetch_data(ticker='^NSEI', start_date='2015-01-01', end_date=None):
+def fetch_data(ticker='^NSEI', start_date='2015-01-01', end_date=None, refresh=False,
+               provider=None, data_path=DATA_PATH):
     """
-    Fetches data from yfinance or loads from local CSV if it exists.
+    Fetches data from the provider (yfinance by default) or loads from local CSV if it exists.
     If end_date is None, defaults to today's date for real-time data.
+    The local CSV is served from a memory-mapped store (see ohlcv_store),
+    rebuilt automatically whenever the CSV changes; the date range is a
+    zero-copy slice of the mapping, so processes share one physical copy.
+    Rows of a hand-edited CSV are sorted by date and repeated dates keep
+    their last row.
+    With refresh=True, bars missing after the last cached date are fetched
+    and appended first (see refresh_tail).
     """
     # Default to today if not specified
     if end_date is None:
         end_date = datetime.today().strftime('%Y-%m-%d')
-    if os.path.exists(DATA_PATH):
-        print(f"Loading data from {DATA_PATH}")
-        df = pd.read_csv(DATA_PATH, index_col=0, parse_dates=True)
-        # Filter by date just in case the cached file has different range
-        df = df[(df.index >= start_date) & (df.index <= end_date)]
-        return df
-    
+    if provider is None:
+        provider = YFinanceProvider()
+    if os.path.exists(data_path):
+        if refresh:
+            refresh_tail(ticker, end_date, provider, data_path)
+        print(f"Loading data from {data_path}")
+        # Slice by date just in case the cached file has different range
+        return load_store_cached(data_path).frame(start_date, end_date)
+
     print(f"Downloading data for {ticker}...")
-    df = yf.download(ticker, start=start_date, end=end_date)
-    
+    df = provider.fetch(ticker, start_date, end_date)
+
     if df.empty:
         raise ValueError(f"No data found for {ticker}")
 
-    # Ensure we have a flat index if MultiIndex is returned (common with new yfinance)
-    if isinstance(df.columns, pd.MultiIndex):
-        df.columns = df.columns.get_level_values(0)
-        
     # Keep only necessary columns
-    df = df[['Open', 'High', 'Low', 'Close', 'Volume']]
-    
+    df = df[OHLCV_COLUMNS]
+
     # Save to CSV
-    df.to_csv(DATA_PATH)
+    atomic_write(data_path, df.to_csv)
     return df
 
+def refresh_tail(ticker, end_date, provider, data_path=DATA_PATH):
+    """
+    Fetch only the bars after the last cached date and append them.
+
+    The CSV and the memory-mapped store are each replaced atomically (temp
+    file + os.replace), so concurrent readers never see a partial update.
+
+    Returns:
+        Number of bars appended
+    """
+    store = load_store_cached(data_path)
+    last = store.last_date
+    start = last + pd.Timedelta(days=1) if last is not None else None
+    if start is not None and start > pd.Timestamp(end_date):
+        return 0
+
+    tail = provider.fetch(ticker, start, end_date)
+    if last is not None:
+        tail = tail[tail.index > last]
+    if tail.empty:
+        return 0
+    tail = tail[OHLCV_COLUMNS]
+    print(f"Appending {len(tail)} new bars for {ticker}")
+
+    def write_csv(tmp_path):
+        shutil.copyfile(data_path, tmp_path)
+        with open(tmp_path, 'rb') as f:
+            f.seek(0, os.SEEK_END)
+            needs_newline = f.tell() > 0
+            if needs_newline:
+                f.seek(-1, os.SEEK_END)
+                needs_newline = f.read(1) != b'\n'
+        with open(tmp_path, 'a') as f:
+            if needs_newline:
+                f.write('\n')
+            tail.to_csv(f, header=False)
+    atomic_write(data_path, write_csv)
+
+    # Append to the store and mark it fresh for the new CSV (no rebuild)
+    stat = os.stat(data_path)
+    append_store(store.path, tail)
+    record_source(data_path, STORE_FORMAT, stat=stat)
+    return len(tail)
+
+def fetch_many(tickers, start_date='2015-01-01', end_date=None, provider=None, max_workers=8,
+               retries=3, backoff=1.0, cache_dir=SYMBOLS_DIR, on_error='raise'):
+    """
+    Load many tickers concurrently and return an aligned panel.
+
+    Each ticker goes through fetch_data with its own cache file
+    (<cache_dir>/<ticker>.csv plus its memory-mapped store), so a rerun only
+    fetches missing tails. Provider calls run on a bounded thread pool and
+    failures are retried with exponential backoff (backoff, 2*backoff, ...).
+
+    Args:
+        tickers: List of symbols
+        start_date, end_date: Date range (end_date None = today)
+        provider: DataProvider (default YFinanceProvider)
+        max_workers: Maximum concurrent provider calls
+        retries: Attempts per ticker after the first failure
+        backoff: Initial retry delay in seconds
+        cache_dir: Directory of per-ticker caches
+        on_error: 'raise' to fail if any ticker fails after retries,
+            'skip' to leave it out of the panel
+
+    Returns:
+        DataFrame with (field, symbol) MultiIndex columns on the union of
+        dates (NaN where a symbol has no bar), ready for PanelBacktester
+    """
+    if on_error not in ('raise', 'skip'):
+        raise ValueError(f"on_error must be 'raise' or 'skip', got {on_error!r}")
+    if end_date is None:
+        end_date = datetime.today().strftime('%Y-%m-%d')
+    if provider is None:
+        provider = YFinanceProvider()
+    os.makedirs(cache_dir, exist_ok=True)
+
+    def load(ticker):
+        path = os.path.join(cache_dir, f"{ticker.replace(os.sep, '_')}.csv")
+        for attempt in range(retries + 1):
+            try:
+                return fetch_data(ticker, start_date, end_date, refresh=True,
+                                  provider=provider, data_path=path)
+            except Exception as e:
+                if attempt == retries:
+                    return e
+                time.sleep(backoff * 2 ** attempt)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        results = dict(zip(tickers, pool.map(load, tickers)))
+
+    failed = {ticker: result for ticker, result in results.items() if isinstance(result, Exception)}
+    if failed and on_error == 'raise':
+        raise RuntimeError(f"Failed to load {sorted(failed)}: {next(iter(failed.values()))!r}")
+    for ticker, error in failed.items():
+        print(f"Skipping {ticker}: {error!r}")
+
+    frames = {ticker: df for ticker, df in results.items() if ticker not in failed}
+    return pd.concat({field: pd.DataFrame({ticker: df[field] for ticker, df in frames.items()})
+                      for field in OHLCV_COLUMNS}, axis=1)
+
+def _runs(keys):
+    """First and last positions of each run of equal keys."""
+    starts = np.flatnonzero(np.append(True, keys[1:] != keys[:-1]))
+    return starts, np.append(starts[1:], len(keys)) - 1
+
+def _aggregate_bars(keys, open_, high, low, close, volume):
+    """OHLCV per run of equal bar keys (keys sorted), as (keys, o, h, l, c, v) arrays."""
+    starts, ends = _runs(keys)
+    return (keys[starts], open_[starts], np.maximum.reduceat(high, starts),
+            np.minimum.reduceat(low, starts), close[ends], np.add.reduceat(volume, starts))
+
+def ingest_ticks(csv_path, store_path, freq='1D', chunksize=1_000_000, time_col=None,
+                 price_col='Price', volume_col='Volume'):
+    """
+    Aggregate a tick or minute-bar CSV into OHLCV bars in an OHLCV store.
+
+    The CSV is read `chunksize` rows at a time, so raw ticks are never held
+    in memory in full; only the (much smaller) bars are. The last bar of each
+    chunk may continue in the next one, so it is carried over and merged
+    instead of being emitted. Rows must be in time order.
+
+    Input is either ticks (a price column and optional volume column) or
+    bars (Open/High/Low/Close and optional Volume columns), e.g. 1-minute
+    bars to be rolled up to daily. Rows with non-finite prices are skipped
+    and buckets without any rows produce no bar.
+
+    Args:
+        csv_path: Source CSV
+        store_path: Destination store file (see ohlcv_store)
+        freq: Bar size as a pandas frequency, e.g. '1D' or '5min'
+        chunksize: Rows read per chunk
+        time_col: Timestamp column (default: the first column)
+        price_col: Trade price column for tick input
+        volume_col: Traded quantity column for tick input
+
+    Returns:
+        OHLCVStore of the bars, e.g. store.frame(start, end) for Backtester
+    """
+    header = pd.read_csv(csv_path, nrows=0).columns
+    time_col = header[0] if time_col is None else time_col
+    is_bars = all(column in header for column in OHLCV_COLUMNS[:4])
+    if not is_bars and price_col not in header:
+        raise ValueError(f"{csv_path} has neither OHLC columns nor a '{price_col}' column")
+    volume_col = 'Volume' if is_bars else volume_col
+    price_cols = OHLCV_COLUMNS[:4] if is_bars else [price_col]
+    usecols = [time_col, *price_cols] + ([volume_col] if volume_col in header else [])
+
+    bars = []
+    pending = None
+    last_time = None
+    for chunk in pd.read_csv(csv_path, usecols=usecols, chunksize=chunksize):
+        times = pd.DatetimeIndex(pd.to_datetime(chunk[time_col]))
+        stamps = times.values
+        if (stamps[1:] < stamps[:-1]).any() or (last_time is not None and len(stamps) and stamps[0] < last_time):
+            raise ValueError(f"{csv_path} is not in time order")
+        if len(stamps):
+            last_time = stamps[-1]
+
+        prices = [chunk[column].to_numpy(dtype=np.float64) for column in price_cols]
+        if not is_bars:
+            prices = prices * 4
+        volume = (np.nan_to_num(chunk[volume_col].to_numpy(dtype=np.float64)) if volume_col in chunk.columns
+                  else np.zeros(len(chunk)))
+        valid = np.isfinite(sum(prices))
+        keys = times.floor(freq).values
+        if not valid.all():
+            keys = keys[valid]
+            prices = [values[valid] for values in prices]
+            volume = volume[valid]
+        if len(keys) == 0:
+            continue
+
+        chunk_bars = list(_aggregate_bars(keys, *prices, volume))
+        if pending is not None:
+            if chunk_bars[0][0] == pending[0]:
+                # The carried bar continues in this chunk: merge into its first bar
+                chunk_bars[1][0] = pending[1]
+                chunk_bars[2][0] = max(chunk_bars[2][0], pending[2])
+                chunk_bars[3][0] = min(chunk_bars[3][0], pending[3])
+                chunk_bars[5][0] += pending[5]
+            else:
+                bars.append([np.array([value]) for value in pending])
+        # Hold back the last (possibly partial) bar
+        pending = [values[-1] for values in chunk_bars]
+        bars.append([values[:-1] for values in chunk_bars])
+
+    if pending is None:
+        raise ValueError(f"No valid rows in {csv_path}")
+    bars.append([np.array([value]) for value in pending])
+    keys, *columns = (np.concatenate(parts) for parts in zip(*bars))
+    df = pd.DataFrame(dict(zip(OHLCV_COLUMNS, columns)), index=pd.DatetimeIndex(keys, name='Date'))
+    write_store(df, store_path)
+    return OHLCVStore(store_path)
+
+def resample_ohlcv(df, timeframe):
+    """
+    Aggregate daily bars into weekly ('W'), monthly ('M') or quarterly ('Q') bars.
+
+    Each bar is labelled with the date of its last daily bar (not the
+    calendar period end), so labels are real trading days and the last,
+    possibly incomplete, period never carries a future date.
+
+    Args:
+        df: Daily OHLCV DataFrame with a sorted DatetimeIndex
+        timeframe: One of TIMEFRAMES
+
+    Returns:
+        DataFrame with the OHLCV columns present in df
+    """
+    if timeframe not in TIMEFRAMES:
+        raise ValueError(f"timeframe must be one of {list(TIMEFRAMES)}, got {timeframe!r}")
+    columns = [column for column in OHLCV_COLUMNS if column in df.columns]
+    if timeframe == 'D' or df.empty:
+        return df[columns]
+    starts, ends = _runs(df.index.to_period(TIMEFRAMES[timeframe]).asi8)
+    reducers = {'Open': lambda v: v[starts], 'High': lambda v: np.maximum.reduceat(v, starts),
+                'Low': lambda v: np.minimum.reduceat(v, starts), 'Close': lambda v: v[ends],
+                'Volume': lambda v: np.add.reduceat(v, starts)}
+
+    def values(column):
+        # Prices aggregate in float64; an integer Volume stays integer
+        return df[column].to_numpy(dtype=None if df[column].dtype.kind in 'iu' else np.float64)
+
+    return pd.DataFrame({column: reducers[column](values(column)) for column in columns}, index=df.index[ends])
+
+def _prune_timeframes(cache_dir, keep=TIMEFRAME_CACHE_FILES):
+    """Delete all but the `keep` most recently written timeframe stores in cache_dir."""
+    paths = [os.path.join(cache_dir, name) for name in os.listdir(cache_dir)
+             if name.endswith('.ohlcv') and not name.startswith('.')]
+    if len(paths) <= keep:
+        return
+    paths.sort(key=os.path.getmtime, reverse=True)
+    for path in paths[keep:]:
+        try:
+            os.remove(path)
+        except OSError:
+            # Already removed by another process, or still mapped on Windows
+            pass
+
+def load_timeframe(df, timeframe, cache_dir=TIMEFRAME_DIR):
+    """
+    Weekly/monthly/quarterly bars for a daily frame, computed once per dataset.
+
+    Resampled bars are stored as OHLCV store files named by the daily
+    frame's fingerprint (<cache_dir>/<fingerprint>.<timeframe>.ohlcv), so
+    every later run on the same data, in any process, maps the stored bars
+    instead of resampling again. Changed data has a new fingerprint and
+    therefore never reads stale bars; each write keeps only the
+    TIMEFRAME_CACHE_FILES newest stores, so old fingerprints do not pile up.
+
+    Args:
+        df: Daily OHLCV DataFrame
+        timeframe: One of TIMEFRAMES ('D' returns df unchanged)
+        cache_dir: Directory of the resampled stores, or None to resample
+            in memory without touching the disk
+
+    Returns:
+        DataFrame of bars for the timeframe
+    """
+    if timeframe == 'D':
+        return df
+    if timeframe not in TIMEFRAMES:
+        raise ValueError(f"timeframe must be one of {list(TIMEFRAMES)}, got {timeframe!r}")
+    if cache_dir is None:
+        return resample_ohlcv(df, timeframe)
+    path = os.path.join(cache_dir, f"{dataset_fingerprint(df)}.{timeframe}.ohlcv")
+    store = open_store(path)
+    if store is None:
+        bars = resample_ohlcv(df, timeframe)
+        try:
+            os.makedirs(cache_dir, exist_ok=True)
+            write_store(bars, path)
+            _prune_timeframes(cache_dir)
+        except OSError:
+            # Read-only location: serve the bars without caching them
+            return bars
+        store = OHLCVStore(path)
+    return store.frame()
+
 if __name__ == "__main__":
     df = fetch_data()
     print(df.head())
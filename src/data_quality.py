@@ -0,0 +1,259 @@
+"""
+Data-quality pre-stage for OHLCV input.
+
+clean_ohlcv detects and repairs the common problems in raw price files with
+whole-column NumPy operations (no per-row loops), and returns a report of
+every change so nothing is fixed silently:
+
+- Non-monotonic index: rows are stably sorted by date
+- Duplicate dates: the last row for a date wins (latest revision)
+- Zero, negative or non-finite prices: treated as missing
+- Missing prices: forward-filled from the previous bar; leading rows that
+  cannot be filled are dropped; missing Volume becomes 0
+- High < Low: the two are swapped; High/Low are then widened to contain
+  Open and Close
+- Gaps: runs of missing weekdays longer than `max_gap_days` are reported
+  (exchange holidays are 1-2 days); with fill_gaps=True every missing
+  weekday is inserted as a flat bar carrying the previous Close
+
+Clean input is returned unchanged (same object, no copy).
+"""
+
+import numpy as np
+import pandas as pd
+
+
+PRICE_COLUMNS = ['Open', 'High', 'Low', 'Close']
+
+
+def _ffill(values, holes):
+    """
+    Forward-fill the `holes` positions (sorted) of a float array in place
+    from the previous valid value; a leading run of holes becomes NaN.
+
+    Returns:
+        Length of that leading run (rows with nothing to fill from)
+    """
+    # Every run of consecutive holes fills from the bar before its first hole
+    run_start = np.diff(holes, prepend=-2) != 1
+    source = holes[np.maximum.accumulate(np.where(run_start, np.arange(len(holes)), 0))] - 1
+    leading = source < 0
+    values[holes] = values[np.maximum(source, 0)]
+    values[holes[leading]] = np.nan
+    return int(np.count_nonzero(leading))
+
+
+def _missing_weekdays(stamps):
+    """
+    Bars followed by missing weekdays in sorted datetime64 stamps.
+
+    Returns:
+        (positions, counts): each such bar's position and its run length
+    """
+    if len(stamps) < 2:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+    # Only bars more than a day apart can have a whole weekday between them
+    day = np.timedelta64(1, 'D') // np.timedelta64(1, np.datetime_data(stamps.dtype)[0])
+    jumps = np.flatnonzero(np.diff(stamps.view(np.int64)) > day)
+    days = stamps[jumps].astype('datetime64[D]')
+    counts = np.busday_count(days + 1, stamps[jumps + 1].astype('datetime64[D]'))
+    skipped = counts > 0
+    return jumps[skipped], counts[skipped]
+
+
+def find_gaps(index, max_gap_days=3):
+    """
+    Missing-weekday runs between consecutive bars.
+
+    Args:
+        index: Sorted DatetimeIndex (or datetime64 array)
+        max_gap_days: Runs of more missing weekdays than this count as gaps
+
+    Returns:
+        (missing, gap_starts): missing weekdays after each bar (int array,
+        one shorter than index) and the positions whose run exceeds the limit
+    """
+    stamps = np.asarray(index)
+    positions, counts = _missing_weekdays(stamps)
+    missing = np.zeros(max(len(stamps) - 1, 0), dtype=np.int64)
+    missing[positions] = counts
+    return missing, positions[counts > max_gap_days]
+
+
+def clean_ohlcv(df, fill_gaps=False, max_gap_days=3):
+    """
+    Validate and repair an OHLCV DataFrame.
+
+    Args:
+        df: DataFrame with a DatetimeIndex and Open/High/Low/Close (Volume optional)
+        fill_gaps: Insert flat bars for missing weekdays
+        max_gap_days: Missing-weekday runs above this are reported as gaps
+
+    Returns:
+        (clean_df, report): report is a dict of counts keyed like
+        Unsorted_Rows, Duplicate_Dates, Invalid_Prices, Missing_Prices,
+        Rows_Dropped, High_Low_Swapped, OHLC_Bounds_Fixed, Gaps,
+        Largest_Gap_Days, Bars_Inserted, plus Rows_In and Rows_Out
+    """
+    missing_cols = [column for column in PRICE_COLUMNS if column not in df.columns]
+    if missing_cols:
+        raise ValueError(f"Missing required columns: {missing_cols}")
+    if not isinstance(df.index, pd.DatetimeIndex):
+        raise ValueError("Data must have a DatetimeIndex")
+
+    report = dict.fromkeys(['Unsorted_Rows', 'Duplicate_Dates', 'Invalid_Prices', 'Missing_Prices',
+                            'Rows_Dropped', 'High_Low_Swapped', 'OHLC_Bounds_Fixed', 'Gaps',
+                            'Largest_Gap_Days', 'Bars_Inserted'], 0)
+    report['Rows_In'] = len(df)
+
+    # Order and uniqueness of the index
+    stamps = df.index.values
+    keep = None
+    if not df.index.is_monotonic_increasing:
+        order = np.argsort(stamps, kind='stable')
+        report['Unsorted_Rows'] = int(np.count_nonzero(order != np.arange(len(order))))
+        stamps = stamps[order]
+        keep = order
+    if len(stamps) > 1:
+        # Sorted, so duplicates are adjacent; keep the last of each run
+        last_of_run = np.append(stamps[1:] != stamps[:-1], True)
+        report['Duplicate_Dates'] = len(last_of_run) - int(np.count_nonzero(last_of_run))
+        if report['Duplicate_Dates']:
+            keep = np.flatnonzero(last_of_run) if keep is None else keep[last_of_run]
+            stamps = stamps[last_of_run]
+
+    # Missing weekdays. With fill_gaps their bars are placed right away as
+    # copies of the bar before (made flat at its Close once prices are
+    # repaired), so each column is still gathered only once
+    positions, counts = _missing_weekdays(stamps)
+    new_rows = None
+    if fill_gaps and len(positions):
+        stamps, at = _insert_missing_weekdays(stamps, positions, counts)
+        rows = np.arange(len(df)) if keep is None else keep
+        keep = np.insert(rows, at, rows[at - 1])
+        new_rows = at + np.arange(len(at))
+
+    # Each column is gathered into its output row order once; the repairs
+    # below work on these arrays and the frame is rebuilt once at the end.
+    # Price and Volume columns are NumPy arrays, any others pandas arrays.
+    columns = {}
+    for column in df.columns:
+        if column in PRICE_COLUMNS or column == 'Volume':
+            columns[column] = df[column].to_numpy()
+        elif new_rows is None:
+            columns[column] = df[column].array
+        else:
+            # Other columns are missing on the new bars
+            fill = keep.copy()
+            fill[new_rows] = -1
+            columns[column] = df[column].array.take(fill, allow_fill=True)
+            continue
+        if keep is not None:
+            columns[column] = columns[column].take(keep)
+    if new_rows is not None and 'Volume' in columns:
+        columns['Volume'][new_rows] = 0
+    # Columns that are private copies and may be repaired in place
+    owned = set(columns) if keep is not None else set()
+
+    # Prices: invalid -> missing -> forward-fill, column by column. min/max
+    # reductions give a cheap all-clear (NaN propagates and fails the test).
+    inserted = len(new_rows) if new_rows is not None else 0
+    first_valid = 0
+    for column in PRICE_COLUMNS:
+        values = columns[column]
+        if len(values) == 0 or (values.min() > 0 and values.max() < np.inf):
+            continue
+        # Zero, negative, infinite or NaN (NaN fails both comparisons)
+        holes = np.flatnonzero(~((values > 0) & (values < np.inf)))
+        counted = holes[~np.isin(holes, new_rows)] if inserted else holes
+        report['Missing_Prices'] += len(counted)
+        report['Invalid_Prices'] += len(counted) - int(np.count_nonzero(np.isnan(values[counted])))
+        if column not in owned or values.dtype.kind != 'f':
+            columns[column] = values = values.astype(values.dtype if values.dtype.kind == 'f' else np.float64)
+            owned.add(column)
+        first_valid = max(first_valid, _ffill(values, holes))
+    if inserted:
+        for column in ('Open', 'High', 'Low'):
+            columns[column][new_rows] = columns['Close'][new_rows]
+
+    # Leading rows with nothing to fill from are dropped, with any gaps among them
+    dropped = first_valid - (int(np.searchsorted(new_rows, first_valid)) if inserted else 0)
+    report['Rows_Dropped'] = dropped
+    if first_valid:
+        columns = {column: values[first_valid:] for column, values in columns.items()}
+        stamps = stamps[first_valid:]
+        counts = counts[positions >= dropped]
+
+    report['Gaps'] = int(np.count_nonzero(counts > max_gap_days))
+    report['Largest_Gap_Days'] = int(counts.max()) if len(counts) else 0
+    if inserted:
+        report['Bars_Inserted'] = int(counts.sum())
+
+    # High/Low consistency: Low <= min(Open, Close) and High >= max(Open, Close)
+    # (which also implies High >= Low); only the failing rows are rewritten
+    open_, high, low, close = (columns[column] for column in PRICE_COLUMNS)
+    bad = np.flatnonzero((high < open_) | (high < close) | (low > open_) | (low > close))
+    if len(bad):
+        old_high, old_low = high[bad], low[bad]
+        body_high = np.maximum(open_[bad], close[bad])
+        body_low = np.minimum(open_[bad], close[bad])
+        swapped = old_high < old_low
+        report['High_Low_Swapped'] = int(np.count_nonzero(swapped))
+        report['OHLC_Bounds_Fixed'] = len(bad) - report['High_Low_Swapped']
+        for column in ('High', 'Low'):
+            if column not in owned:
+                columns[column] = columns[column].copy()
+                owned.add(column)
+        columns['High'][bad] = np.maximum(np.where(swapped, old_low, old_high), body_high)
+        columns['Low'][bad] = np.minimum(np.where(swapped, old_high, old_low), body_low)
+
+    if 'Volume' in columns:
+        volume = columns['Volume']
+        if volume.dtype.kind == 'f' and np.isnan(volume).any():
+            columns['Volume'] = np.nan_to_num(volume, nan=0.0)
+            owned.add('Volume')
+
+    if owned:
+        for column in columns.keys() - owned:
+            columns[column] = columns[column].copy()
+        df = pd.DataFrame(columns, index=pd.DatetimeIndex(stamps, name=df.index.name), copy=False)
+    report['Rows_Out'] = len(df)
+    return df, report
+
+
+def _insert_missing_weekdays(stamps, positions, counts):
+    """
+    Add a bar time (midnight) on every missing weekday.
+
+    Args:
+        stamps: Sorted datetime64 bar times
+        positions, counts: Bars followed by missing weekdays and the run
+            lengths (from _missing_weekdays)
+
+    Returns:
+        (stamps, at): the new bar times and, for each added bar, the old
+        position it was inserted in front of (as passed to np.insert)
+    """
+    # The k-th missing weekday of a run is k business days after its first
+    first = np.busday_offset(stamps[positions].astype('datetime64[D]') + 1, 0, roll='forward')
+    offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    new_days = np.busday_offset(np.repeat(first, counts), offsets)
+
+    at = np.repeat(positions + 1, counts)
+    return np.insert(stamps, at, new_days.astype(stamps.dtype)), at
+
+
+def format_quality_report(report):
+    """Human-readable lines for the non-zero repairs in a clean_ohlcv report."""
+    labels = {
+        'Unsorted_Rows': "rows out of date order (sorted)",
+        'Duplicate_Dates': "duplicate dates (kept last)",
+        'Invalid_Prices': "zero/negative/non-finite prices (treated as missing)",
+        'Missing_Prices': "missing prices (forward-filled)",
+        'Rows_Dropped': "leading rows without prices (dropped)",
+        'High_Low_Swapped': "rows with High < Low (swapped)",
+        'OHLC_Bounds_Fixed': "rows with Open/Close outside High-Low (widened)",
+        'Gaps': "gaps of missing weekdays",
+        'Bars_Inserted': "missing weekday bars (inserted)"
+    }
+    return [f"{report[key]} {label}" for key, label in labels.items() if report.get(key)]
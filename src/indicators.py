@@ -0,0 +1,387 @@
+"""
+Array-based indicator and signal kernels for batched backtests.
+
+Every indicator takes a 1D price array and a list of windows/periods and
+returns an (n_bars, n_windows) matrix, so a whole parameter grid is
+computed from shared prefix sums instead of one rolling pass per config.
+The prefix sums restart every few hundred bars on locally centred values,
+so long, trending series keep full precision.
+`latch` turns entry/exit conditions into a held long/flat state without a
+per-bar loop.
+
+INDICATOR_CACHE is a process-wide LRU cache of computed indicator arrays,
+keyed by dataset fingerprint plus indicator name and parameters, so sweeps,
+cost-sensitivity runs and dashboard reruns never recompute an indicator.
+
+Warmup rows (fewer than `window` observations) and windows containing a
+NaN are NaN, matching pandas `rolling(window).mean()` / `.std()`.
+"""
+
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+try:
+    from .precision import resolve_dtype
+except ImportError:
+    from precision import resolve_dtype
+
+
+# Shortest block of bars that gets its own prefix sums (see _block_sums)
+MIN_BLOCK = 256
+
+
+def _count_prefix(mask):
+    """Integer prefix counts of a boolean array with a leading zero (exact)."""
+    return np.concatenate(([0], np.cumsum(mask)))
+
+
+def _window_diff(prefix, windows):
+    """prefix[i + 1] - prefix[i + 1 - w] for every bar i and window w, shape (n, k)."""
+    n = len(prefix) - 1
+    hi = np.arange(1, n + 1)[:, None]
+    lo = np.maximum(hi - windows[None, :], 0)
+    return prefix[hi] - prefix[lo]
+
+
+def _block_sums(values, windows, centre=False, squares=False):
+    """
+    Window sums from short, overlapping blocks of prefix sums.
+
+    A single series-wide prefix sum loses precision as it grows: the
+    difference of two large running totals cancels, and on a long or
+    trending series a window's sum (worse, its sum of squares) drowns in
+    the rounding of the totals. Instead the bars are cut into blocks of at
+    least MIN_BLOCK and 4x the longest lookback; each block, together with
+    the lookback bars before it, gets its own prefix sums, optionally of
+    values centred on the block's mean. The rounding error then depends on
+    the block length and on how far values move within a block, not on the
+    series length or trend.
+
+    Args:
+        values: 1D float array; NaNs add nothing (callers mask those windows)
+        windows: 1D int array of window lengths (>= 1)
+        centre: Sum x - anchor, where anchor is the mean of the bar's block
+        squares: Also return window sums of (x - anchor) ** 2
+
+    Returns:
+        (s1, s2, anchor): window sums of x - anchor, shape (n, k); the sums
+        of squares (None unless squares); and each bar's anchor, shape (n,)
+        (zeros unless centre). Warmup windows sum only the bars available.
+    """
+    n = len(values)
+    pad = int(windows.max()) - 1
+    block = max(4 * pad, MIN_BLOCK)
+    n_blocks = max(-(-n // block), 1)
+
+    # Row b holds bars b * block - pad ... (b + 1) * block - 1
+    bars = np.arange(n_blocks)[:, None] * block + np.arange(-pad, block)[None, :]
+    inside = (bars >= 0) & (bars < n)
+    rows = np.where(inside, values[np.clip(bars, 0, max(n - 1, 0))] if n else 0.0, np.nan)
+    present = ~np.isnan(rows)
+
+    if centre:
+        own = present[:, pad:]
+        anchors = np.where(own, rows[:, pad:], 0.0).sum(axis=1) / np.maximum(own.sum(axis=1), 1)
+    else:
+        anchors = np.zeros(n_blocks)
+    dev = np.where(present, rows - anchors[:, None], 0.0)
+
+    # Positions of each bar's window in its block row (always >= 0)
+    bar = np.arange(n)
+    row = (bar // block)[:, None]
+    hi = (bar % block + pad + 1)[:, None]
+    lo = hi - windows[None, :]
+
+    zero = np.zeros((n_blocks, 1))
+    prefix = np.concatenate((zero, np.cumsum(dev, axis=1)), axis=1)
+    s1 = prefix[row, hi] - prefix[row, lo]
+    s2 = None
+    if squares:
+        prefix = np.concatenate((zero, np.cumsum(dev * dev, axis=1)), axis=1)
+        s2 = prefix[row, hi] - prefix[row, lo]
+    return s1, s2, anchors[bar // block]
+
+
+def _invalid_windows(values, windows):
+    """Mask of warmup windows and windows containing a NaN, shape (n, k)."""
+    warmup = np.arange(len(values))[:, None] < windows[None, :] - 1
+    return warmup | (_window_diff(_count_prefix(np.isnan(values)), windows) > 0)
+
+
+def rolling_sum(values, windows, dtype=None):
+    """
+    Rolling sums of `values` for several windows at once.
+
+    Args:
+        values: 1D array
+        windows: Iterable of window lengths
+        dtype: Output dtype (default: the precision policy); the sums are
+            always accumulated in float64
+
+    Returns:
+        Array of shape (n, len(windows))
+    """
+    values = np.asarray(values, dtype=float)
+    windows = np.atleast_1d(np.asarray(windows, dtype=np.int64))
+    out, _, _ = _block_sums(values, windows)
+
+    # All-zero windows come out exactly 0
+    out[_window_diff(_count_prefix(values != 0), windows) == 0] = 0.0
+    out[_invalid_windows(values, windows)] = np.nan
+    return out.astype(resolve_dtype(dtype), copy=False)
+
+
+def rolling_mean(values, windows, dtype=None):
+    """
+    Simple moving averages of `values` for several windows at once.
+
+    Prices are centred on a local anchor before summing (see _block_sums),
+    which keeps the sums small and accurate on long, trending series.
+
+    Args:
+        values: 1D array (e.g. Close)
+        windows: Iterable of window lengths
+        dtype: Output dtype (default: the precision policy)
+
+    Returns:
+        Array of shape (n, len(windows))
+    """
+    values = np.asarray(values, dtype=float)
+    windows = np.atleast_1d(np.asarray(windows, dtype=np.int64))
+    s1, _, anchor = _block_sums(values, windows, centre=True)
+    mean = s1 / windows[None, :] + anchor[:, None]
+    mean[_invalid_windows(values, windows)] = np.nan
+    return mean.astype(resolve_dtype(dtype), copy=False)
+
+
+def rolling_std(values, windows, dtype=None):
+    """
+    Rolling sample standard deviation (ddof=1) for several windows at once.
+
+    Uses window sums of the locally centred values and of their squares
+    (see _block_sums), so the sum-of-squares cancellation stays bounded by
+    the block length rather than growing with the series.
+
+    Args:
+        values: 1D array (e.g. Close)
+        windows: Iterable of window lengths
+        dtype: Output dtype (default: the precision policy)
+
+    Returns:
+        Array of shape (n, len(windows))
+    """
+    values = np.asarray(values, dtype=float)
+    windows = np.atleast_1d(np.asarray(windows, dtype=np.int64))
+    s1, s2, _ = _block_sums(values, windows, centre=True, squares=True)
+    w = windows[None, :].astype(float)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        var = (s2 - s1 ** 2 / w) / (w - 1)
+    std = np.sqrt(np.maximum(var, 0.0))
+    std[_invalid_windows(values, windows)] = np.nan
+    return std.astype(resolve_dtype(dtype), copy=False)
+
+
+def rsi(close, periods, dtype=None):
+    """
+    Relative Strength Index for several periods at once.
+
+    Matches Backtester.run_rsi: simple rolling means of gains and losses
+    (not Wilder smoothing), RSI = 100 - 100 / (1 + gain / loss).
+
+    Args:
+        close: 1D array of closing prices
+        periods: Iterable of RSI periods
+        dtype: Output dtype (default: the precision policy)
+
+    Returns:
+        Array of shape (n, len(periods))
+    """
+    close = np.asarray(close, dtype=float)
+    periods = np.atleast_1d(np.asarray(periods, dtype=np.int64))
+    delta = np.diff(close, prepend=np.nan)
+
+    # NaN deltas count as 0, like delta.where(delta > 0, 0) in pandas
+    gain = np.where(delta > 0, delta, 0.0)
+    loss = np.where(delta < 0, -delta, 0.0)
+    avg_gain = rolling_sum(gain, periods, dtype=np.float64) / periods[None, :]
+    avg_loss = rolling_sum(loss, periods, dtype=np.float64) / periods[None, :]
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        rs = avg_gain / avg_loss
+        return (100 - (100 / (1 + rs))).astype(resolve_dtype(dtype), copy=False)
+
+
+def latch(entry, exit_, valid=None, initial=False):
+    """
+    Vectorized latching (hysteresis) signal.
+
+    Equivalent to the state machine used by the mean reversion and RSI
+    strategies:
+
+        if flat and entry: go long
+        elif long and exit: go flat
+
+    Each bar's state is the last decisive event carried forward
+    (forward-fill of the most recent entry-only / exit-only bar). A bar
+    where entry and exit both fire flips the state, as the loop would.
+
+    Args:
+        entry: Boolean array, shape (n,) or (n, k)
+        exit_: Boolean array, same shape as entry
+        valid: Optional boolean mask (broadcastable to entry). Invalid bars
+            (warmup, NaN indicators) neither change state nor hold a signal.
+        initial: State before the first bar (scalar or per column), used to
+            continue a latch across chunks of a longer series
+
+    Returns:
+        Boolean held-state array shaped like entry
+    """
+    entry = np.asarray(entry, dtype=bool)
+    exit_ = np.asarray(exit_, dtype=bool)
+    squeeze = entry.ndim == 1
+    entry = entry.reshape(len(entry), -1)
+    exit_ = exit_.reshape(len(exit_), -1)
+    if valid is None:
+        valid = np.ones_like(entry)
+    else:
+        valid = np.broadcast_to(np.asarray(valid, dtype=bool).reshape(len(entry), -1), entry.shape)
+
+    entry = entry & valid
+    exit_ = exit_ & valid
+    both = entry & exit_
+    decisive = entry ^ exit_
+
+    # Row of the last decisive event at or before each bar
+    rows = np.arange(len(entry))[:, None]
+    last = np.maximum.accumulate(np.where(decisive, rows, -1), axis=0)
+    seen = last >= 0
+    last = np.maximum(last, 0)
+    initial = np.broadcast_to(np.asarray(initial, dtype=bool).reshape(-1), entry.shape[1:])
+    state = np.where(seen, np.take_along_axis(entry, last, axis=0), initial)
+
+    # Flip for every entry-and-exit bar since that event
+    flips = np.cumsum(both, axis=0)
+    flips -= np.where(seen, np.take_along_axis(flips, last, axis=0), 0)
+    state ^= flips % 2 == 1
+
+    state &= valid
+    return state[:, 0] if squeeze else state
+
+
+class IndicatorCache:
+    """
+    Thread-safe LRU cache of indicator arrays with a memory cap.
+
+    Keys are tuples of (dataset fingerprint, indicator name, *parameters).
+    Values are stored read-only so a cached array cannot be mutated by a
+    caller and silently corrupt later runs.
+    """
+
+    def __init__(self, max_bytes=256 * 1024 ** 2):
+        """
+        Args:
+            max_bytes: Upper bound on the total nbytes of cached arrays;
+                least recently used entries are evicted beyond it
+        """
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._nbytes = 0
+        self._lock = threading.Lock()
+
+    def get_or_compute(self, key, compute):
+        """
+        Return the cached array for `key`, computing and storing it on a miss.
+
+        Args:
+            key: Hashable key, e.g. (fingerprint, 'SMA', 20)
+            compute: Zero-argument callable returning a NumPy array
+
+        Returns:
+            Read-only NumPy array
+        """
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            self.misses += 1
+
+        # Compute outside the lock; a concurrent miss on the same key just
+        # stores an identical array twice
+        value = np.asarray(compute())
+        value.setflags(write=False)
+        if value.nbytes > self.max_bytes:
+            return value
+
+        self._store(key, value)
+        return value
+
+    def get_or_compute_columns(self, keys, compute):
+        """
+        Cached 1D arrays for several keys, computing every miss in one call.
+
+        Lets a parameter grid share per-parameter entries with single runs
+        while still computing its misses in one batched kernel call.
+
+        Args:
+            keys: List of hashable keys, e.g. [(fingerprint, 'SMA', 20), ...]
+            compute: Callable taking the positions in `keys` of the misses
+                and returning a 2D array with one column per miss, in order
+
+        Returns:
+            List of read-only 1D arrays, one per key
+        """
+        values = [None] * len(keys)
+        with self._lock:
+            for i, key in enumerate(keys):
+                if key in self._entries:
+                    self._entries.move_to_end(key)
+                    values[i] = self._entries[key]
+            missing = [i for i, value in enumerate(values) if value is None]
+            self.hits += len(keys) - len(missing)
+            self.misses += len(missing)
+
+        if missing:
+            computed = np.asarray(compute(missing))
+            for column, i in enumerate(missing):
+                value = np.ascontiguousarray(computed[:, column])
+                value.setflags(write=False)
+                values[i] = value
+                if value.nbytes <= self.max_bytes:
+                    self._store(keys[i], value)
+        return values
+
+    def _store(self, key, value):
+        with self._lock:
+            if key not in self._entries:
+                self._entries[key] = value
+                self._nbytes += value.nbytes
+            while self._nbytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._nbytes -= evicted.nbytes
+
+    def clear(self):
+        """Drop every cached array and reset the hit/miss counters."""
+        with self._lock:
+            self._entries.clear()
+            self._nbytes = 0
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        """Return a dict with entries, bytes, hits and misses."""
+        with self._lock:
+            return {
+                "Entries": len(self._entries),
+                "Bytes": self._nbytes,
+                "Hits": self.hits,
+                "Misses": self.misses
+            }
+
+
+# Process-wide cache shared by every Backtester instance
+INDICATOR_CACHE = IndicatorCache()
@@ -0,0 +1,333 @@
+"""
+Intraday (minute-bar) backtesting with bounded memory.
+
+IntradayBacktester runs the Backtester strategy rules over a sequence of
+OHLC chunks (e.g. pd.read_csv(..., chunksize=...)). Each chunk is processed
+with the same array kernels as the daily engine; only a few values are
+carried to the next chunk:
+- the last closes needed to continue the rolling indicators
+- the latch state of the mean reversion / RSI signals
+- the last signal, position and Open, and the open trade's entry price
+- equity growth, peak and the running totals used by summary()
+
+Peak memory therefore depends on the chunk size, not on the length of the
+history. Results are yielded chunk by chunk for the caller to aggregate or
+write out.
+
+Execution rules match Backtester (signal at close, position from the next
+bar's open, open-to-open returns, SL/TP at each close), plus:
+- bars_per_year sets the per-bar dividend accrual and annualization
+  (NSE cash session: 375 one-minute bars, 09:15-15:30)
+- flat_at_session_close forces every position closed on the last bar of
+  each session, so nothing is held across the overnight gap
+
+Chunks always run in float64 (regardless of the precision policy). The
+rolling indicators of each chunk come from its own prefix sums over the
+carried closes, so they match a single pass within floating-point
+round-off rather than bit for bit; positions and trades can only differ
+when a close lies within that round-off of an indicator threshold.
+"""
+
+import numpy as np
+import pandas as pd
+
+try:
+    from .backtester import (EXIT_REASONS, apply_stop_loss_take_profit, compute_returns,
+                             extract_trades, trade_log_to_frame)
+    from .indicators import latch, rolling_mean, rolling_std, rsi
+    from .streaming import DEFAULT_PARAMS, STRATEGIES
+except ImportError:
+    from backtester import (EXIT_REASONS, apply_stop_loss_take_profit, compute_returns,
+                            extract_trades, trade_log_to_frame)
+    from indicators import latch, rolling_mean, rolling_std, rsi
+    from streaming import DEFAULT_PARAMS, STRATEGIES
+
+
+BARS_PER_SESSION = 375
+BARS_PER_YEAR = 252 * BARS_PER_SESSION
+
+
+def iter_chunks(data, chunk_size=100000):
+    """Split an in-memory DataFrame into row chunks (views, no copy)."""
+    for start in range(0, len(data), chunk_size):
+        yield data.iloc[start:start + chunk_size]
+
+
+class IntradayBacktester:
+    """
+    Chunked backtester for intraday bars.
+
+    Feeding the whole history as one chunk or as many small chunks gives
+    the same positions, trades and equity, up to floating-point round-off
+    in the indicators.
+    """
+
+    def __init__(self, strategy='momentum', initial_capital=100000, transaction_cost=0.001,
+                 dividend_yield=0.015, stop_loss=None, take_profit=None, position_size=1.0,
+                 bars_per_year=BARS_PER_YEAR, flat_at_session_close=False, **params):
+        """
+        Initialize intraday backtester.
+
+        Args:
+            strategy: 'momentum', 'mean_reversion' or 'rsi'
+            initial_capital, transaction_cost, dividend_yield, stop_loss,
+            take_profit, position_size: as in Backtester
+            bars_per_year: Bars per year for dividend accrual and annualization
+                (default 252 sessions x 375 minute bars)
+            flat_at_session_close: Close any position on the last bar of each
+                session (calendar date of the index)
+            **params: Strategy parameters; defaults match the run_* methods
+        """
+        if strategy not in STRATEGIES:
+            raise ValueError(f"Unknown strategy {strategy!r}; choose from {STRATEGIES}")
+        self.strategy = strategy
+        self.params = {**DEFAULT_PARAMS[strategy], **params}
+        self.window = self.params.get('sma_window', self.params.get('rsi_period'))
+        self.initial_capital = initial_capital
+        self.transaction_cost = transaction_cost
+        self.dividend_yield = dividend_yield
+        self.stop_loss = stop_loss
+        self.take_profit = take_profit
+        self.position_size = position_size
+        self.bars_per_year = bars_per_year
+        self.flat_at_session_close = flat_at_session_close
+        self.reset()
+
+    def reset(self):
+        """Clear all carried state before a new run."""
+        self.bars = 0
+        self._context = np.empty(0)      # trailing closes for the indicators
+        self._latched = False
+        self._signal = 0.0               # signal at the last processed close
+        self._position = None            # position on the last processed bar
+        self._open = None                # Open of the last processed bar
+        self._trade = None               # (entry_date, entry_price) of the open trade
+        self._market_growth = 1.0
+        self._strategy_growth = 1.0
+        self._peak = self.initial_capital
+        self._max_drawdown = 0.0
+        self._sum = 0.0
+        self._sumsq = 0.0
+        self._exposed = 0
+        self._first_date = None
+        self._last_date = None
+        self._trades = []
+
+    def run(self, chunks):
+        """
+        Process OHLC chunks in order.
+
+        One bar is held back from every chunk until the next one arrives, so
+        the last bar of each session (and of the data) is known when its
+        position is set.
+
+        Args:
+            chunks: DataFrame (processed as a single chunk) or iterable of
+                DataFrames with a DatetimeIndex and Open, Close columns
+
+        Yields:
+            DataFrame per chunk with Signal, Position, Exit_Reason,
+            Market_Return, Strategy_Return, Market_Equity, Strategy_Equity
+        """
+        self.reset()
+        if isinstance(chunks, pd.DataFrame):
+            chunks = [chunks]
+
+        pending = None
+        for chunk in chunks:
+            chunk = chunk[['Open', 'Close']]
+            if pending is not None:
+                chunk = pd.concat([pending, chunk])
+            if len(chunk) < 2:
+                pending = chunk
+                continue
+            pending = chunk.iloc[-1:]
+            yield self._process(chunk.iloc[:-1], next_date=chunk.index[-1])
+        if pending is not None and len(pending):
+            yield self._process(pending, next_date=None)
+
+    def _signal_for(self, close):
+        """Strategy signal for a chunk, continuing the indicators from the carried closes."""
+        context = len(self._context)
+        closes = np.concatenate((self._context, close))
+        bars = self.bars - context + np.arange(len(closes))
+        self._context = closes[-(self.window + 1):]
+
+        if self.strategy == 'momentum':
+            sma = rolling_mean(closes, [self.window], dtype=np.float64)[:, 0]
+            with np.errstate(invalid='ignore'):
+                return (closes > sma)[context:].astype(float)
+
+        if self.strategy == 'mean_reversion':
+            sma = rolling_mean(closes, [self.window], dtype=np.float64)[:, 0]
+            lower = sma - self.params['std_dev'] * rolling_std(closes, [self.window], dtype=np.float64)[:, 0]
+            valid = ~np.isnan(sma) & ~np.isnan(lower) & (bars >= self.window)
+            with np.errstate(invalid='ignore'):
+                entry, exit_ = closes < lower, closes >= sma
+        else:
+            rsi_values = rsi(closes, [self.window], dtype=np.float64)[:, 0]
+            valid = ~np.isnan(rsi_values) & (bars >= self.window + 1)
+            with np.errstate(invalid='ignore'):
+                entry = rsi_values < self.params['oversold']
+                exit_ = (rsi_values > self.params['overbought']) | (rsi_values > 50)
+
+        # Latch on the new bars only, starting from the carried state
+        valid = valid[context:]
+        state = latch(entry[context:] & valid, exit_[context:] & valid, initial=self._latched)
+        if len(state):
+            self._latched = bool(state[-1])
+        return (state & valid).astype(float)
+
+    def _process(self, chunk, next_date):
+        """Run one chunk; next_date is the first bar after it (None at end of data)."""
+        dates = chunk.index.values
+        open_ = chunk['Open'].to_numpy(dtype=float)
+        close = chunk['Close'].to_numpy(dtype=float)
+        n = len(chunk)
+
+        signal = self._signal_for(close)
+
+        # Position today = signal from yesterday
+        position = np.empty(n)
+        position[0] = self._signal
+        position[1:] = signal[:-1]
+
+        if self.flat_at_session_close:
+            session = chunk.index.normalize()
+            following = session[1:].append(pd.DatetimeIndex(
+                [next_date.normalize() if next_date is not None else pd.NaT]))
+            position[session != following] = 0
+
+        # A trade still open from the previous chunk continues from its entry Open:
+        # prepend it as a held bar with no close so it cannot trigger SL/TP
+        carry = self._trade is not None
+        position, reasons = apply_stop_loss_take_profit(
+            np.concatenate(([1.0], position)) if carry else position,
+            np.concatenate(([self._trade[1]], open_)) if carry else open_,
+            np.concatenate(([np.nan], close)) if carry else close,
+            stop_loss=self.stop_loss, take_profit=self.take_profit, dtype=np.float64
+        )
+        if carry:
+            position, reasons = position[1:], reasons[1:]
+        if next_date is None:
+            position[-1] = 0
+
+        self._record_trades(position, reasons, open_, dates, next_date is None)
+        returns = self._returns(position, open_)
+
+        # Running totals for summary()
+        strategy_return = returns['Strategy_Return']
+        equity = returns['Strategy_Equity']
+        peak = np.maximum.accumulate(np.concatenate(([self._peak], equity)))[1:]
+        self._peak = peak[-1]
+        self._max_drawdown = min(self._max_drawdown, (equity / peak - 1).min())
+        self._sum += strategy_return.sum()
+        self._sumsq += (strategy_return ** 2).sum()
+        self._exposed += int((position > 0).sum())
+        self._first_date = self._first_date if self._first_date is not None else chunk.index[0]
+        self._last_date = chunk.index[-1]
+
+        self.bars += n
+        self._signal = signal[-1]
+        self._position = position[-1]
+        self._open = open_[-1]
+
+        return pd.DataFrame({
+            'Signal': signal,
+            'Position': position,
+            'Exit_Reason': pd.Categorical.from_codes(reasons, categories=EXIT_REASONS),
+            'Market_Return': returns['Market_Return'],
+            'Strategy_Return': strategy_return,
+            'Market_Equity': returns['Market_Equity'],
+            'Strategy_Equity': returns['Strategy_Equity']
+        }, index=chunk.index)
+
+    def _returns(self, position, open_):
+        """Open-to-open returns and equity, continuing from the previous chunk."""
+        carry = self._open is not None
+        returns = compute_returns(
+            np.concatenate(([self._open], open_)) if carry else open_,
+            np.concatenate(([self._position], position)) if carry else position,
+            initial_capital=self.initial_capital, transaction_cost=self.transaction_cost,
+            dividend_yield=self.dividend_yield, position_size=self.position_size,
+            periods_per_year=self.bars_per_year, dtype=np.float64
+        )
+        start = 1 if carry else 0
+        market_return = returns['Market_Return'][start:]
+        strategy_return = returns['Strategy_Return'][start:]
+
+        # Same sequential products as one cumprod over the full history
+        market_growth = np.cumprod(np.concatenate(([self._market_growth], 1 + market_return)))[1:]
+        strategy_growth = np.cumprod(np.concatenate(([self._strategy_growth], 1 + strategy_return)))[1:]
+        self._market_growth = market_growth[-1]
+        self._strategy_growth = strategy_growth[-1]
+        return {
+            'Market_Return': market_return,
+            'Strategy_Return': strategy_return,
+            'Market_Equity': self.initial_capital * market_growth,
+            'Strategy_Equity': self.initial_capital * strategy_growth
+        }
+
+    def _record_trades(self, position, reasons, open_, dates, final):
+        """Append closed trades; a trade still open at the chunk end is carried."""
+        carry = self._trade is not None
+        if carry:
+            position = np.concatenate(([1.0], position))
+            reasons = np.concatenate(([0], reasons))
+            open_ = np.concatenate(([self._trade[1]], open_))
+            dates = np.concatenate(([self._trade[0]], dates))
+
+        trades = extract_trades(
+            position, open_, dates, reasons,
+            initial_capital=self.initial_capital, position_size=self.position_size,
+            transaction_cost=self.transaction_cost
+        )
+        if position[-1] == 1 and not final:
+            self._trade = (trades['Entry_Date'][-1], trades['Entry_Price'][-1])
+            trades = trades[:-1]
+        else:
+            self._trade = None
+        if len(trades):
+            self._trades.append(trades)
+
+    @property
+    def trades(self):
+        """Trade log of closed trades (same columns as Backtester.trades)."""
+        if not self._trades:
+            return pd.DataFrame()
+        return trade_log_to_frame(np.concatenate(self._trades))
+
+    def summary(self, risk_free_rate=0.06):
+        """
+        Headline metrics from the running totals, without the bar history.
+
+        Same definitions as metrics.calculate_advanced_metrics, annualized
+        with bars_per_year.
+
+        Returns:
+            Dict with Total_Return, CAGR, Volatility, Sharpe, Max_Drawdown,
+            Market_Exposure, Total_Trades and Bars
+        """
+        n = self.bars
+        if n < 2:
+            return {}
+        total_return = self._strategy_growth - 1
+        days = (self._last_date - self._first_date).days
+        cagr = (1 + total_return) ** (365.0 / days) - 1 if days > 0 else 0.0
+
+        mean = self._sum / n
+        variance = max((self._sumsq - self._sum * mean) / (n - 1), 0.0)
+        volatility = np.sqrt(variance) * np.sqrt(self.bars_per_year)
+        excess_return = mean * self.bars_per_year - risk_free_rate
+        sharpe = excess_return / volatility if volatility != 0 else 0.0
+
+        return {
+            "Total_Return": total_return,
+            "CAGR": cagr,
+            "Volatility": volatility,
+            "Sharpe": sharpe,
+            "Max_Drawdown": self._max_drawdown,
+            "Market_Exposure": self._exposed / n,
+            "Total_Trades": sum(len(t) for t in self._trades),
+            "Bars": n
+        }
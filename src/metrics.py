@@ -2,159 +2,361 @@
 Professional-grade metrics calculation module.
 
 All metrics are mathematically correct and handle edge cases gracefully.
+
+Every return/equity metric (headline, risk and drawdown recovery) comes
+from one fused kernel, _column_metrics, which works along axis 0 of
+(bars x series) matrices and derives all of them from a single cumulative
+product, running peak and drawdown series. calculate_all_metrics runs it on
+one result frame (calculate_advanced_metrics, calculate_additional_risk_metrics
+and calculate_drawdown_recovery return subsets of its keys);
+calculate_matrix_metrics runs it on a whole sweep or panel at once.
 """
 
+import warnings
+
 import pandas as pd
 import numpy as np
-from scipy import stats
 
+try:
+    from .indicators import rolling_sum
+except ImportError:
+    from indicators import rolling_sum
+
+
+ADVANCED_KEYS = ("CAGR", "Total_Return", "Volatility", "Sharpe", "Sortino", "Calmar",
+                 "Max_Drawdown", "Stability", "Skewness", "Kurtosis", "Win_Rate_Daily",
+                 "Market_Exposure")
+RISK_KEYS = ("VaR_95", "CVaR_95", "Ulcer_Index", "Hit_Rate", "Best_Day", "Worst_Day")
+RECOVERY_KEYS = ("Peak_Date", "Trough_Date", "Recovery_Date", "Recovery_Days", "Max_Drawdown")
+
+# Moment sums below this are floating-point noise (same cut-off as pandas)
+_FP_NOISE = 1e-14
 
-def calculate_advanced_metrics(df: pd.DataFrame, risk_free_rate: float = 0.06) -> dict:
+
+def _finite_or_zero(values):
+    """Map NaN and +/-inf to 0.0 for display-safe metrics."""
+    return np.where(np.isfinite(values), values, 0.0)
+
+
+def _column_metrics(returns, equity, days, position=None, risk_free_rate=0.06,
+                    periods_per_year=252, confidence_level=0.95):
     """
-    Calculate comprehensive risk and performance metrics.
-    
-    All metrics use open-to-open strategy returns for consistency.
-    
+    Fused metrics kernel along axis 0 of (bars x series) matrices.
+
     Args:
-        df: DataFrame with 'Strategy_Return' and 'Strategy_Equity' columns
-        risk_free_rate: Annual risk-free rate (default 6% for India)
-    
+        returns: float64 (bars x k) returns; NaNs are skipped per column
+        equity: float64 (bars x k) equity curves
+        days: Calendar days spanned by the bars (0 blanks the headline set)
+        position: Optional (bars x k) positions; None means always invested
+        risk_free_rate, periods_per_year, confidence_level: as in
+            calculate_all_metrics
+
     Returns:
-        Dictionary of metrics with proper handling of edge cases
+        (metrics, cum_ret, drawdown): dict of length-k arrays with
+        ADVANCED_KEYS and RISK_KEYS, plus the cumulative return and drawdown
+        matrices the recovery dates are read from
     """
-    strat_ret = df['Strategy_Return'].dropna()
-    
-    if len(strat_ret) == 0:
-        return _empty_metrics()
-    
-    # Basic metrics
-    days = (df.index[-1] - df.index[0]).days
-    if days == 0:
-        return _empty_metrics()
-        
-    total_return = (df['Strategy_Equity'].iloc[-1] / df['Strategy_Equity'].iloc[0]) - 1
-    cagr = (1 + total_return) ** (365.0 / days) - 1
-    
-    # Volatility (annualized)
-    volatility = strat_ret.std() * np.sqrt(252)
-    
-    # Sharpe Ratio
-    excess_return = strat_ret.mean() * 252 - risk_free_rate
-    sharpe = excess_return / volatility if volatility != 0 else np.nan
-    
-    # Sortino Ratio (downside deviation only)
-    downside_ret = strat_ret[strat_ret < 0]
-    if len(downside_ret) > 0:
-        downside_std = downside_ret.std() * np.sqrt(252)
-        sortino = excess_return / downside_std if downside_std != 0 else np.nan
-    else:
-        # No negative returns - Sortino is very high or undefined
-        sortino = np.inf if excess_return > 0 else np.nan
-    
-    # Drawdown metrics
-    cum_ret = (1 + strat_ret).cumprod()
-    peak = cum_ret.cummax()
-    drawdown = (cum_ret - peak) / peak
-    max_drawdown = drawdown.min()
-    
-    # Calmar Ratio
-    if max_drawdown == 0:
-        # No drawdown - Calmar is very high or undefined
-        calmar = np.inf if cagr > 0 else np.nan
-    else:
-        calmar = cagr / abs(max_drawdown)
-    
-    # Stability (R² of log equity curve vs time)
-    equity = df['Strategy_Equity'].values
-    if len(equity) > 1 and np.all(equity > 0):
-        log_equity = np.log(equity)
-        x = np.arange(len(equity))
-        try:
-            slope, intercept, r_value, _, _ = stats.linregress(x, log_equity)
-            stability = r_value ** 2
-        except:
-            stability = 0.0
-    else:
-        stability = 0.0
-    
-    # Distribution metrics
-    skewness = strat_ret.skew()
-    kurtosis = strat_ret.kurtosis()
-    
-    # Win rate (daily) - percentage of days with positive returns
-    win_days = strat_ret[strat_ret > 0].count()
-    total_days = strat_ret[strat_ret != 0].count()
-    win_rate_daily = win_days / total_days if total_days > 0 else 0
-    
-    # Market exposure (percentage of time in position)
-    position = df['Position'].dropna()
-    exposure = (position > 0).sum() / len(position) if len(position) > 0 else 0
-    
-    return {
+    valid = ~np.isnan(returns)
+    has_nan = not valid.all()
+    n = valid.sum(axis=0)
+    # A skipped bar is a zero return for the compounded path and a zero
+    # deviation for the moments, which is what dropna() gives per column
+    clean = np.where(valid, returns, 0.0) if has_nan else returns
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mean = clean.sum(axis=0) / n
+        dev = np.where(valid, returns - mean, 0.0) if has_nan else returns - mean
+        dev2 = dev * dev
+        m2 = dev2.sum(axis=0)
+        volatility = np.sqrt(m2 / (n - 1)) * np.sqrt(periods_per_year)
+        excess_return = mean * periods_per_year - risk_free_rate
+        sharpe = excess_return / volatility
+
+        # Sortino: sample std of the negative returns only
+        negative = returns < 0
+        n_neg = negative.sum(axis=0)
+        neg_mean = np.where(negative, returns, 0.0).sum(axis=0) / n_neg
+        neg_var = np.where(negative, (returns - neg_mean) ** 2, 0.0).sum(axis=0) / (n_neg - 1)
+        sortino = excess_return / (np.sqrt(neg_var) * np.sqrt(periods_per_year))
+
+        # One cumulative product, running peak and drawdown for every drawdown metric
+        cum_ret = np.cumprod(1 + clean, axis=0)
+        peak = np.maximum.accumulate(cum_ret, axis=0)
+        drawdown = (cum_ret - peak) / peak
+        max_drawdown = drawdown.min(axis=0)
+
+        total_return = equity[-1] / equity[0] - 1
+        cagr = (1 + total_return) ** (365.0 / days) - 1 if days != 0 else np.zeros_like(total_return)
+        calmar = cagr / np.abs(max_drawdown)
+
+        # Bias-corrected skewness and excess kurtosis (pandas' estimators)
+        m3 = (dev2 * dev).sum(axis=0)
+        m4 = (dev2 * dev2).sum(axis=0)
+        m2 = np.where(np.abs(m2) < _FP_NOISE, 0.0, m2)
+        m3 = np.where(np.abs(m3) < _FP_NOISE, 0.0, m3)
+        skewness = np.where(m2 == 0, 0.0, (n * (n - 1) ** 0.5 / (n - 2)) * (m3 / m2 ** 1.5))
+        skewness = np.where(n < 3, np.nan, skewness)
+        numerator = n * (n + 1) * (n - 1) * m4
+        denominator = (n - 2) * (n - 3) * m2 ** 2
+        numerator = np.where(np.abs(numerator) < _FP_NOISE, 0.0, numerator)
+        denominator = np.where(np.abs(denominator) < _FP_NOISE, 0.0, denominator)
+        kurtosis = np.where(denominator == 0, 0.0,
+                            numerator / denominator - 3 * (n - 1) ** 2 / ((n - 2) * (n - 3)))
+        kurtosis = np.where(n < 4, np.nan, kurtosis)
+
+        # Stability: R² of log equity against bar number (closed form)
+        positive = np.all(equity > 0, axis=0)
+        log_equity = np.log(np.where(positive, equity, 1.0))
+        x = np.arange(len(equity), dtype=np.float64)
+        dx = x - x.mean()
+        dy = log_equity - log_equity.mean(axis=0)
+        sxx = np.dot(dx, dx)
+        syy = (dy * dy).sum(axis=0)
+        r = np.clip(dx @ dy / np.sqrt(sxx * syy), -1.0, 1.0)
+        stability = np.where(positive & (sxx > 0) & (syy > 0), r ** 2, 0.0)
+
+        wins = (returns > 0).sum(axis=0)
+        active = (valid & (returns != 0)).sum(axis=0)
+        win_rate_daily = np.where(active > 0, wins / active, 0.0)
+
+        if position is None:
+            exposure = np.ones(returns.shape[1])
+        else:
+            held = ~np.isnan(position)
+            counted = held.sum(axis=0)
+            exposure = np.where(counted > 0, (position > 0).sum(axis=0) / counted, 0.0)
+
+        # Historical VaR and expected shortfall
+        q = (1 - confidence_level) * 100
+        if has_nan:
+            with warnings.catch_warnings():
+                warnings.simplefilter('ignore', RuntimeWarning)  # all-NaN columns
+                var_95 = np.nanpercentile(returns, q, axis=0)
+        else:
+            var_95 = np.percentile(returns, q, axis=0)
+        tail = valid & (returns <= var_95)
+        cvar_95 = np.where(tail, returns, 0.0).sum(axis=0) / tail.sum(axis=0)
+        cvar_95 = np.where(tail.any(axis=0), cvar_95, var_95)
+
+        # Ulcer Index on the equity curve, in percent
+        if len(equity) > 1:
+            running_max = np.maximum.accumulate(equity, axis=0)
+            drawdown_pct = ((equity - running_max) / running_max) * 100
+            ulcer_index = np.sqrt(np.mean(drawdown_pct ** 2, axis=0))
+        else:
+            ulcer_index = np.zeros(returns.shape[1])
+
+        hit_rate = wins / n
+        best_day = np.where(valid, returns, -np.inf).max(axis=0)
+        worst_day = np.where(valid, returns, np.inf).min(axis=0)
+
+    metrics = {
         "CAGR": cagr,
         "Total_Return": total_return,
         "Volatility": volatility,
-        "Sharpe": sharpe if not np.isnan(sharpe) and not np.isinf(sharpe) else 0.0,
-        "Sortino": sortino if not np.isnan(sortino) and not np.isinf(sortino) else 0.0,
-        "Calmar": calmar if not np.isnan(calmar) and not np.isinf(calmar) else 0.0,
+        "Sharpe": _finite_or_zero(sharpe),
+        "Sortino": _finite_or_zero(sortino),
+        "Calmar": _finite_or_zero(calmar),
         "Max_Drawdown": max_drawdown,
         "Stability": stability,
-        "Skewness": skewness if not np.isnan(skewness) else 0.0,
-        "Kurtosis": kurtosis if not np.isnan(kurtosis) else 0.0,
+        "Skewness": np.where(np.isnan(skewness), 0.0, skewness),
+        "Kurtosis": np.where(np.isnan(kurtosis), 0.0, kurtosis),
         "Win_Rate_Daily": win_rate_daily,
-        "Market_Exposure": exposure
+        "Market_Exposure": exposure,
+        "VaR_95": var_95,
+        "CVaR_95": cvar_95,
+        "Ulcer_Index": ulcer_index,
+        "Hit_Rate": hit_rate,
+        "Best_Day": best_day,
+        "Worst_Day": worst_day
     }
+    if days == 0:
+        metrics.update({key: np.zeros(returns.shape[1]) for key in ADVANCED_KEYS})
+    # Columns without a single return report zeros, like an empty Series
+    empty = n == 0
+    if empty.any():
+        metrics = {key: np.where(empty, 0.0, values) for key, values in metrics.items()}
+    return metrics, cum_ret, drawdown
 
 
-def calculate_drawdown_recovery(df: pd.DataFrame) -> dict:
+def _series_metrics(returns, equity, index, position=None, risk_free_rate=0.06,
+                    periods_per_year=252, confidence_level=0.95):
     """
-    Calculate drawdown recovery metrics.
-    
+    Fused metrics kernel over one return/equity series.
+
+    Args:
+        returns: Per-bar returns (NaNs are dropped, as Series.dropna() would)
+        equity: Equity curve aligned with `index`
+        index: DatetimeIndex of the result frame
+        position: Per-bar positions for Market_Exposure; None means always
+            invested (buy & hold)
+        risk_free_rate: Annual risk-free rate
+        periods_per_year: Bars per year used for annualization
+        confidence_level: Confidence level for VaR/CVaR
+
     Returns:
-        Dict with peak_date, trough_date, recovery_date, recovery_days, max_drawdown
+        Dict with ADVANCED_KEYS, RISK_KEYS and RECOVERY_KEYS
+    """
+    returns = np.asarray(returns, dtype=np.float64)
+    equity = np.asarray(equity, dtype=np.float64)
+    days = (index[-1] - index[0]).days if len(index) else 0
+    valid = ~np.isnan(returns)
+    if not valid.all():
+        returns = returns[valid]
+        index = index[valid]
+
+    if len(returns) == 0:
+        metrics = dict.fromkeys(ADVANCED_KEYS + RISK_KEYS, 0.0)
+        metrics.update(dict.fromkeys(RECOVERY_KEYS[:4]))
+        return metrics
+
+    if position is not None:
+        position = np.asarray(position, dtype=np.float64)[:, None]
+    columns, cum_ret, drawdown = _column_metrics(
+        returns[:, None], equity[:, None], days, position=position,
+        risk_free_rate=risk_free_rate, periods_per_year=periods_per_year,
+        confidence_level=confidence_level
+    )
+    metrics = {key: values[0] for key, values in columns.items()}
+
+    # Drawdown recovery: peak before the deepest trough, then first bar back at that peak
+    cum_ret = cum_ret[:, 0]
+    trough = int(np.argmin(drawdown[:, 0]))
+    peak_pos = int(np.argmax(cum_ret[:trough + 1]))
+    recovered = np.flatnonzero(cum_ret[trough:] >= cum_ret[peak_pos])
+    peak_date = index[peak_pos]
+    if len(recovered) > 0:
+        recovery_date = index[trough + recovered[0]]
+        recovery_days = (recovery_date - peak_date).days
+    else:
+        recovery_date = None
+        recovery_days = None
+
+    metrics.update({
+        "Peak_Date": peak_date,
+        "Trough_Date": index[trough],
+        "Recovery_Date": recovery_date,
+        "Recovery_Days": recovery_days
+    })
+    return metrics
+
+
+def calculate_all_metrics(df: pd.DataFrame, trades_df=None, risk_free_rate: float = 0.06,
+                          periods_per_year: int = 252, confidence_level: float = 0.95,
+                          returns_column: str = 'Strategy_Return',
+                          equity_column: str = 'Strategy_Equity',
+                          position_column='Position') -> dict:
+    """
+    Every headline, risk and drawdown-recovery metric in one fused pass.
+
+    Equivalent to merging calculate_advanced_metrics,
+    calculate_additional_risk_metrics, calculate_drawdown_recovery and (if
+    trades are given) calculate_trade_metrics, without recomputing the
+    cumulative return and drawdown series for each.
+
+    Args:
+        df: Result DataFrame from a Backtester run
+        trades_df: Optional trade log; adds the calculate_trade_metrics keys
+        risk_free_rate: Annual risk-free rate (default 6% for India)
+        periods_per_year: Bars per year used for annualization
+        confidence_level: Confidence level for VaR/CVaR (default 95%)
+        returns_column: Column of per-bar returns ('Market_Return' for buy & hold)
+        equity_column: Column of the matching equity curve
+        position_column: Column of positions; None (or a missing column)
+            counts as always invested
+
+    Returns:
+        Dict of metrics
+    """
+    metrics = _series_metrics(
+        df[returns_column].to_numpy(), df[equity_column].to_numpy(), df.index,
+        position=df[position_column].to_numpy() if position_column in df.columns else None,
+        risk_free_rate=risk_free_rate, periods_per_year=periods_per_year,
+        confidence_level=confidence_level
+    )
+    if trades_df is not None:
+        metrics.update(calculate_trade_metrics(trades_df))
+    return metrics
+
+
+def calculate_matrix_metrics(returns, equity, index, position=None, labels=None,
+                             risk_free_rate: float = 0.06, periods_per_year: int = 252,
+                             confidence_level: float = 0.95) -> pd.DataFrame:
     """
-    strat_ret = df['Strategy_Return'].dropna()
+    Metrics table for a (bars x strategies) matrix of return series.
     
-    if len(strat_ret) == 0:
-        return {
-            "Peak_Date": None,
-            "Trough_Date": None,
-            "Recovery_Date": None,
-            "Recovery_Days": None,
-            "Max_Drawdown": 0.0
-        }
+    Same definitions as calculate_all_metrics for every column (NaN returns
+    are skipped per column, like Series.dropna()), but each metric is a
+    vectorized reduction along axis 0, so a whole sweep is ranked without
+    a Python loop. For a grid run:
     
-    cum_ret = (1 + strat_ret).cumprod()
-    peak = cum_ret.cummax()
-    drawdown = (cum_ret - peak) / peak
+        grid = bt.run_momentum_grid(range(5, 301))
+        table = calculate_matrix_metrics(grid['Strategy_Return'], grid['Strategy_Equity'],
+                                         grid['Index'], grid['Position'], labels=grid['Params'])
     
-    # Find max drawdown point
-    trough_idx = drawdown.idxmin()
-    trough_date = trough_idx
+    Args:
+        returns: (bars x strategies) array of per-bar returns
+        equity: Matching (bars x strategies) equity curves
+        index: DatetimeIndex of the bars
+        position: Optional matching positions for Market_Exposure; None
+            means always invested
+        labels: Row labels (e.g. symbols); a DataFrame of parameters (such
+            as grid['Params']) becomes a MultiIndex. Default 0..k-1
+        risk_free_rate: Annual risk-free rate (default 6% for India)
+        periods_per_year: Bars per year used for annualization
+        confidence_level: Confidence level for VaR/CVaR (default 95%)
     
-    # Find peak before trough
-    peak_idx = cum_ret[:trough_idx].idxmax() if len(cum_ret[:trough_idx]) > 0 else cum_ret.index[0]
-    peak_date = peak_idx
+    Returns:
+        DataFrame with one row per strategy and the ADVANCED_KEYS and
+        RISK_KEYS columns (CAGR, Sharpe, Sortino, Calmar, Max_Drawdown,
+        VaR_95, CVaR_95, Ulcer_Index, Skewness, Kurtosis, Market_Exposure, ...)
+    """
+    returns = np.asarray(returns, dtype=np.float64)
+    returns = returns.reshape(len(returns), -1)
+    equity = np.asarray(equity, dtype=np.float64).reshape(returns.shape)
+    if position is not None:
+        position = np.asarray(position, dtype=np.float64).reshape(returns.shape)
+    days = (index[-1] - index[0]).days if len(index) else 0
+    
+    metrics, _, _ = _column_metrics(returns, equity, days, position=position,
+                                    risk_free_rate=risk_free_rate, periods_per_year=periods_per_year,
+                                    confidence_level=confidence_level)
+    
+    if isinstance(labels, pd.DataFrame):
+        labels = pd.MultiIndex.from_frame(labels)
+    return pd.DataFrame(metrics, index=labels)
+
+
+def calculate_advanced_metrics(df: pd.DataFrame, risk_free_rate: float = 0.06,
+                               periods_per_year: int = 252) -> dict:
+    """
+    Calculate comprehensive risk and performance metrics.
     
-    # Find recovery (first time equity >= peak after trough)
-    peak_value = cum_ret.loc[peak_idx]
-    recovery_series = cum_ret[trough_idx:]
-    recovery_points = recovery_series[recovery_series >= peak_value]
+    All metrics use open-to-open strategy returns for consistency.
     
-    if len(recovery_points) > 0:
-        recovery_date = recovery_points.index[0]
-        recovery_days = (recovery_date - peak_date).days
-    else:
-        recovery_date = None
-        recovery_days = None
+    Args:
+        df: DataFrame with 'Strategy_Return' and 'Strategy_Equity' columns
+        risk_free_rate: Annual risk-free rate (default 6% for India)
+        periods_per_year: Bars per year used for annualization
+            (252 for daily bars, 252 * 375 for NSE minute bars)
     
-    return {
-        "Peak_Date": peak_date,
-        "Trough_Date": trough_date,
-        "Recovery_Date": recovery_date,
-        "Recovery_Days": recovery_days,
-        "Max_Drawdown": drawdown.min()
-    }
+    Returns:
+        Dictionary of metrics with proper handling of edge cases
+    """
+    metrics = calculate_all_metrics(df, risk_free_rate=risk_free_rate,
+                                    periods_per_year=periods_per_year)
+    return {key: metrics[key] for key in ADVANCED_KEYS}
+
+
+def calculate_drawdown_recovery(df: pd.DataFrame) -> dict:
+    """
+    Calculate drawdown recovery metrics.
+    
+    Returns:
+        Dict with peak_date, trough_date, recovery_date, recovery_days, max_drawdown
+    """
+    metrics = calculate_all_metrics(df)
+    return {key: metrics[key] for key in RECOVERY_KEYS}
 
 
 def calculate_trade_metrics(trades_df: pd.DataFrame) -> dict:
@@ -164,7 +366,8 @@ def calculate_trade_metrics(trades_df: pd.DataFrame) -> dict:
     This is TRADE-LEVEL win rate and metrics, distinct from daily metrics.
     
     Args:
-        trades_df: DataFrame with columns [Entry_Date, Exit_Date, PnL, Return_Pct]
+        trades_df: DataFrame with columns [Entry_Date, Exit_Date, PnL, Return_Pct],
+            or the structured array from Backtester(trade_log_format='array')
     
     Returns:
         Dict with trade-level metrics
@@ -179,27 +382,32 @@ def calculate_trade_metrics(trades_df: pd.DataFrame) -> dict:
             "Profit_Factor": 0.0
         }
     
-    winning_trades = trades_df[trades_df['PnL'] > 0]
-    losing_trades = trades_df[trades_df['PnL'] < 0]
+    pnl = np.asarray(trades_df['PnL'], dtype=float)
+    wins = pnl[pnl > 0]
+    losses = pnl[pnl < 0]
     
     # Win rate (per trade)
-    win_rate = len(winning_trades) / len(trades_df) if len(trades_df) > 0 else 0
+    win_rate = len(wins) / len(pnl)
     
-    # Average duration
-    trades_df_copy = trades_df.copy()
-    trades_df_copy['Duration'] = (
-        pd.to_datetime(trades_df_copy['Exit_Date']) - 
-        pd.to_datetime(trades_df_copy['Entry_Date'])
-    ).dt.days
-    avg_duration = trades_df_copy['Duration'].mean()
+    # Average duration in whole days; trades with a missing (NaT) date are
+    # skipped, as Series.mean() would
+    if isinstance(trades_df, np.ndarray):
+        duration = (trades_df['Exit_Date'] - trades_df['Entry_Date']).astype('timedelta64[D]')
+        duration_days = np.where(np.isnat(duration), np.nan, duration.astype(np.int64))
+    else:
+        duration_days = (
+            pd.to_datetime(trades_df['Exit_Date']) - 
+            pd.to_datetime(trades_df['Entry_Date'])
+        ).dt.days.to_numpy(dtype=float, na_value=np.nan)
+    avg_duration = np.nanmean(duration_days) if not np.isnan(duration_days).all() else np.nan
     
     # Win/Loss averages
-    avg_win = winning_trades['PnL'].mean() if len(winning_trades) > 0 else 0
-    avg_loss = losing_trades['PnL'].mean() if len(losing_trades) > 0 else 0
+    avg_win = wins.mean() if len(wins) > 0 else 0
+    avg_loss = losses.mean() if len(losses) > 0 else 0
     
     # Profit factor: sum(wins) / abs(sum(losses))
-    total_wins = winning_trades['PnL'].sum() if len(winning_trades) > 0 else 0
-    total_losses = abs(losing_trades['PnL'].sum()) if len(losing_trades) > 0 else 0
+    total_wins = wins.sum() if len(wins) > 0 else 0
+    total_losses = abs(losses.sum()) if len(losses) > 0 else 0
     profit_factor = total_wins / total_losses if total_losses != 0 else (np.inf if total_wins > 0 else 0)
     
     # Cap profit factor at reasonable value for display
@@ -227,82 +435,103 @@ def calculate_additional_risk_metrics(df: pd.DataFrame, confidence_level: float
     Returns:
         Dict with additional risk metrics
     """
-    strat_ret = df['Strategy_Return'].dropna()
-    
-    if len(strat_ret) == 0:
-        return {
-            "VaR_95": 0.0,
-            "CVaR_95": 0.0,
-            "Ulcer_Index": 0.0,
-            "Hit_Rate": 0.0,
-            "Best_Day": 0.0,
-            "Worst_Day": 0.0
-        }
-    
-    # Value at Risk (VaR) - Historical method
-    var_95 = np.percentile(strat_ret, (1 - confidence_level) * 100)
-    
-    # Conditional VaR (CVaR) - Expected Shortfall
-    # Average of returns worse than VaR
-    cvar_95 = strat_ret[strat_ret <= var_95].mean() if len(strat_ret[strat_ret <= var_95]) > 0 else var_95
-    
-    # Ulcer Index - measures depth and duration of drawdowns
-    equity = df['Strategy_Equity'].values
-    if len(equity) > 1:
-        running_max = pd.Series(equity).expanding().max()
-        drawdown_pct = ((equity - running_max) / running_max) * 100  # As percentage
-        ulcer_index = np.sqrt(np.mean(drawdown_pct ** 2))
-    else:
-        ulcer_index = 0.0
-    
-    # Hit Rate - percentage of positive return days
-    hit_rate = (strat_ret > 0).sum() / len(strat_ret) if len(strat_ret) > 0 else 0
-    
-    # Best and worst days
-    best_day = strat_ret.max()
-    worst_day = strat_ret.min()
-    
-    return {
-        "VaR_95": var_95,
-        "CVaR_95": cvar_95,
-        "Ulcer_Index": ulcer_index,
-        "Hit_Rate": hit_rate,
-        "Best_Day": best_day,
-        "Worst_Day": worst_day
-    }
+    metrics = calculate_all_metrics(df, confidence_level=confidence_level)
+    return {key: metrics[key] for key in RISK_KEYS}
 
 
-def calculate_rolling_metrics(df: pd.DataFrame, window: int = 252) -> pd.DataFrame:
+def _rolling_max_drawdown(log_equity, window):
     """
-    Calculate rolling performance metrics.
+    Max drawdown inside every trailing `window`-bar slice of a log equity curve.
+
+    Van Herk/Gil-Werman: the series is cut into blocks of `window` bars and
+    each block gets prefix and suffix (max, min, worst drop) aggregates. A
+    window either is one block or spans the suffix of one block and the
+    prefix of the next, so every window combines two precomputed aggregates.
+    O(n) per window, independent of its length.
+
+    Returns:
+        Array of drawdowns (<= 0), NaN for the first window - 1 bars
+    """
+    n = len(log_equity)
+    out = np.full(n, np.nan)
+    if window > n:
+        return out
+
+    blocks = -(-n // window)
+    values = np.pad(log_equity, (0, blocks * window - n), mode='edge').reshape(blocks, window)
+
+    # Prefix aggregates: block start .. j
+    pre_max = np.maximum.accumulate(values, axis=1)
+    pre_min = np.minimum.accumulate(values, axis=1).ravel()
+    pre_drop = np.minimum.accumulate(values - pre_max, axis=1).ravel()
+
+    # Suffix aggregates: j .. block end
+    reverse = values[:, ::-1]
+    suf_max = np.maximum.accumulate(reverse, axis=1)[:, ::-1].ravel()
+    suf_drop = np.minimum.accumulate(np.minimum.accumulate(reverse, axis=1) - reverse,
+                                     axis=1)[:, ::-1].ravel()
+
+    start = np.arange(n - window + 1)
+    end = start + window - 1
+    spanning = np.minimum(np.minimum(suf_drop[start], pre_drop[end]), pre_min[end] - suf_max[start])
+    drop = np.where(start % window == 0, suf_drop[start], spanning)
+    out[window - 1:] = np.expm1(drop)
+    return out
+
+
+def calculate_rolling_metrics(df: pd.DataFrame, window=252, periods_per_year: int = 252,
+                              risk_free_rate: float = 0.06) -> pd.DataFrame:
+    """
+    Calculate rolling performance metrics in O(n) per window.
+    
+    Mean and volatility come from prefix sums of returns and squared
+    returns, the compounded return from differences of the cumulative log
+    return, and the max drawdown is the true peak-to-trough decline inside
+    each trailing window (calculate_advanced_metrics' Max_Drawdown on that
+    slice).
     
     Args:
         df: DataFrame with Strategy_Return column
-        window: Rolling window in days (default 252 = 1 year)
+        window: Rolling window in bars (default 252 = 1 year of daily bars),
+            or a list of windows computed together
+        periods_per_year: Bars per year used for annualization
+        risk_free_rate: Annual risk-free rate
     
     Returns:
-        DataFrame with rolling metrics
+        DataFrame with Rolling_Sharpe, Rolling_Volatility, Rolling_Return and
+        Rolling_Max_DD; for a list of windows every column name is suffixed
+        with its window (e.g. Rolling_Sharpe_30)
     """
-    strat_ret = df['Strategy_Return'].dropna()
-    
-    # Rolling Sharpe
-    rolling_mean = strat_ret.rolling(window).mean() * 252
-    rolling_std = strat_ret.rolling(window).std() * np.sqrt(252)
-    rolling_sharpe = (rolling_mean - 0.06) / rolling_std
-    
-    # Rolling volatility
-    rolling_vol = strat_ret.rolling(window).std() * np.sqrt(252)
-    
-    # Rolling max drawdown
-    rolling_cumret = (1 + strat_ret).rolling(window).apply(lambda x: x.prod(), raw=False)
-    rolling_peak = rolling_cumret.rolling(window).max()
-    rolling_dd = (rolling_cumret - rolling_peak) / rolling_peak
-    
-    return pd.DataFrame({
-        'Rolling_Sharpe': rolling_sharpe,
-        'Rolling_Volatility': rolling_vol,
-        'Rolling_Max_DD': rolling_dd
-    }, index=df.index)
+    strat_ret = df['Strategy_Return'].dropna().astype(np.float64)
+    returns = strat_ret.to_numpy()
+    windows = np.atleast_1d(np.asarray(window, dtype=np.int64))
+    
+    # Rolling Sharpe and volatility from prefix sums
+    s1 = rolling_sum(returns, windows, dtype=np.float64)
+    s2 = rolling_sum(returns * returns, windows, dtype=np.float64)
+    w = windows[None, :].astype(np.float64)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = s1 / w
+        rolling_vol = np.sqrt(np.maximum((s2 - s1 * mean) / (w - 1), 0.0)) * np.sqrt(periods_per_year)
+        rolling_sharpe = (mean * periods_per_year - risk_free_rate) / rolling_vol
+    # Flat windows (e.g. out of the market) have no defined Sharpe
+    rolling_sharpe[rolling_vol == 0] = np.nan
+    
+    # Compounded return and max drawdown from the cumulative log return
+    log_returns = np.log1p(returns)
+    rolling_return = np.expm1(rolling_sum(log_returns, windows, dtype=np.float64))
+    log_equity = np.cumsum(log_returns)
+    rolling_dd = np.column_stack([_rolling_max_drawdown(log_equity, int(w)) for w in windows])
+    
+    columns = {}
+    for i, w in enumerate(windows):
+        suffix = '' if np.ndim(window) == 0 else f'_{w}'
+        columns[f'Rolling_Sharpe{suffix}'] = rolling_sharpe[:, i]
+        columns[f'Rolling_Volatility{suffix}'] = rolling_vol[:, i]
+        columns[f'Rolling_Return{suffix}'] = rolling_return[:, i]
+        columns[f'Rolling_Max_DD{suffix}'] = rolling_dd[:, i]
+    
+    return pd.DataFrame(columns, index=strat_ret.index).reindex(df.index)
 
 
 def _empty_metrics():
@@ -0,0 +1,238 @@
+"""
+Memory-mapped OHLCV store.
+
+One binary file per dataset, opened with np.memmap so every process reading
+the same history shares one physical copy through the OS page cache:
+
+    header   64 bytes: magic, n_rows, n_cols, datetime unit, index resolution,
+             bitmask of integer columns
+    names    n_cols + 1 fixed 16-byte ASCII fields (index name, then columns)
+    index    int64[n_rows]            epoch stamps, strictly increasing
+    values   float64[n_cols, n_rows]  one contiguous run per column
+
+Daily bars (midnight timestamps) store the index as epoch days (resolution
+'D'); intraday bars (e.g. N-minute bars from ingest_ticks) store it in the
+index's own unit, e.g. epoch seconds.
+
+Date-range reads binary-search the index and return DataFrames whose
+columns are views into the mapping (no copy of the price data). Mappings
+are copy-on-write: a caller that edits a frame in place gets private pages
+and the file is never modified. All value columns are stored as float64;
+integer columns (e.g. Volume read from a CSV) are flagged in the header
+and read back as int64, so a frame round-trips with the CSV's dtypes.
+"""
+
+import os
+
+import numpy as np
+import pandas as pd
+
+try:
+    from .data_cache import atomic_write, cache_paths, cached_meta, record_source
+except ImportError:
+    from data_cache import atomic_write, cache_paths, cached_meta, record_source
+
+
+STORE_FORMAT = 'ohlcv'
+MAGIC = b'OHLCVMM2'
+HEADER_BYTES = 64
+NAME_BYTES = 16
+MAX_COLUMNS = 64            # one bit per column in the integer-column mask
+
+
+def _epoch_stamps(index):
+    """
+    int64 epoch stamps of a DatetimeIndex and their resolution.
+
+    Whole dates are stored as days ('D'), anything else in the index unit.
+    """
+    days = index.values.astype('datetime64[D]')
+    if (days == index.values).all():
+        return days.astype(np.int64), 'D'
+    return index.values.astype(np.int64), np.datetime_data(index.dtype)[0]
+
+
+def _encode_name(name):
+    raw = ('' if name is None else str(name)).encode('ascii')
+    if len(raw) > NAME_BYTES:
+        raise ValueError(f"Column name too long for the store: {name!r}")
+    return raw.ljust(NAME_BYTES, b'\0')
+
+
+def write_store(df, path):
+    """
+    Write an OHLCV DataFrame (daily or intraday bars) to a store file (atomically).
+
+    Args:
+        df: DataFrame with a timezone-naive DatetimeIndex and numeric columns
+        path: Destination file
+    """
+    if not isinstance(df.index, pd.DatetimeIndex) or df.index.tz is not None:
+        raise ValueError("OHLCV store needs a timezone-naive DatetimeIndex")
+    stamps, resolution = _epoch_stamps(df.index)
+    if len(stamps) > 1 and not (np.diff(stamps) > 0).all():
+        raise ValueError("OHLCV store index must be strictly increasing")
+    if df.shape[1] > MAX_COLUMNS:
+        raise ValueError(f"OHLCV store holds at most {MAX_COLUMNS} columns, got {df.shape[1]}")
+    unit = np.datetime_data(df.index.dtype)[0]
+    values = np.ascontiguousarray(df.to_numpy(dtype=np.float64).T)
+    integer = sum(1 << j for j, dtype in enumerate(df.dtypes) if dtype.kind in 'iu')
+
+    header = np.zeros(HEADER_BYTES, dtype=np.uint8)
+    header[:8] = np.frombuffer(MAGIC, dtype=np.uint8)
+    header[8:24] = np.array([len(df), df.shape[1]], dtype='<i8').view(np.uint8)
+    header[24:32] = np.frombuffer(unit.encode('ascii').ljust(8, b'\0'), dtype=np.uint8)
+    header[32:40] = np.frombuffer(resolution.encode('ascii').ljust(8, b'\0'), dtype=np.uint8)
+    header[40:48] = np.array([integer], dtype='<u8').view(np.uint8)
+    names = b''.join(_encode_name(name) for name in [df.index.name, *df.columns])
+
+    def write(tmp_path):
+        with open(tmp_path, 'wb') as f:
+            f.write(header.tobytes())
+            f.write(names)
+            f.write(stamps.astype('<i8').tobytes())
+            f.write(values.astype('<f8').tobytes())
+    atomic_write(path, write)
+
+
+class OHLCVStore:
+    """
+    Memory-mapped (copy-on-write) view of a store file.
+
+    Attributes:
+        stamps: int64 memmap of epoch stamps in units of `resolution`
+        resolution: 'D' for daily stores, else the datetime unit (e.g. 's')
+        values: float64 memmap of shape (n_cols, n_rows)
+        columns: Column names
+        integer: Per column, whether frame() returns it as int64
+    """
+
+    def __init__(self, path):
+        self.path = path
+        header = np.fromfile(path, dtype=np.uint8, count=HEADER_BYTES)
+        if header[:8].tobytes() != MAGIC:
+            raise ValueError(f"Not an OHLCV store file (or an older layout): {path}")
+        n_rows, n_cols = header[8:24].view('<i8')
+        self.unit = header[24:32].tobytes().rstrip(b'\0').decode('ascii')
+        self.resolution = header[32:40].tobytes().rstrip(b'\0').decode('ascii') or 'D'
+        integer = int(header[40:48].view('<u8')[0])
+        self.integer = [bool(integer >> j & 1) for j in range(n_cols)]
+
+        names_bytes = (n_cols + 1) * NAME_BYTES
+        with open(path, 'rb') as f:
+            f.seek(HEADER_BYTES)
+            raw = f.read(names_bytes)
+        names = [raw[i:i + NAME_BYTES].rstrip(b'\0').decode('ascii')
+                 for i in range(0, names_bytes, NAME_BYTES)]
+        self.index_name = names[0] or None
+        self.columns = names[1:]
+
+        offset = HEADER_BYTES + names_bytes
+        self.stamps = np.memmap(path, dtype='<i8', mode='c', offset=offset, shape=(n_rows,)) \
+            if n_rows else np.empty(0, dtype=np.int64)
+        offset += 8 * n_rows
+        self.values = np.memmap(path, dtype='<f8', mode='c', offset=offset, shape=(n_cols, n_rows)) \
+            if n_rows else np.empty((n_cols, 0))
+
+    def __len__(self):
+        return len(self.stamps)
+
+    def _timestamp(self, stamp):
+        return pd.Timestamp(np.datetime64(int(stamp), self.resolution))
+
+    def _stamp(self, date, round_to):
+        """Epoch stamp of a date, rounded ('ceil' or 'floor') to the store resolution."""
+        rounded = getattr(pd.Timestamp(date), round_to)(self.resolution)
+        return np.datetime64(rounded, self.resolution).astype(np.int64)
+
+    @property
+    def first_date(self):
+        return self._timestamp(self.stamps[0]) if len(self) else None
+
+    @property
+    def last_date(self):
+        return self._timestamp(self.stamps[-1]) if len(self) else None
+
+    def locate(self, start_date=None, end_date=None):
+        """
+        Row bounds [lo, hi) of start_date <= date <= end_date by binary search.
+
+        Matches df[(df.index >= start_date) & (df.index <= end_date)].
+        """
+        lo = 0
+        hi = len(self.stamps)
+        if start_date is not None:
+            lo = int(np.searchsorted(self.stamps, self._stamp(start_date, 'ceil'), side='left'))
+        if end_date is not None:
+            hi = int(np.searchsorted(self.stamps, self._stamp(end_date, 'floor'), side='right'))
+        return lo, max(lo, hi)
+
+    def frame(self, start_date=None, end_date=None):
+        """
+        DataFrame for a date range whose columns are views into the mapping.
+
+        Only the (small) DatetimeIndex and any integer columns are
+        materialized.
+        """
+        lo, hi = self.locate(start_date, end_date)
+        stamps = np.asarray(self.stamps[lo:hi]).astype(f'datetime64[{self.resolution}]')
+        index = pd.DatetimeIndex(stamps.astype(f'datetime64[{self.unit}]'), name=self.index_name)
+        df = pd.DataFrame(self.values[:, lo:hi].T, index=index, columns=self.columns, copy=False)
+        for j, column in enumerate(self.columns):
+            if self.integer[j]:
+                df[column] = self.values[j, lo:hi].astype(np.int64)
+        return df
+
+
+def append_store(path, df):
+    """
+    Append rows dated after the store's last date (atomically).
+
+    The file is rewritten through a temp file and os.replace, so readers
+    see either the old or the new store, never a partial one. Rows on or
+    before the last stored date are ignored.
+
+    Args:
+        path: Store file
+        df: DataFrame with the store's columns
+
+    Returns:
+        Number of rows appended
+    """
+    store = OHLCVStore(path)
+    last = store.last_date
+    new = df[df.index > last] if last is not None else df
+    if new.empty:
+        return 0
+    combined = pd.concat([store.frame(), new[store.columns]])
+    write_store(combined, path)
+    return len(new)
+
+
+def open_store(path):
+    """Open a store file, or return None if it does not exist or has an older layout."""
+    try:
+        return OHLCVStore(path)
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def load_store_cached(csv_path):
+    """
+    Open the store built from a daily OHLCV CSV, (re)building it if stale.
+
+    The store lives next to the CSV (raw_nifty.csv -> raw_nifty.ohlcv) and
+    is validated with the data_cache mtime/hash sidecar. Rows are sorted by
+    date and, for a repeated date, the row written last in the CSV is kept.
+
+    Returns:
+        OHLCVStore
+    """
+    store_path, _ = cache_paths(csv_path, STORE_FORMAT)
+    if cached_meta(csv_path, STORE_FORMAT) is None:
+        stat = os.stat(csv_path)
+        df = pd.read_csv(csv_path, index_col=0, parse_dates=True)
+        df = df[~df.index.duplicated(keep='last')].sort_index(kind='stable')
+        write_store(df, store_path)
+        record_source(csv_path, STORE_FORMAT, stat=stat)
+    return OHLCVStore(store_path)
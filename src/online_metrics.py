@@ -0,0 +1,317 @@
+"""
+Online (bar-by-bar) performance metrics for end-of-day production runs.
+
+MetricsAccumulator keeps running moments and counters instead of the
+return history, so adding a day costs O(1):
+
+- Welford mean/variance of returns, with third and fourth central moments
+  (Pebay's update) for skewness and kurtosis
+- A separate Welford mean/variance over the negative returns (Sortino)
+- Running compounded return, peak and worst drawdown
+- Running equity peak and sum of squared percentage drawdowns (Ulcer Index)
+- Running co-moments of log equity against bar number (Stability)
+- Win/hit counters, best and worst day, time in market
+
+Its state is a flat dict of numbers (to_dict / from_dict, save / load as
+JSON), so a daily job can resume where the previous one stopped. After the
+same bars, metrics() agrees with calculate_advanced_metrics and the
+matching calculate_additional_risk_metrics keys to floating-point
+round-off. VaR_95 and CVaR_95 need the whole return distribution and are
+not tracked.
+"""
+
+import json
+import math
+
+import numpy as np
+import pandas as pd
+
+try:
+    from .metrics import ADVANCED_KEYS, _FP_NOISE, _empty_metrics
+except ImportError:
+    from metrics import ADVANCED_KEYS, _FP_NOISE, _empty_metrics
+
+
+ONLINE_RISK_KEYS = ("Ulcer_Index", "Hit_Rate", "Best_Day", "Worst_Day")
+
+
+class MetricsAccumulator:
+    """
+    Incremental metrics over a stream of (date, return, equity, position) bars.
+
+    Usage:
+        acc = MetricsAccumulator.load('state.json')   # or MetricsAccumulator()
+        acc.update(date, strategy_return, strategy_equity, position)
+        acc.metrics()
+        acc.save('state.json')
+    """
+
+    # Everything the metrics are derived from; to_dict() writes exactly these
+    _STATE = (
+        'risk_free_rate', 'periods_per_year',
+        'count', 'mean', 'm2', 'm3', 'm4',
+        'neg_count', 'neg_mean', 'neg_m2',
+        'wins', 'nonzero', 'best', 'worst',
+        'growth', 'growth_peak', 'max_drawdown',
+        'first_date', 'last_date', 'first_equity', 'last_equity',
+        'equity_count', 'equity_peak', 'ulcer_sum', 'all_positive',
+        'x_mean', 'y_mean', 'sxx', 'syy', 'sxy',
+        'held', 'position_count'
+    )
+
+    def __init__(self, risk_free_rate=0.06, periods_per_year=252):
+        """
+        Initialize an empty accumulator.
+
+        Args:
+            risk_free_rate: Annual risk-free rate (default 6% for India)
+            periods_per_year: Bars per year used for annualization
+        """
+        self.risk_free_rate = risk_free_rate
+        self.periods_per_year = periods_per_year
+
+        # Returns: Welford mean and central moment sums
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.m3 = 0.0
+        self.m4 = 0.0
+        # Negative returns only (downside deviation)
+        self.neg_count = 0
+        self.neg_mean = 0.0
+        self.neg_m2 = 0.0
+        self.wins = 0
+        self.nonzero = 0
+        self.best = None
+        self.worst = None
+        # Compounded returns and their drawdown
+        self.growth = 1.0
+        self.growth_peak = None
+        self.max_drawdown = 0.0
+        # Equity curve: span, Ulcer sums, log-linear fit
+        self.first_date = None
+        self.last_date = None
+        self.first_equity = None
+        self.last_equity = None
+        self.equity_count = 0
+        self.equity_peak = None
+        self.ulcer_sum = 0.0
+        self.all_positive = True
+        self.x_mean = 0.0
+        self.y_mean = 0.0
+        self.sxx = 0.0
+        self.syy = 0.0
+        self.sxy = 0.0
+        # Time in market
+        self.held = 0
+        self.position_count = 0
+
+    def update(self, date, strategy_return, equity, position=None):
+        """
+        Add one bar.
+
+        Args:
+            date: Bar timestamp
+            strategy_return: The bar's strategy return; NaN is skipped for the
+                return statistics, like Series.dropna()
+            equity: Strategy equity at the bar
+            position: Position held on the bar, or None if not tracked
+        """
+        date = pd.Timestamp(date)
+        if self.first_date is None:
+            self.first_date = date
+        self.last_date = date
+
+        if not math.isnan(strategy_return):
+            self._add_return(float(strategy_return))
+        self._add_equity(float(equity))
+        if position is not None and not math.isnan(position):
+            self.position_count += 1
+            self.held += int(position > 0)
+
+    def _add_return(self, r):
+        # Welford / Pebay update of mean and central moment sums
+        n1 = self.count
+        self.count += 1
+        n = self.count
+        delta = r - self.mean
+        delta_n = delta / n
+        delta_n2 = delta_n * delta_n
+        term1 = delta * delta_n * n1
+        self.mean += delta_n
+        self.m4 += term1 * delta_n2 * (n * n - 3 * n + 3) + 6 * delta_n2 * self.m2 - 4 * delta_n * self.m3
+        self.m3 += term1 * delta_n * (n - 2) - 3 * delta_n * self.m2
+        self.m2 += term1
+
+        if r < 0:
+            self.neg_count += 1
+            neg_delta = r - self.neg_mean
+            self.neg_mean += neg_delta / self.neg_count
+            self.neg_m2 += neg_delta * (r - self.neg_mean)
+
+        self.wins += r > 0
+        self.nonzero += r != 0
+        self.best = r if self.best is None else max(self.best, r)
+        self.worst = r if self.worst is None else min(self.worst, r)
+
+        self.growth *= 1 + r
+        self.growth_peak = self.growth if self.growth_peak is None else max(self.growth_peak, self.growth)
+        self.max_drawdown = min(self.max_drawdown, (self.growth - self.growth_peak) / self.growth_peak)
+
+    def _add_equity(self, equity):
+        if self.first_equity is None:
+            self.first_equity = equity
+        self.last_equity = equity
+
+        self.equity_peak = equity if self.equity_peak is None else max(self.equity_peak, equity)
+        drawdown_pct = (equity - self.equity_peak) / self.equity_peak * 100
+        self.ulcer_sum += drawdown_pct * drawdown_pct
+
+        # Co-moments of (bar number, log equity) for the Stability R²
+        x = float(self.equity_count)
+        self.equity_count += 1
+        if equity <= 0:
+            self.all_positive = False
+        if self.all_positive:
+            y = math.log(equity)
+            dx = x - self.x_mean
+            self.x_mean += dx / self.equity_count
+            dy = y - self.y_mean
+            self.y_mean += dy / self.equity_count
+            self.sxx += dx * (x - self.x_mean)
+            self.syy += dy * (y - self.y_mean)
+            self.sxy += dx * (y - self.y_mean)
+
+    def replay(self, df):
+        """
+        Feed a result DataFrame (Strategy_Return, Strategy_Equity, optional
+        Position) through update, bar by bar.
+
+        Returns:
+            self
+        """
+        position = df['Position'].values if 'Position' in df.columns else [None] * len(df)
+        for row in zip(df.index, df['Strategy_Return'].values, df['Strategy_Equity'].values, position):
+            self.update(*row)
+        return self
+
+    def metrics(self):
+        """
+        Current metrics.
+
+        Returns:
+            Dict with the calculate_advanced_metrics keys and Ulcer_Index,
+            Hit_Rate, Best_Day, Worst_Day from calculate_additional_risk_metrics
+        """
+        n = self.count
+        if n == 0:
+            return dict.fromkeys(ADVANCED_KEYS + ONLINE_RISK_KEYS, 0.0)
+
+        metrics = self._headline_metrics()
+        metrics.update({
+            "Ulcer_Index": math.sqrt(self.ulcer_sum / self.equity_count) if self.equity_count > 1 else 0.0,
+            "Hit_Rate": self.wins / n,
+            "Best_Day": self.best,
+            "Worst_Day": self.worst
+        })
+        return metrics
+
+    def _headline_metrics(self):
+        days = (self.last_date - self.first_date).days
+        if days == 0:
+            return _empty_metrics()
+
+        n = self.count
+        ppy = self.periods_per_year
+        total_return = self.last_equity / self.first_equity - 1
+        cagr = (1 + total_return) ** (365.0 / days) - 1
+
+        volatility = math.sqrt(self.m2 / (n - 1)) * math.sqrt(ppy) if n > 1 else np.nan
+        excess_return = self.mean * ppy - self.risk_free_rate
+        sharpe = excess_return / volatility if volatility != 0 else np.nan
+
+        if self.neg_count > 1:
+            downside_std = math.sqrt(self.neg_m2 / (self.neg_count - 1)) * math.sqrt(ppy)
+            sortino = excess_return / downside_std if downside_std != 0 else np.nan
+        elif self.neg_count == 1:
+            sortino = np.nan
+        else:
+            sortino = np.inf if excess_return > 0 else np.nan
+
+        max_drawdown = self.max_drawdown
+        if max_drawdown == 0:
+            calmar = np.inf if cagr > 0 else np.nan
+        else:
+            calmar = cagr / abs(max_drawdown)
+
+        if self.all_positive and self.equity_count > 1 and self.sxx > 0 and self.syy > 0:
+            r = max(min(self.sxy / math.sqrt(self.sxx * self.syy), 1.0), -1.0)
+            stability = r * r
+        else:
+            stability = 0.0
+
+        skewness, kurtosis = self._skew_kurtosis()
+
+        return {
+            "CAGR": cagr,
+            "Total_Return": total_return,
+            "Volatility": volatility,
+            "Sharpe": sharpe if np.isfinite(sharpe) else 0.0,
+            "Sortino": sortino if np.isfinite(sortino) else 0.0,
+            "Calmar": calmar if np.isfinite(calmar) else 0.0,
+            "Max_Drawdown": max_drawdown,
+            "Stability": stability,
+            "Skewness": skewness,
+            "Kurtosis": kurtosis,
+            "Win_Rate_Daily": self.wins / self.nonzero if self.nonzero > 0 else 0,
+            "Market_Exposure": self.held / self.position_count if self.position_count > 0 else 1.0
+        }
+
+    def _skew_kurtosis(self):
+        """Bias-corrected skewness and excess kurtosis from the moment sums (pandas' estimators)."""
+        n = self.count
+        m2 = 0.0 if abs(self.m2) < _FP_NOISE else self.m2
+        m3 = 0.0 if abs(self.m3) < _FP_NOISE else self.m3
+
+        skewness = 0.0
+        if n >= 3 and m2 != 0:
+            skewness = (n * (n - 1) ** 0.5 / (n - 2)) * (m3 / m2 ** 1.5)
+
+        kurtosis = 0.0
+        if n >= 4:
+            numerator = n * (n + 1) * (n - 1) * self.m4
+            denominator = (n - 2) * (n - 3) * m2 ** 2
+            numerator = 0.0 if abs(numerator) < _FP_NOISE else numerator
+            if abs(denominator) >= _FP_NOISE:
+                kurtosis = numerator / denominator - 3 * (n - 1) ** 2 / ((n - 2) * (n - 3))
+        return skewness, kurtosis
+
+    def to_dict(self):
+        """Serializable state (dates as ISO strings)."""
+        state = {name: getattr(self, name) for name in self._STATE}
+        for name in ('first_date', 'last_date'):
+            if state[name] is not None:
+                state[name] = state[name].isoformat()
+        return state
+
+    @classmethod
+    def from_dict(cls, state):
+        """Rebuild an accumulator from to_dict() output."""
+        acc = cls()
+        for name in cls._STATE:
+            setattr(acc, name, state[name])
+        for name in ('first_date', 'last_date'):
+            if state[name] is not None:
+                setattr(acc, name, pd.Timestamp(state[name]))
+        return acc
+
+    def save(self, path):
+        """Write the state to a JSON file."""
+        with open(path, 'w') as f:
+            json.dump(self.to_dict(), f, indent=4)
+
+    @classmethod
+    def load(cls, path):
+        """Resume from a JSON file written by save()."""
+        with open(path) as f:
+            return cls.from_dict(json.load(f))
@@ -0,0 +1,288 @@
+"""
+Panel (multi-symbol) backtesting.
+
+Runs the Backtester strategy rules across many symbols at once. Prices are
+held as (dates x symbols) matrices, so positions, SL/TP exits, costs and
+equity for every symbol are computed as 2D array operations instead of a
+Python loop over symbols. Indicators come from the same indicators kernels
+as Backtester, one column per symbol, and are kept in INDICATOR_CACHE.
+
+Execution and cost rules are the same as Backtester:
+- Signals generated at close, positions taken at next day's open
+- Open-to-open returns plus daily dividend yield
+- Transaction costs only on position changes
+- Open positions force-closed on the last bar
+
+Symbols may trade on different calendars (fetch_many returns the union of
+dates with NaN where a symbol has no bar). Each symbol is run over its own
+bars only, exactly like a single-symbol Backtester on that symbol's data;
+on dates it did not trade, the results hold its last position and equity
+with a zero return.
+"""
+
+import numpy as np
+import pandas as pd
+
+try:
+    from .backtester import apply_stop_loss_take_profit, compute_returns
+    from .data_cache import dataset_fingerprint
+    from .indicators import INDICATOR_CACHE, latch, rolling_mean, rolling_std, rsi
+    from .metrics import calculate_matrix_metrics
+    from .precision import resolve_dtype
+except ImportError:
+    from backtester import apply_stop_loss_take_profit, compute_returns
+    from data_cache import dataset_fingerprint
+    from indicators import INDICATOR_CACHE, latch, rolling_mean, rolling_std, rsi
+    from metrics import calculate_matrix_metrics
+    from precision import resolve_dtype
+
+
+PANEL_FIELDS = ('Open', 'High', 'Low', 'Close', 'Volume')
+
+
+def _wide_fields(data):
+    """
+    Normalize panel input to a dict of wide (dates x symbols) DataFrames.
+
+    Accepts a DataFrame with (field, symbol) MultiIndex columns, as returned
+    by yfinance for several tickers, or a dict mapping field -> wide DataFrame.
+    """
+    if isinstance(data, dict):
+        fields = {field: frame for field, frame in data.items() if field in PANEL_FIELDS}
+    elif isinstance(data, pd.DataFrame) and isinstance(data.columns, pd.MultiIndex):
+        fields = {field: data[field] for field in data.columns.get_level_values(0).unique()
+                  if field in PANEL_FIELDS}
+    else:
+        raise ValueError("Panel data must be a dict of wide DataFrames or a DataFrame "
+                         "with (field, symbol) MultiIndex columns")
+
+    missing = [field for field in ('Open', 'Close') if field not in fields]
+    if missing:
+        raise ValueError(f"Missing required fields: {missing}")
+
+    # Align every field on the same dates and symbols as Close
+    close = fields['Close']
+    return {field: frame.reindex(index=close.index, columns=close.columns)
+            for field, frame in fields.items()}
+
+
+class PanelBacktester:
+    """
+    Vectorized backtester over a wide (dates x symbols) OHLC panel.
+
+    Column j of every result equals Backtester(single_symbol_frame).run_*()
+    for symbol j on that symbol's dates, also when symbols trade on
+    different calendars.
+    """
+
+    def __init__(self, data, initial_capital=100000, transaction_cost=0.001,
+                 dividend_yield=0.015, stop_loss=None, take_profit=None, position_size=1.0,
+                 dtype=None):
+        """
+        Initialize panel backtester.
+
+        Args:
+            data: DataFrame with (field, symbol) MultiIndex columns, or dict of
+                field -> wide DataFrame; needs Open and Close
+            initial_capital: Starting capital per symbol (default 100,000)
+            transaction_cost: Cost per side as decimal (0.001 = 10 bps)
+            dividend_yield: Annual dividend yield for benchmark (default 1.5%)
+            stop_loss: Stop loss as decimal (e.g., -0.05), None to disable
+            take_profit: Take profit as decimal (e.g., 0.10), None to disable
+            position_size: Fraction of capital to deploy
+            dtype: np.float32 or np.float64 for the price, indicator, position
+                and return matrices (default: the engine-wide precision policy)
+        """
+        self.fields = _wide_fields(data)
+        self.index = self.fields['Close'].index
+        self.symbols = self.fields['Close'].columns
+        self.dtype = resolve_dtype(dtype)
+
+        # A symbol's bars are the dates with both Open and Close; bar_number
+        # maps each date to the symbol's latest bar at or before it (-1 before
+        # its first bar)
+        open_ = self.fields['Open'].to_numpy(dtype=self.dtype)
+        close = self.fields['Close'].to_numpy(dtype=self.dtype)
+        self.valid = ~np.isnan(open_) & ~np.isnan(close)
+        self.bar_number = np.cumsum(self.valid, axis=0) - 1
+        self.bar_count = self.valid.sum(axis=0)
+        if (self.bar_count == 0).any():
+            raise ValueError(f"Symbols without any bar with both Open and Close: "
+                             f"{list(self.symbols[self.bar_count == 0])}")
+        self.aligned = bool(self.valid.all())
+
+        # Each symbol's bars stacked from row 0 (NaN after its last bar)
+        self.open = self._stack(open_)
+        self.close = self._stack(close)
+        self.initial_capital = initial_capital
+        self.transaction_cost = transaction_cost
+        self.dividend_yield = dividend_yield
+        self.stop_loss = stop_loss
+        self.take_profit = take_profit
+        self.position_size = position_size
+        self._fingerprint = None
+
+    def _stack(self, values):
+        """(dates x symbols) values to per-symbol bar rows, see bar_number."""
+        if self.aligned:
+            return values
+        stacked = np.full((self.bar_count.max(), values.shape[1]), np.nan, dtype=values.dtype)
+        stacked[self.bar_number[self.valid], np.nonzero(self.valid)[1]] = values[self.valid]
+        return stacked
+
+    def _unstack(self, values, fill, hold=True):
+        """
+        Per-symbol bar rows back to (dates x symbols).
+
+        Dates before a symbol's first bar get `fill`; other dates without a
+        bar repeat the symbol's last bar (hold=True) or get `fill`.
+        """
+        if self.aligned:
+            return values
+        rows = np.maximum(self.bar_number, 0)
+        out = np.take_along_axis(values, rows, axis=0)
+        out[(self.bar_number < 0) if hold else ~self.valid] = fill
+        return out
+
+    def _indicator(self, name, param, kernel):
+        """
+        (bars x symbols) indicator of Close from the shared cache.
+
+        Each column is computed over the symbol's own bars by the same
+        indicators kernel Backtester uses.
+        """
+        if self._fingerprint is None:
+            self._fingerprint = dataset_fingerprint(self.fields['Close'])
+        key = (self._fingerprint, 'panel', name, self.dtype.name, param)
+
+        def compute():
+            return np.column_stack([kernel(column, [param], dtype=self.dtype)[:, 0] for column in self.close.T])
+
+        return INDICATOR_CACHE.get_or_compute(key, compute)
+
+    def _sma(self, window):
+        return self._indicator('SMA', window, rolling_mean)
+
+    def run_momentum(self, sma_window=50):
+        """
+        Momentum Strategy (long when Close > SMA) on every symbol.
+
+        Args:
+            sma_window: Simple moving average window
+
+        Returns:
+            Dict of panel results (see _execute)
+        """
+        sma = self._sma(sma_window)
+        signal = self.close > sma
+        return self._execute(signal)
+
+    def run_mean_reversion(self, sma_window=20, std_dev=2.0):
+        """
+        Mean Reversion Strategy (enter below lower band, exit at SMA) on every symbol.
+
+        Args:
+            sma_window: SMA window for Bollinger Bands
+            std_dev: Standard deviation multiplier
+
+        Returns:
+            Dict of panel results (see _execute)
+        """
+        sma = self._sma(sma_window)
+        std = self._indicator('Std', sma_window, rolling_std)
+        lower = sma - std_dev * std
+
+        bars = np.arange(len(self.close))[:, None]
+        valid = ~np.isnan(sma) & ~np.isnan(lower) & (bars >= sma_window)
+        signal = latch(self.close < lower, self.close >= sma, valid)
+        return self._execute(signal)
+
+    def run_rsi(self, rsi_period=14, oversold=30, overbought=70):
+        """
+        RSI Strategy (enter below oversold, exit above overbought or 50) on every symbol.
+
+        Args:
+            rsi_period: Period for RSI calculation
+            oversold: Oversold threshold for entry
+            overbought: Overbought threshold for exit
+
+        Returns:
+            Dict of panel results (see _execute)
+        """
+        rsi_values = self._indicator('RSI', rsi_period, rsi)
+
+        bars = np.arange(len(self.close))[:, None]
+        valid = ~np.isnan(rsi_values) & (bars >= rsi_period + 1)
+        with np.errstate(invalid='ignore'):
+            entry = rsi_values < oversold
+            exit_ = (rsi_values > overbought) | (rsi_values > 50)
+        return self._execute(latch(entry, exit_, valid))
+
+    def _execute(self, signal):
+        """
+        Lag, SL/TP, final exit, costs, equity and metrics for a signal matrix.
+
+        Args:
+            signal: Boolean (dates x symbols) signal matrix
+
+        Returns:
+            Dict with wide DataFrames Position, Market_Return, Strategy_Return,
+            Market_Equity, Strategy_Equity (dates x symbols) and Metrics
+            (one row per symbol, see panel_metrics)
+        """
+        position = np.zeros(signal.shape, dtype=self.dtype)
+        position[1:] = signal[:-1]
+
+        position, _ = apply_stop_loss_take_profit(
+            position, self.open, self.close,
+            stop_loss=self.stop_loss, take_profit=self.take_profit, dtype=self.dtype
+        )
+        # Force-close on each symbol's last bar
+        position[np.arange(len(position))[:, None] >= self.bar_count - 1] = 0
+
+        returns = compute_returns(
+            self.open, position,
+            initial_capital=self.initial_capital, transaction_cost=self.transaction_cost,
+            dividend_yield=self.dividend_yield, position_size=self.position_size, dtype=self.dtype
+        )
+
+        if self.aligned:
+            metrics = panel_metrics(self.index, returns['Strategy_Return'], returns['Strategy_Equity'],
+                                    position, self.symbols)
+        else:
+            metrics = pd.concat([
+                panel_metrics(self.index[self.valid[:, j]], returns['Strategy_Return'][:n, [j]],
+                              returns['Strategy_Equity'][:n, [j]], position[:n, [j]], self.symbols[[j]])
+                for j, n in enumerate(self.bar_count)
+            ])
+
+        def wide(values):
+            return pd.DataFrame(values, index=self.index, columns=self.symbols)
+
+        result = {name: wide(self._unstack(returns[name], 0, hold=False))
+                  for name in ('Market_Return', 'Strategy_Return')}
+        for name in ('Market_Equity', 'Strategy_Equity'):
+            result[name] = wide(self._unstack(returns[name], self.initial_capital))
+        result['Position'] = wide(self._unstack(position, 0))
+        result['Metrics'] = metrics
+        return result
+
+
+def panel_metrics(index, returns, equity, position, symbols, risk_free_rate=0.06):
+    """
+    Metrics for every column of a (dates x symbols) panel in one pass.
+
+    The metrics.calculate_matrix_metrics table (same definitions as
+    metrics.calculate_all_metrics, reduced along axis 0 in float64 even when
+    the returns are float32) plus each symbol's trade count.
+
+    Returns:
+        DataFrame indexed by symbol with CAGR, Total_Return, Volatility,
+        Sharpe, Sortino, Calmar, Max_Drawdown, VaR_95, CVaR_95, Ulcer_Index,
+        Skewness, Kurtosis, Market_Exposure, ..., Total_Trades
+    """
+    table = calculate_matrix_metrics(returns, equity, index, position,
+                                     labels=pd.Index(symbols, name='Symbol'),
+                                     risk_free_rate=risk_free_rate)
+    table['Total_Trades'] = (np.diff(position, axis=0) == 1).sum(axis=0)
+    return table
@@ -7,25 +7,44 @@ Generates publication-quality charts for:
 - Return distributions
 - Rolling metrics
 - Performance heatmaps
+
+matplotlib and seaborn are imported on the first plot call, so importing
+this module is cheap for runs that never draw.
 """
 
-import matplotlib.pyplot as plt
-import seaborn as sns
 import pandas as pd
 import numpy as np
 from typing import Optional, Tuple
 import warnings
+
+try:
+    from .metrics import calculate_rolling_metrics
+except ImportError:
+    from metrics import calculate_rolling_metrics
+
 warnings.filterwarnings('ignore')
 
-# Set professional style
-sns.set_style("whitegrid")
-plt.rcParams['figure.figsize'] = (12, 6)
-plt.rcParams['font.size'] = 10
-plt.rcParams['axes.labelsize'] = 11
-plt.rcParams['axes.titlesize'] = 13
-plt.rcParams['xtick.labelsize'] = 9
-plt.rcParams['ytick.labelsize'] = 9
-plt.rcParams['legend.fontsize'] = 10
+_plt = None
+
+
+def _pyplot():
+    """Import matplotlib.pyplot and apply the house style (once)."""
+    global _plt
+    if _plt is None:
+        import matplotlib.pyplot as plt
+        import seaborn as sns
+
+        # Set professional style
+        sns.set_style("whitegrid")
+        plt.rcParams['figure.figsize'] = (12, 6)
+        plt.rcParams['font.size'] = 10
+        plt.rcParams['axes.labelsize'] = 11
+        plt.rcParams['axes.titlesize'] = 13
+        plt.rcParams['xtick.labelsize'] = 9
+        plt.rcParams['ytick.labelsize'] = 9
+        plt.rcParams['legend.fontsize'] = 10
+        _plt = plt
+    return _plt
 
 
 def plot_equity_curve(df: pd.DataFrame, 
@@ -41,6 +60,7 @@ def plot_equity_curve(df: pd.DataFrame,
         save_path: Path to save the figure (optional)
         show_benchmark: Whether to show benchmark comparison
     """
+    plt = _pyplot()
     fig, ax = plt.subplots(figsize=(14, 7))
     
     # Plot strategy equity
@@ -98,6 +118,7 @@ def plot_drawdown(df: pd.DataFrame,
         strategy_name: Name of the strategy
         save_path: Path to save the figure
     """
+    plt = _pyplot()
     # Calculate drawdown
     equity = df['Strategy_Equity']
     running_max = equity.expanding().max()
@@ -150,6 +171,7 @@ def plot_returns_distribution(df: pd.DataFrame,
         strategy_name: Name of the strategy
         save_path: Path to save the figure
     """
+    plt = _pyplot()
     returns = df['Strategy_Return'].dropna() * 100  # Convert to percentage
     
     fig, ax = plt.subplots(figsize=(12, 6))
@@ -202,12 +224,10 @@ def plot_rolling_sharpe(df: pd.DataFrame,
         strategy_name: Name of the strategy
         save_path: Path to save the figure
     """
-    returns = df['Strategy_Return'].dropna()
+    plt = _pyplot()
     
-    # Calculate rolling Sharpe (annualized)
-    rolling_mean = returns.rolling(window).mean() * 252
-    rolling_std = returns.rolling(window).std() * np.sqrt(252)
-    rolling_sharpe = (rolling_mean - 0.06) / rolling_std  # 6% risk-free rate
+    # Rolling Sharpe (annualized, 6% risk-free rate)
+    rolling_sharpe = calculate_rolling_metrics(df, window)['Rolling_Sharpe'].dropna()
     
     fig, ax = plt.subplots(figsize=(14, 6))
     
@@ -249,10 +269,11 @@ def plot_monthly_returns_heatmap(df: pd.DataFrame,
         strategy_name: Name of the strategy
         save_path: Path to save the figure
     """
+    plt = _pyplot()
     returns = df['Strategy_Return'].dropna()
     
     # Calculate monthly returns
-    monthly_returns = returns.resample('M').apply(lambda x: (1 + x).prod() - 1) * 100
+    monthly_returns = ((1 + returns).groupby(returns.index.to_period('M')).prod() - 1) * 100
     
     # Pivot to year x month format
     monthly_returns_df = pd.DataFrame({
@@ -262,6 +283,7 @@ def plot_monthly_returns_heatmap(df: pd.DataFrame,
     })
     
     pivot_table = monthly_returns_df.pivot(index='Year', columns='Month', values='Return')
+    pivot_table = pivot_table.reindex(columns=range(1, 13))
     
     # Month names
     month_names = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 
@@ -271,6 +293,7 @@ def plot_monthly_returns_heatmap(df: pd.DataFrame,
     fig, ax = plt.subplots(figsize=(14, 8))
     
     # Heatmap
+    import seaborn as sns
     sns.heatmap(pivot_table, annot=True, fmt='.2f', cmap='RdYlGn', center=0,
                 cbar_kws={'label': 'Monthly Return (%)'},
                 linewidths=0.5, linecolor='gray', ax=ax)
@@ -301,6 +324,7 @@ def plot_strategy_comparison(results_dict: dict,
         results_dict: Dict of {strategy_name: df} with equity curves
         save_path: Path to save the figure
     """
+    plt = _pyplot()
     fig, ax = plt.subplots(figsize=(14, 7))
     
     colors = ['#2E86AB', '#A23B72', '#F18F01', '#C73E1D', '#6A994E']
@@ -340,6 +364,7 @@ def plot_trade_analysis(trades_df: pd.DataFrame,
         strategy_name: Name of the strategy
         save_path: Path to save the figure
     """
+    plt = _pyplot()
     fig, axes = plt.subplots(2, 2, figsize=(14, 10))
     
     # 1. P&L distribution
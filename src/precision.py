@@ -0,0 +1,67 @@
+"""
+Floating-point dtype policy for the engine.
+
+Sweeps and panel runs move (bars x configs) or (bars x symbols) matrices of
+prices, indicators, positions and returns through memory several times;
+storing them as float32 halves that traffic. Quantities that accumulate
+error over many bars are always float64, whatever the policy:
+
+- Equity curves (cumulative products of returns)
+- Prefix sums inside the rolling indicator kernels
+- Every metric (means, standard deviations, drawdowns)
+
+The engine-wide default is float64, which reproduces historical results
+bit for bit. Switch it with set_dtype('float32'), or override per call
+with the `dtype=` argument of Backtester, PanelBacktester and the
+indicator kernels.
+
+With float32, prices carry about 7 significant digits. Indicator-vs-price
+comparisons that tie within that precision can flip a signal by one bar,
+and returns differ from the float64 path by about 1e-7 per bar. See
+test_float32_policy_tolerance for the documented bounds.
+"""
+
+import numpy as np
+
+
+SUPPORTED_DTYPES = (np.dtype(np.float32), np.dtype(np.float64))
+
+_policy = {'dtype': np.dtype(np.float64)}
+
+
+def resolve_dtype(dtype=None):
+    """
+    The dtype to use for a call: the override if given, else the engine default.
+
+    Args:
+        dtype: None, np.float32/np.float64 or their names
+
+    Returns:
+        np.dtype
+    """
+    if dtype is None:
+        return _policy['dtype']
+    dtype = np.dtype(dtype)
+    if dtype not in SUPPORTED_DTYPES:
+        raise ValueError(f"dtype must be float32 or float64, got {dtype}")
+    return dtype
+
+
+def get_dtype():
+    """Engine-wide default dtype for price, indicator and return arrays."""
+    return _policy['dtype']
+
+
+def set_dtype(dtype):
+    """
+    Set the engine-wide default dtype.
+
+    Args:
+        dtype: np.float32 or np.float64 (or their names)
+
+    Returns:
+        The previous default, so callers can restore it
+    """
+    previous = _policy['dtype']
+    _policy['dtype'] = resolve_dtype(dtype)
+    return previous
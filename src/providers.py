@@ -0,0 +1,92 @@
+"""
+Pluggable market data providers for data_loader.
+
+A provider returns daily OHLCV bars for one ticker over an inclusive date
+range. fetch_data uses one to download a full history on a cold start and
+only the missing tail on a refresh, so the source can be swapped (e.g.
+CSVProvider for offline tests) without touching the cache logic.
+"""
+
+import os
+from abc import ABC, abstractmethod
+
+import pandas as pd
+
+
+OHLCV_COLUMNS = ['Open', 'High', 'Low', 'Close', 'Volume']
+
+
+class DataProvider(ABC):
+    """Base class for daily OHLCV data sources."""
+
+    @abstractmethod
+    def fetch(self, ticker: str, start_date, end_date) -> pd.DataFrame:
+        """
+        Fetch daily bars for start_date <= date <= end_date.
+
+        Args:
+            ticker: Symbol, e.g. '^NSEI'
+            start_date: First date (inclusive), None for the earliest available
+            end_date: Last date (inclusive)
+
+        Returns:
+            DataFrame indexed by date with OHLCV columns (empty if no bars)
+        """
+        raise NotImplementedError("Provider must implement fetch()")
+
+
+class YFinanceProvider(DataProvider):
+    """
+    Yahoo Finance via yfinance (imported on first use).
+
+    Uses one yf.Ticker per call rather than yf.download: download collects
+    results and errors in module-global dicts (yfinance.shared), so
+    concurrent calls from fetch_many's worker threads could mix tickers.
+    """
+
+    def __init__(self, auto_adjust=False):
+        """
+        Args:
+            auto_adjust: Return split- and dividend-adjusted OHLC. Off by
+                default, so fresh downloads match caches of unadjusted prices
+                and refreshed tails line up with the cached history.
+        """
+        self.auto_adjust = auto_adjust
+
+    def fetch(self, ticker, start_date, end_date):
+        import yfinance as yf
+
+        # yfinance treats `end` as exclusive; errors raise so fetch_many can retry
+        end = pd.Timestamp(end_date) + pd.Timedelta(days=1)
+        df = yf.Ticker(ticker).history(start=start_date, end=end.strftime('%Y-%m-%d'),
+                                       actions=False, auto_adjust=self.auto_adjust, raise_errors=True)
+        if df.empty:
+            return pd.DataFrame(columns=OHLCV_COLUMNS, index=pd.DatetimeIndex([], name='Date'))
+
+        # history() stamps bars in the exchange time zone; the cache uses naive dates
+        if df.index.tz is not None:
+            df.index = df.index.tz_localize(None)
+        df.index.name = 'Date'
+        return df[OHLCV_COLUMNS]
+
+
+class CSVProvider(DataProvider):
+    """
+    Local stand-in provider reading <directory>/<ticker>.csv.
+
+    Used for offline runs and tests; files have the same layout as
+    data/raw_nifty.csv.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+
+    def path_for(self, ticker):
+        return os.path.join(self.directory, f"{ticker}.csv")
+
+    def fetch(self, ticker, start_date, end_date):
+        df = pd.read_csv(self.path_for(ticker), index_col=0, parse_dates=True)
+        mask = df.index <= pd.Timestamp(end_date)
+        if start_date is not None:
+            mask &= df.index >= pd.Timestamp(start_date)
+        return df.loc[mask, OHLCV_COLUMNS]
@@ -0,0 +1,379 @@
+"""
+Incremental (bar-by-bar) backtesting for end-of-day production runs.
+
+StreamingBacktester keeps only the state the strategy rules need - rolling
+window sums for SMA / Bollinger variance / RSI gains and losses, the latch
+state, the open trade and its SL/TP entry price, and running equity and
+peak - so each new bar is processed in O(1) instead of re-running the full
+history.
+
+Replaying history through on_bar reproduces Backtester.run_* bar for bar:
+same positions, exits, trades, returns and equity. Indicator values agree
+with the pandas rolling versions to floating-point round-off.
+
+The whole state can be saved after the day's bar and loaded for the next
+run, so a production job never replays history:
+
+    bt = StreamingBacktester.load('state.json')   # or StreamingBacktester(...)
+    bt.on_bar(open, high, low, close, volume, date=today)
+    bt.save('state.json')
+"""
+
+import json
+import math
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+try:
+    from .backtester import EXIT_REASONS, EXIT_SIGNAL, EXIT_STOP_LOSS, EXIT_TAKE_PROFIT
+except ImportError:
+    from backtester import EXIT_REASONS, EXIT_SIGNAL, EXIT_STOP_LOSS, EXIT_TAKE_PROFIT
+
+
+STRATEGIES = ('momentum', 'mean_reversion', 'rsi')
+
+DEFAULT_PARAMS = {
+    'momentum': {'sma_window': 50},
+    'mean_reversion': {'sma_window': 20, 'std_dev': 2.0},
+    'rsi': {'rsi_period': 14, 'oversold': 30, 'overbought': 70},
+}
+
+
+class RollingWindow:
+    """
+    Fixed-length window with O(1) running sum and sum of squares.
+
+    Sums use Kahan compensation on values shifted by the first observation,
+    which keeps add/remove drift and variance cancellation at round-off
+    level over arbitrarily long streams; an all-zero window sums to exactly
+    0 (as in indicators.rolling_sum). NaNs are kept in the window and
+    make mean/std NaN until they roll out, like pandas rolling.
+    """
+
+    def __init__(self, window):
+        self.window = window
+        self.values = deque()
+        self.shift = None
+        self.nan_count = 0
+        self.nonzero_count = 0
+        self._sum = [0.0, 0.0]      # running sum, compensation
+        self._sumsq = [0.0, 0.0]
+
+    @staticmethod
+    def _kahan_add(acc, value):
+        y = value - acc[1]
+        t = acc[0] + y
+        acc[1] = (t - acc[0]) - y
+        acc[0] = t
+
+    def push(self, value):
+        """Add a value, dropping the oldest one once the window is full."""
+        if self.shift is None and not math.isnan(value):
+            self.shift = value
+        self.values.append(value)
+        self._add(value, 1.0)
+        if len(self.values) > self.window:
+            self._add(self.values.popleft(), -1.0)
+
+    def _add(self, value, sign):
+        if math.isnan(value):
+            self.nan_count += 1 if sign > 0 else -1
+            return
+        if value != 0:
+            self.nonzero_count += 1 if sign > 0 else -1
+        x = value - self.shift
+        self._kahan_add(self._sum, sign * x)
+        self._kahan_add(self._sumsq, sign * x * x)
+
+    @property
+    def ready(self):
+        return len(self.values) == self.window and self.nan_count == 0
+
+    def sum(self):
+        if not self.ready:
+            return np.nan
+        if self.nonzero_count == 0:
+            return 0.0
+        return self._sum[0] + self.shift * self.window
+
+    def mean(self):
+        if not self.ready:
+            return np.nan
+        return self._sum[0] / self.window + self.shift
+
+    def std(self):
+        """Sample standard deviation (ddof=1)."""
+        if not self.ready or self.window < 2:
+            return np.nan
+        var = (self._sumsq[0] - self._sum[0] ** 2 / self.window) / (self.window - 1)
+        return math.sqrt(max(var, 0.0))
+
+    def to_dict(self):
+        """Serializable state: buffered values, shift, counts and compensated sums."""
+        return {
+            'window': self.window,
+            'values': [float(value) for value in self.values],
+            'shift': None if self.shift is None else float(self.shift),
+            'nan_count': self.nan_count,
+            'nonzero_count': self.nonzero_count,
+            'sum': [float(value) for value in self._sum],
+            'sumsq': [float(value) for value in self._sumsq]
+        }
+
+    @classmethod
+    def from_dict(cls, state):
+        """Rebuild a window from to_dict() output."""
+        window = cls(state['window'])
+        window.values = deque(state['values'])
+        window.shift = state['shift']
+        window.nan_count = state['nan_count']
+        window.nonzero_count = state['nonzero_count']
+        window._sum = list(state['sum'])
+        window._sumsq = list(state['sumsq'])
+        return window
+
+
+class StreamingBacktester:
+    """
+    Stateful backtester that updates on each new bar.
+
+    Execution model is the same as Backtester: the signal computed at a
+    bar's close sets the position from the next bar's open, SL/TP are
+    checked at each close against the trade's entry open, and returns are
+    open-to-open with costs charged on position changes.
+    """
+
+    # Settings and running state written by to_dict(), besides the windows and trades
+    _CONFIG = ('strategy', 'params', 'initial_capital', 'transaction_cost', 'dividend_yield',
+               'stop_loss', 'take_profit', 'position_size', 'periods_per_year')
+    _STATE = ('bar_count', '_latched', 'signal', 'position', 'entry_price', 'prev_open',
+              'prev_close', 'market_growth', 'strategy_growth', 'peak_equity')
+
+    def __init__(self, strategy='momentum', initial_capital=100000, transaction_cost=0.001,
+                 dividend_yield=0.015, stop_loss=None, take_profit=None, position_size=1.0,
+                 periods_per_year=252, **params):
+        """
+        Initialize streaming backtester.
+
+        Args:
+            strategy: 'momentum', 'mean_reversion' or 'rsi'
+            initial_capital, transaction_cost, dividend_yield, stop_loss,
+            take_profit, position_size: as in Backtester
+            periods_per_year: Bars per year for the dividend accrual (252 for
+                daily bars; Backtester.periods_per_year for its timeframe)
+            **params: Strategy parameters (sma_window, std_dev, rsi_period,
+                oversold, overbought); defaults match the run_* methods
+        """
+        if strategy not in STRATEGIES:
+            raise ValueError(f"Unknown strategy {strategy!r}; choose from {STRATEGIES}")
+        self.strategy = strategy
+        self.params = {**DEFAULT_PARAMS[strategy], **params}
+        self.initial_capital = initial_capital
+        self.transaction_cost = transaction_cost
+        self.dividend_yield = dividend_yield
+        self.stop_loss = stop_loss
+        self.take_profit = take_profit
+        self.position_size = position_size
+        self.periods_per_year = periods_per_year
+
+        window = self.params.get('sma_window', self.params.get('rsi_period'))
+        self._closes = RollingWindow(window)
+        self._gains = RollingWindow(window)
+        self._losses = RollingWindow(window)
+
+        self.bar_count = 0
+        self._latched = False        # mean reversion / RSI hysteresis state
+        self.signal = 0.0            # signal at the last close (position for next bar)
+        self.position = 0.0          # position held on the last bar after SL/TP
+        self.entry_price = None      # SL/TP reference: open of the current trade
+        self.open_trade = None       # (entry_date, entry_price)
+        self.prev_open = None
+        self.prev_close = None
+        self.market_growth = 1.0
+        self.strategy_growth = 1.0
+        self.peak_equity = initial_capital
+        self.trades = []
+
+    def _update_signal(self, close):
+        """Update indicator state with the new close and return today's signal."""
+        bar = self.bar_count
+        self._closes.push(close)
+
+        if self.strategy == 'momentum':
+            sma = self._closes.mean()
+            return 1.0 if close > sma else 0.0
+
+        if self.strategy == 'mean_reversion':
+            sma = self._closes.mean()
+            lower = sma - self.params['std_dev'] * self._closes.std()
+            valid = not (np.isnan(sma) or np.isnan(lower)) and bar >= self.params['sma_window']
+            entry, exit_ = close < lower, close >= sma
+        else:
+            delta = close - self.prev_close if self.prev_close is not None else np.nan
+            self._gains.push(delta if delta > 0 else 0.0)
+            self._losses.push(-delta if delta < 0 else 0.0)
+            period = self.params['rsi_period']
+            with np.errstate(divide='ignore', invalid='ignore'):
+                rs = np.float64(self._gains.sum() / period) / np.float64(self._losses.sum() / period)
+                rsi = 100 - (100 / (1 + rs))
+            valid = not np.isnan(rsi) and bar >= period + 1
+            entry = rsi < self.params['oversold']
+            exit_ = rsi > self.params['overbought'] or rsi > 50
+
+        if not valid:
+            return 0.0
+        if not self._latched and entry:
+            self._latched = True
+        elif self._latched and exit_:
+            self._latched = False
+        return 1.0 if self._latched else 0.0
+
+    def on_bar(self, open, high, low, close, volume=None, date=None, final=False):
+        """
+        Process one new bar in O(1).
+
+        Args:
+            open, high, low, close, volume: The bar's prices
+            date: Optional bar timestamp, used in the trade log
+            final: Force-close any open position on this bar, as the batch
+                run does on the last bar of its history
+
+        Returns:
+            Dict with Signal, Position, Exit_Reason, Market_Return,
+            Strategy_Return, Market_Equity, Strategy_Equity and Drawdown
+        """
+        # Position today = signal from yesterday's close
+        position = self.signal
+        exit_reason = EXIT_SIGNAL
+
+        if position == 1:
+            if self.position == 0 or self.bar_count == 0:
+                self.entry_price = open
+            pnl_pct = close / self.entry_price - 1
+            if self.stop_loss is not None and pnl_pct <= self.stop_loss:
+                position, exit_reason = 0.0, EXIT_STOP_LOSS
+            elif self.take_profit is not None and pnl_pct >= self.take_profit:
+                position, exit_reason = 0.0, EXIT_TAKE_PROFIT
+        if final and position == 1:
+            position = 0.0
+
+        # Open-to-open returns
+        if self.prev_open is None:
+            market_return = strategy_return = 0.0
+        else:
+            market_return = open / self.prev_open - 1 + self.dividend_yield / self.periods_per_year
+            cost = abs(position - self.position) * self.transaction_cost * self.position_size
+            strategy_return = market_return * position * self.position_size - cost
+            if np.isnan(market_return):
+                market_return = 0.0
+            if np.isnan(strategy_return):
+                strategy_return = 0.0
+        self.market_growth *= 1 + market_return
+        self.strategy_growth *= 1 + strategy_return
+        market_equity = self.initial_capital * self.market_growth
+        strategy_equity = self.initial_capital * self.strategy_growth
+        self.peak_equity = max(self.peak_equity, strategy_equity)
+
+        self._record_trade(position, open, date, exit_reason)
+
+        self.position = position
+        self.prev_open = open
+        self.signal = self._update_signal(close)
+        self.prev_close = close
+        self.bar_count += 1
+
+        return {
+            "Signal": self.signal,
+            "Position": position,
+            "Exit_Reason": EXIT_REASONS[exit_reason],
+            "Market_Return": market_return,
+            "Strategy_Return": strategy_return,
+            "Market_Equity": market_equity,
+            "Strategy_Equity": strategy_equity,
+            "Drawdown": strategy_equity / self.peak_equity - 1
+        }
+
+    def _record_trade(self, position, open_price, date, exit_reason):
+        """Open or close a trade in the log on position changes (executed at the open)."""
+        if position == 1 and self.open_trade is None:
+            self.open_trade = (date, open_price)
+        elif position == 0 and self.open_trade is not None:
+            entry_date, entry_price = self.open_trade
+            capital = self.initial_capital * self.position_size
+            shares = capital / entry_price
+            self.trades.append({
+                'Entry_Date': entry_date,
+                'Entry_Price': entry_price,
+                'Exit_Date': date,
+                'Exit_Price': open_price,
+                'PnL': (open_price - entry_price) * shares - capital * self.transaction_cost * 2,
+                'Return_Pct': (open_price / entry_price - 1) - (self.transaction_cost * 2),
+                'Exit_Reason': EXIT_REASONS[exit_reason]
+            })
+            self.open_trade = None
+
+    def replay(self, data, final=True):
+        """
+        Feed a historical OHLCV DataFrame through on_bar.
+
+        Args:
+            data: DataFrame with Open, High, Low, Close (and optionally Volume)
+            final: Force-close on the last row, matching Backtester.run_*
+
+        Returns:
+            DataFrame of per-bar records indexed like data
+        """
+        volume = data['Volume'].values if 'Volume' in data.columns else np.full(len(data), np.nan)
+        rows = zip(data.index, data['Open'].values, data['High'].values,
+                   data['Low'].values, data['Close'].values, volume)
+        records = [self.on_bar(o, h, l, c, v, date=d, final=final and i == len(data) - 1)
+                   for i, (d, o, h, l, c, v) in enumerate(rows)]
+        return pd.DataFrame(records, index=data.index)
+
+    def trade_log(self):
+        """Closed trades as a DataFrame (same columns as Backtester.trades)."""
+        return pd.DataFrame(self.trades)
+
+    def to_dict(self):
+        """Serializable state (dates as ISO strings); from_dict() resumes from it."""
+        def iso(date):
+            return None if date is None else pd.Timestamp(date).isoformat()
+
+        state = {name: getattr(self, name) for name in self._CONFIG + self._STATE}
+        state['windows'] = {name: getattr(self, name).to_dict() for name in ('_closes', '_gains', '_losses')}
+        state['open_trade'] = None
+        if self.open_trade is not None:
+            state['open_trade'] = [iso(self.open_trade[0]), self.open_trade[1]]
+        state['trades'] = [{**trade, 'Entry_Date': iso(trade['Entry_Date']), 'Exit_Date': iso(trade['Exit_Date'])}
+                           for trade in self.trades]
+        return state
+
+    @classmethod
+    def from_dict(cls, state):
+        """Rebuild a backtester from to_dict() output."""
+        def timestamp(date):
+            return None if date is None else pd.Timestamp(date)
+
+        bt = cls(**{name: state[name] for name in cls._CONFIG if name != 'params'}, **state['params'])
+        for name in cls._STATE:
+            setattr(bt, name, state[name])
+        for name, window in state['windows'].items():
+            setattr(bt, name, RollingWindow.from_dict(window))
+        if state['open_trade'] is not None:
+            bt.open_trade = (timestamp(state['open_trade'][0]), state['open_trade'][1])
+        bt.trades = [{**trade, 'Entry_Date': timestamp(trade['Entry_Date']), 'Exit_Date': timestamp(trade['Exit_Date'])}
+                     for trade in state['trades']]
+        return bt
+
+    def save(self, path):
+        """Write the state to a JSON file."""
+        with open(path, 'w') as f:
+            json.dump(self.to_dict(), f, indent=4)
+
+    @classmethod
+    def load(cls, path):
+        """Resume from a JSON file written by save()."""
+        with open(path) as f:
+            return cls.from_dict(json.load(f))
@@ -12,8 +12,25 @@ import os
 # Add src to path
 sys.path.append(os.path.join(os.path.dirname(os.path.dirname(__file__)), 'src'))
 
-from metrics import calculate_advanced_metrics, calculate_trade_metrics, calculate_drawdown_recovery
-from backtester import Backtester
+from metrics import (calculate_additional_risk_metrics, calculate_advanced_metrics, calculate_all_metrics,
+                     calculate_drawdown_recovery, calculate_matrix_metrics, calculate_rolling_metrics,
+                     calculate_trade_metrics)
+from backtester import Backtester, apply_stop_loss_take_profit, trade_log_to_frame
+from indicators import IndicatorCache, INDICATOR_CACHE, latch, rolling_mean, rolling_std
+from panel import PanelBacktester
+from analysis import (multi_strategy_comparison, calculate_annual_returns, calculate_monthly_returns,
+                      calculate_rolling_sharpe)
+from streaming import StreamingBacktester
+from intraday import IntradayBacktester, iter_chunks
+from data_cache import cache_paths
+from ohlcv_store import OHLCVStore, append_store, load_store_cached, write_store
+from providers import CSVProvider, DataProvider, YFinanceProvider
+from data_loader import (TIMEFRAME_CACHE_FILES, dataset_fingerprint, fetch_data, fetch_many, ingest_ticks,
+                         load_timeframe, resample_ohlcv)
+from data_quality import clean_ohlcv, format_quality_report
+from precision import get_dtype, set_dtype
+from online_metrics import MetricsAccumulator
+from bootstrap import bootstrap_confidence_intervals, bootstrap_samples, path_metrics, resample_indices
 
 
 def test_max_drawdown_synthetic():
@@ -195,6 +212,1100 @@ def test_win_rate_definitions():
     print("✓ test_win_rate_definitions passed")
 
 
+def _reference_stop_loss_take_profit(position, open_prices, close_prices, stop_loss, take_profit):
+    """Bar-by-bar SL/TP loop the vectorized stage must reproduce."""
+    position = position.astype(float).copy()
+    reasons = np.zeros(len(position), dtype=int)
+    entry_price = None
+    for i in range(len(position)):
+        if position[i] == 1:
+            if i == 0 or position[i-1] == 0:
+                entry_price = open_prices[i]
+            pnl_pct = close_prices[i] / entry_price - 1
+            if stop_loss is not None and pnl_pct <= stop_loss:
+                position[i] = 0
+                reasons[i] = 1
+            elif take_profit is not None and pnl_pct >= take_profit:
+                position[i] = 0
+                reasons[i] = 2
+    return position, reasons
+
+
+def test_stop_loss_take_profit_matches_loop():
+    """Test vectorized SL/TP against the bar-by-bar loop, including re-entries and 2D input."""
+    rng = np.random.default_rng(42)
+    for _ in range(50):
+        n = int(rng.integers(1, 200))
+        close = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, n)))
+        open_ = close * np.exp(rng.normal(0, 0.01, n))
+        position = (rng.random(n) < 0.8).astype(float)
+        
+        expected = _reference_stop_loss_take_profit(position, open_, close, -0.03, 0.04)
+        actual = apply_stop_loss_take_profit(position, open_, close, -0.03, 0.04)
+        assert np.array_equal(actual[0], expected[0]), "Positions differ from loop"
+        assert np.array_equal(actual[1], expected[1]), "Exit reasons differ from loop"
+        
+        # Columns of a 2D position matrix are independent trades on shared prices
+        grid = np.column_stack([position, np.ones(n)])
+        grid_pos, grid_reasons = apply_stop_loss_take_profit(grid, open_, close, -0.03, 0.04)
+        expected_long = _reference_stop_loss_take_profit(np.ones(n), open_, close, -0.03, 0.04)
+        assert np.array_equal(grid_pos[:, 0], expected[0])
+        assert np.array_equal(grid_pos[:, 1], expected_long[0])
+        assert np.array_equal(grid_reasons[:, 1], expected_long[1])
+    
+    print("✓ test_stop_loss_take_profit_matches_loop passed")
+
+
+def test_stop_loss_take_profit_many_exits_in_one_segment():
+    """Test an always-long run with hundreds of SL/TP re-entries against the loop (timing: benchmark_stop_loss.py)."""
+    rng = np.random.default_rng(3)
+    n = 3000
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, n)))
+    open_ = np.concatenate(([close[0]], close[:-1]))
+    position = np.ones(n)
+
+    actual = apply_stop_loss_take_profit(position, open_, close, -0.01, 0.01)
+    expected = _reference_stop_loss_take_profit(position, open_, close, -0.01, 0.01)
+    assert np.array_equal(actual[0], expected[0])
+    assert np.array_equal(actual[1], expected[1])
+    assert np.count_nonzero(actual[1]) > 500
+
+    print("✓ test_stop_loss_take_profit_many_exits_in_one_segment passed")
+
+
+def test_trade_log_array_matches_frame():
+    """Test that the structured-array trade log carries the same trades and metrics as the DataFrame."""
+    dates = pd.date_range('2020-01-01', periods=12, freq='D')
+    prices = [100, 102, 101, 104, 106, 103, 101, 99, 102, 105, 107, 108]
+    data = pd.DataFrame({'Open': prices, 'High': prices, 'Low': prices, 'Close': prices}, index=dates)
+    
+    frame_bt = Backtester(data, initial_capital=10000, transaction_cost=0.001)
+    array_bt = Backtester(data, initial_capital=10000, transaction_cost=0.001, trade_log_format='array')
+    frame_bt.run_momentum(sma_window=2)
+    array_bt.run_momentum(sma_window=2)
+    
+    assert isinstance(array_bt.trades, np.ndarray)
+    assert len(array_bt.trades) == len(frame_bt.trades) > 0
+    assert np.allclose(array_bt.trades['PnL'], frame_bt.trades['PnL'].values)
+    assert calculate_trade_metrics(array_bt.trades) == calculate_trade_metrics(frame_bt.trades)
+    pd.testing.assert_frame_equal(trade_log_to_frame(array_bt.trades), frame_bt.trades)
+    
+    # A trade with a missing date is left out of the average duration
+    gappy = array_bt.trades.copy()
+    gappy['Exit_Date'][0] = np.datetime64('NaT')
+    expected = np.mean((frame_bt.trades['Exit_Date'] - frame_bt.trades['Entry_Date']).dt.days.values[1:])
+    assert calculate_trade_metrics(gappy)['Avg_Trade_Duration'] == expected
+    assert calculate_trade_metrics(trade_log_to_frame(gappy))['Avg_Trade_Duration'] == expected
+    
+    # Unknown exit-reason codes are rejected instead of wrapping around EXIT_REASONS
+    gappy['Exit_Reason'][0] = -1
+    try:
+        trade_log_to_frame(gappy)
+        assert False, "an unknown exit-reason code should be rejected"
+    except ValueError:
+        pass
+    
+    print("✓ test_trade_log_array_matches_frame passed")
+
+
+def _random_walk_ohlc(n=400, seed=7):
+    """Synthetic OHLC data for engine equivalence tests."""
+    rng = np.random.default_rng(seed)
+    close = 10000 * np.exp(np.cumsum(rng.normal(0, 0.01, n)))
+    open_ = close * np.exp(rng.normal(0, 0.003, n))
+    return pd.DataFrame({
+        'Open': open_,
+        'High': np.maximum(open_, close) * 1.002,
+        'Low': np.minimum(open_, close) * 0.998,
+        'Close': close,
+        'Volume': np.full(n, 1000.0)
+    }, index=pd.date_range('2018-01-01', periods=n, freq='B'))
+
+
+def test_grid_matches_single_runs():
+    """Test that each column of the batched grids equals the corresponding single run."""
+    data = _random_walk_ohlc()
+    bt = Backtester(data, stop_loss=-0.03, take_profit=0.05)
+    
+    grid = bt.run_momentum_grid([5, 20, 50])
+    for j, window in enumerate(grid['Params']['sma_window']):
+        single = Backtester(data, stop_loss=-0.03, take_profit=0.05).run_momentum(sma_window=int(window))
+        assert np.array_equal(grid['Position'][:, j], single['Position'].values)
+        assert np.allclose(grid['Strategy_Equity'][:, j], single['Strategy_Equity'].values)
+    
+    grid = bt.run_mean_reversion_grid([10, 20], [1.5, 2.0])
+    for j, (window, std_dev) in grid['Params'].iterrows():
+        single = Backtester(data, stop_loss=-0.03, take_profit=0.05).run_mean_reversion(int(window), std_dev)
+        assert np.array_equal(grid['Position'][:, j], single['Position'].values)
+    
+    grid = bt.run_rsi_grid([7, 14], [30, 40], [60, 70])
+    for j, (period, oversold, overbought) in grid['Params'].iterrows():
+        single = Backtester(data, stop_loss=-0.03, take_profit=0.05).run_rsi(int(period), oversold, overbought)
+        assert np.array_equal(grid['Position'][:, j], single['Position'].values)
+    
+    print("✓ test_grid_matches_single_runs passed")
+
+
+def test_rolling_std_long_trending_series():
+    """Test that rolling mean/std stay accurate on a long, trending series."""
+    from numpy.lib.stride_tricks import sliding_window_view
+    
+    rng = np.random.default_rng(11)
+    n = 1_000_000
+    close = 100 + 0.01 * np.arange(n) + rng.normal(0, 1, n)
+    windows = [20, 50]
+    sma = rolling_mean(close, windows, dtype=np.float64)
+    std = rolling_std(close, windows, dtype=np.float64)
+    
+    for j, window in enumerate(windows):
+        rolling = pd.Series(close).rolling(window)
+        assert np.allclose(sma[:, j], rolling.mean().values, rtol=1e-12, equal_nan=True)
+        # pandas' add/remove update itself drifts by ~1e-5 here
+        assert np.allclose(std[:, j], rolling.std().values, rtol=1e-4, equal_nan=True)
+        # Exact per-window std over the end of the series, where the trend is largest
+        tail = close[-10_000:]
+        exact = sliding_window_view(tail, window).std(axis=1, ddof=1)
+        assert np.allclose(std[-len(exact):, j], exact, rtol=1e-10)
+    
+    print("✓ test_rolling_std_long_trending_series passed")
+
+
+def test_latch_matches_state_machine():
+    """Test the vectorized latch against the enter-when-flat / exit-when-long loop."""
+    rng = np.random.default_rng(3)
+    for _ in range(200):
+        n = int(rng.integers(1, 50))
+        entry = rng.random(n) < 0.3
+        exit_ = rng.random(n) < 0.3
+        valid = rng.random(n) < 0.9
+        
+        expected = np.zeros(n, dtype=bool)
+        state = False
+        for i in range(n):
+            if not valid[i]:
+                continue
+            if not state and entry[i]:
+                state = True
+            elif state and exit_[i]:
+                state = False
+            expected[i] = state
+        
+        assert np.array_equal(latch(entry, exit_, valid), expected)
+        # 2D input: each column latches independently
+        held = latch(np.column_stack([entry, exit_]), np.column_stack([exit_, entry]), valid)
+        assert np.array_equal(held[:, 0], expected)
+    
+    print("✓ test_latch_matches_state_machine passed")
+
+
+def test_slim_result_mode():
+    """Test that columns= returns only the requested columns with the same values."""
+    data = _random_walk_ohlc()
+    bt = Backtester(data, stop_loss=-0.03, take_profit=0.05)
+    full = bt.run_rsi(rsi_period=14)
+    slim = bt.run_rsi(rsi_period=14, columns=Backtester.METRIC_COLUMNS + ['RSI', 'Exit_Reason'])
+    
+    assert list(slim.columns) == Backtester.METRIC_COLUMNS + ['RSI', 'Exit_Reason']
+    assert 'Open' not in slim.columns
+    assert isinstance(slim['Exit_Reason'].dtype, pd.CategoricalDtype)
+    assert (slim['Exit_Reason'].astype(str) == full['Exit_Reason']).all()
+    for column in Backtester.METRIC_COLUMNS:
+        assert np.array_equal(slim[column].values, full[column].values)
+    assert calculate_advanced_metrics(slim) == calculate_advanced_metrics(full)
+    
+    print("✓ test_slim_result_mode passed")
+
+
+def test_indicator_cache_reuse_and_eviction():
+    """Test that indicators are shared across Backtester instances and the LRU cap is enforced."""
+    data = _random_walk_ohlc()
+    INDICATOR_CACHE.clear()
+    Backtester(data).run_momentum(sma_window=20)
+    Backtester(data, transaction_cost=0.002).run_mean_reversion(sma_window=20)
+    stats = INDICATOR_CACHE.stats()
+    assert stats['Hits'] == 1, f"Expected SMA(20) to be reused, got {stats}"
+    assert stats['Misses'] == 2
+    
+    # Grids share the per-window entries of single runs
+    grid = Backtester(data).run_momentum_grid([20, 30])
+    stats = INDICATOR_CACHE.stats()
+    assert (stats['Hits'], stats['Misses']) == (2, 3), stats
+    assert np.array_equal(grid['Position'][:, 0], Backtester(data).run_momentum(sma_window=20)['Position'].values)
+    
+    cache = IndicatorCache(max_bytes=3 * 8 * 100)
+    for key in range(5):
+        cache.get_or_compute(('data', 'SMA', key), lambda: np.zeros(100))
+    assert cache.stats()['Entries'] == 3
+    assert cache.stats()['Bytes'] <= cache.max_bytes
+    # Oldest entries were evicted first
+    cache.get_or_compute(('data', 'SMA', 4), lambda: np.zeros(100))
+    assert cache.stats()['Hits'] == 1
+    
+    print("✓ test_indicator_cache_reuse_and_eviction passed")
+
+
+def test_results_are_editable():
+    """Test that result frames built from cached indicators can be edited without touching the cache or input."""
+    data = _random_walk_ohlc()
+    INDICATOR_CACHE.clear()
+    bt = Backtester(data)
+    expected = bt.run_mean_reversion(sma_window=20)
+    
+    for columns in (None, ['SMA', 'Std', 'Position', 'Exec_Price', 'Close']):
+        result = bt.run_mean_reversion(sma_window=20, columns=columns)
+        ts = result.index[30]
+        for name in ('SMA', 'Std', 'Position', 'Exec_Price', 'Close'):
+            result.loc[ts, name] = 0
+        assert (result.loc[ts, ['SMA', 'Std', 'Close']] == 0).all()
+    
+    # Neither the cached indicators nor the input data changed
+    again = bt.run_mean_reversion(sma_window=20)
+    pd.testing.assert_frame_equal(again, expected)
+    assert data.loc[ts, 'Close'] != 0
+    
+    print("✓ test_results_are_editable passed")
+
+
+def test_panel_matches_single_symbol():
+    """Test that each panel column equals a single-symbol Backtester run."""
+    frames = {symbol: _random_walk_ohlc(seed=seed) for seed, symbol in enumerate(['AAA', 'BBB', 'CCC'])}
+    panel = pd.concat(frames, axis=1).swaplevel(0, 1, axis=1)
+    
+    result = PanelBacktester(panel, stop_loss=-0.03, take_profit=0.05).run_mean_reversion(sma_window=20)
+    for symbol, data in frames.items():
+        single = Backtester(data, stop_loss=-0.03, take_profit=0.05).run_mean_reversion(sma_window=20)
+        assert np.array_equal(result['Position'][symbol].values, single['Position'].values)
+        assert np.allclose(result['Strategy_Equity'][symbol].values, single['Strategy_Equity'].values)
+        
+        metrics = calculate_advanced_metrics(single)
+        for key in ['CAGR', 'Sharpe', 'Sortino', 'Max_Drawdown', 'Market_Exposure']:
+            assert abs(result['Metrics'].loc[symbol, key] - metrics[key]) < 1e-9, key
+    
+    print("✓ test_panel_matches_single_symbol passed")
+
+
+def test_panel_misaligned_calendars():
+    """Test that symbols trading on different dates each match their own single-symbol run."""
+    rng = np.random.default_rng(4)
+    frames = {}
+    for seed, symbol in enumerate(['AAA', 'BBB', 'CCC']):
+        data = _random_walk_ohlc(n=500, seed=seed)
+        frames[symbol] = data[rng.random(len(data)) > 0.1]
+    frames['BBB'] = frames['BBB'].iloc[40:]              # listed later
+    frames['CCC'] = frames['CCC'].iloc[:-60]             # delisted earlier
+    panel = pd.concat(frames, axis=1, sort=True).swaplevel(0, 1, axis=1)
+    assert panel['Close'].isna().any().all()
+    
+    pb = PanelBacktester(panel, stop_loss=-0.03, take_profit=0.05)
+    for method, params in (('run_momentum', {'sma_window': 20}),
+                           ('run_mean_reversion', {'sma_window': 20, 'std_dev': 1.5}),
+                           ('run_rsi', {'rsi_period': 14})):
+        result = getattr(pb, method)(**params)
+        for symbol, data in frames.items():
+            single = getattr(Backtester(data, stop_loss=-0.03, take_profit=0.05), method)(**params)
+            dates = single.index
+            assert np.array_equal(result['Position'][symbol][dates].values, single['Position'].values)
+            assert np.allclose(result['Strategy_Equity'][symbol][dates].values, single['Strategy_Equity'].values)
+            assert np.allclose(result['Market_Return'][symbol][dates].values, single['Market_Return'].values)
+            
+            # No bar: position and equity held, no return
+            gaps = result['Position'].index.difference(dates)
+            gaps = gaps[(gaps > dates[0]) & (gaps < dates[-1])]
+            held = result['Position'][symbol].shift(1)[gaps]
+            assert np.array_equal(result['Position'][symbol][gaps].values, held.values)
+            assert (result['Strategy_Return'][symbol][gaps] == 0).all()
+            
+            metrics = calculate_advanced_metrics(single)
+            for key in ['CAGR', 'Sharpe', 'Max_Drawdown', 'Market_Exposure']:
+                assert abs(result['Metrics'].loc[symbol, key] - metrics[key]) < 1e-9, (method, symbol, key)
+    
+    print("✓ test_panel_misaligned_calendars passed")
+
+
+def test_parallel_comparison_matches_serial():
+    """Test that the process-pool comparison returns the same table in the same order."""
+    data = _random_walk_ohlc(n=300)
+    serial = multi_strategy_comparison(data)
+    parallel = multi_strategy_comparison(data, workers=2)
+    pd.testing.assert_frame_equal(serial, parallel)
+    
+    print("✓ test_parallel_comparison_matches_serial passed")
+
+
+def test_streaming_matches_batch():
+    """Test that replaying history bar by bar reproduces the batch run_* output."""
+    data = _random_walk_ohlc(n=600, seed=3)
+    configs = [
+        ('momentum', 'run_momentum', {'sma_window': 20}),
+        ('mean_reversion', 'run_mean_reversion', {'sma_window': 20, 'std_dev': 1.5}),
+        ('rsi', 'run_rsi', {'rsi_period': 14})
+    ]
+    
+    for strategy, method, params in configs:
+        bt = Backtester(data, stop_loss=-0.03, take_profit=0.05)
+        batch = getattr(bt, method)(**params)
+        stream = StreamingBacktester(strategy, stop_loss=-0.03, take_profit=0.05, **params)
+        replayed = stream.replay(data)
+        
+        for column in ('Position', 'Exit_Reason', 'Strategy_Return', 'Strategy_Equity', 'Market_Equity'):
+            assert np.array_equal(batch[column].values, replayed[column].values), f"{strategy} {column} differs"
+        pd.testing.assert_frame_equal(bt.trades, stream.trade_log(), check_dtype=False)
+    
+    # Weekly bars accrue the dividend over 52 bars a year, as in the batch run
+    bt = Backtester(data, timeframe='W', timeframe_cache_dir=None)
+    batch = bt.run_momentum(sma_window=10)
+    replayed = StreamingBacktester('momentum', periods_per_year=bt.periods_per_year, sma_window=10).replay(bt.data)
+    for column in ('Position', 'Market_Equity', 'Strategy_Equity'):
+        assert np.allclose(batch[column].values, replayed[column].values), f"weekly {column} differs"
+    
+    print("✓ test_streaming_matches_batch passed")
+
+
+def test_streaming_state_round_trip():
+    """Test that a run saved mid-stream and loaded again continues exactly like an uninterrupted one."""
+    import tempfile
+    
+    data = _random_walk_ohlc(n=600, seed=3)
+    for strategy, params in (('mean_reversion', {'sma_window': 20, 'std_dev': 1.5}), ('rsi', {'rsi_period': 14})):
+        full = StreamingBacktester(strategy, stop_loss=-0.03, take_profit=0.05, **params)
+        expected = full.replay(data)
+        
+        # Stop with a trade open, as an end-of-day job may
+        split = int(np.flatnonzero(expected['Position'].values[:300] == 1)[-1]) + 1
+        first = StreamingBacktester(strategy, stop_loss=-0.03, take_profit=0.05, **params)
+        head = first.replay(data.iloc[:split], final=False)
+        assert first.open_trade is not None
+        
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'state.json')
+            first.save(path)
+            resumed = StreamingBacktester.load(path)
+        tail = resumed.replay(data.iloc[split:])
+        
+        pd.testing.assert_frame_equal(pd.concat([head, tail]), expected)
+        pd.testing.assert_frame_equal(resumed.trade_log(), full.trade_log())
+    
+    print("✓ test_streaming_state_round_trip passed")
+
+
+def test_intraday_chunks_match_single_pass():
+    """Test that chunked intraday runs match one pass and the daily engine."""
+    data = _random_walk_ohlc(n=800, seed=5)
+    bt = Backtester(data, stop_loss=-0.03)
+    batch = bt.run_mean_reversion(sma_window=20, std_dev=1.5)
+    
+    ib = IntradayBacktester('mean_reversion', stop_loss=-0.03, bars_per_year=252,
+                            sma_window=20, std_dev=1.5)
+    single = pd.concat(list(ib.run(data)))
+    chunked = pd.concat(list(ib.run(iter_chunks(data, chunk_size=33))))
+    
+    assert np.array_equal(batch['Position'].values, single['Position'].values)
+    assert np.array_equal(batch['Strategy_Equity'].values, single['Strategy_Equity'].values)
+    pd.testing.assert_frame_equal(single, chunked)
+    pd.testing.assert_frame_equal(bt.trades, ib.trades)
+    
+    # Session-aware: flat on the last minute of every session
+    minutes = pd.date_range('2024-01-01 09:15', periods=375, freq='min') - pd.Timestamp('2024-01-01')
+    index = pd.DatetimeIndex([day + m for day in pd.bdate_range('2024-01-01', periods=6) for m in minutes])
+    close = 100 * np.exp(np.cumsum(np.random.default_rng(1).normal(0, 5e-4, len(index))))
+    bars = pd.DataFrame({'Open': close, 'Close': close}, index=index)
+    ib = IntradayBacktester('momentum', flat_at_session_close=True, sma_window=30)
+    result = pd.concat(list(ib.run(iter_chunks(bars, chunk_size=500))))
+    session_end = index.normalize() != np.roll(index.normalize(), -1)
+    assert (result['Position'][session_end] == 0).all()
+    assert result['Position'].sum() > 0
+    
+    print("✓ test_intraday_chunks_match_single_pass passed")
+
+
+def test_store_cache_revalidates_and_rebuilds():
+    """Test that the CSV-backed store survives a touch and is rebuilt when the CSV changes."""
+    import tempfile
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_path = os.path.join(tmp, 'prices.csv')
+        _random_walk_ohlc(n=50).rename_axis('Date').to_csv(csv_path)
+        expected = pd.read_csv(csv_path, index_col=0, parse_dates=True).astype(float)
+        
+        pd.testing.assert_frame_equal(load_store_cached(csv_path).frame(), expected)
+        store_path, meta_path = cache_paths(csv_path, 'ohlcv')
+        assert os.path.exists(store_path) and os.path.exists(meta_path)
+        built = os.stat(store_path).st_mtime_ns
+        
+        # Same bytes, new mtime (touch, fresh checkout): re-validated, not rebuilt
+        os.utime(csv_path, ns=(built + 10 ** 9, built + 10 ** 9))
+        pd.testing.assert_frame_equal(load_store_cached(csv_path).frame(), expected)
+        assert os.stat(store_path).st_mtime_ns == built
+        
+        # Appending a row changes size/hash: the store must be rebuilt
+        with open(csv_path, 'a') as f:
+            f.write('2030-01-01,1.0,2.0,0.5,1.5,10\n')
+        reloaded = load_store_cached(csv_path).frame()
+        assert len(reloaded) == 51
+        assert reloaded['Close'].iloc[-1] == 1.5
+    
+    print("✓ test_store_cache_revalidates_and_rebuilds passed")
+
+
+def test_fetch_data_unsorted_csv():
+    """Test that a local CSV with unsorted and repeated dates loads sorted and de-duplicated."""
+    import tempfile
+    
+    data = _random_walk_ohlc(n=30).rename_axis('Date')
+    repeated = data.iloc[[10]] * 2
+    messy = pd.concat([data.iloc[15:], data.iloc[:15], repeated])
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        local = os.path.join(tmp, 'raw.csv')
+        messy.to_csv(local)
+        loaded = fetch_data(start_date=None, end_date='2030-01-01',
+                            provider=CSVProvider(tmp), data_path=local)
+    
+    expected = data.astype(float)
+    expected.iloc[10] = repeated.iloc[0]
+    assert loaded.index.is_monotonic_increasing and loaded.index.is_unique
+    pd.testing.assert_frame_equal(loaded, expected, check_freq=False)
+    
+    print("✓ test_fetch_data_unsorted_csv passed")
+
+
+def test_memmap_store_slices_without_copy():
+    """Test that store date slices match the filtered CSV and share the mapping."""
+    import tempfile
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_path = os.path.join(tmp, 'prices.csv')
+        data = _random_walk_ohlc(n=120).rename_axis('Date')
+        data.assign(Volume=np.arange(120) * 1000 + 101900).to_csv(csv_path)
+        expected = pd.read_csv(csv_path, index_col=0, parse_dates=True)
+        assert expected['Volume'].dtype == np.int64
+        
+        store = load_store_cached(csv_path)
+        assert isinstance(store, OHLCVStore) and len(store) == 120
+        
+        for start, end in [(None, None), ('2018-02-01', '2018-03-15'), ('2018-02-01 12:00', '2018-03-15 12:00'),
+                           ('2030-01-01', None)]:
+            mask = np.ones(len(expected), dtype=bool)
+            if start is not None:
+                mask &= expected.index >= start
+            if end is not None:
+                mask &= expected.index <= end
+            sliced = store.frame(start, end)
+            pd.testing.assert_frame_equal(sliced, expected[mask])
+        
+        sliced = store.frame('2018-02-01', '2018-03-15')
+        assert all(np.shares_memory(sliced[column].values, store.values) for column in ('Open', 'High', 'Low', 'Close'))
+        # Integer Volume comes back as int64, so the CSV round-trips byte for byte
+        assert sliced['Volume'].dtype == np.int64
+        assert store.frame().to_csv() == expected.to_csv()
+        
+        # Appended rows keep the integer Volume
+        appended = os.path.join(tmp, 'appended.ohlcv')
+        write_store(expected.iloc[:-1], appended)
+        append_store(appended, expected.iloc[-1:])
+        pd.testing.assert_frame_equal(OHLCVStore(appended).frame(), expected)
+        
+        # In-place edits stay private to the caller's mapping
+        sliced.iloc[0, 0] = -1.0
+        reopened = load_store_cached(csv_path).frame('2018-02-01')
+        assert reopened.iloc[0, 0] == expected.loc['2018-02-01':].iloc[0, 0]
+        
+        # Intraday bars keep their timestamps; unordered indexes are rejected
+        minutes = pd.DataFrame({'Close': [1.0, 2.0, 3.0]},
+                               index=pd.DatetimeIndex(['2020-01-01 09:15', '2020-01-01 09:20', '2020-01-02 09:15']))
+        write_store(minutes, os.path.join(tmp, 'minutes.ohlcv'))
+        intraday_store = OHLCVStore(os.path.join(tmp, 'minutes.ohlcv'))
+        pd.testing.assert_frame_equal(intraday_store.frame(), minutes)
+        pd.testing.assert_frame_equal(intraday_store.frame('2020-01-01 09:16', '2020-01-01 23:59'), minutes.iloc[1:2])
+        try:
+            write_store(minutes.iloc[::-1], os.path.join(tmp, 'bad.ohlcv'))
+            assert False, "unordered index should be rejected"
+        except ValueError:
+            pass
+    
+    print("✓ test_memmap_store_slices_without_copy passed")
+
+
+class _RecordingProvider(CSVProvider):
+    """CSVProvider that records the date ranges it was asked for."""
+    
+    def __init__(self, directory):
+        super().__init__(directory)
+        self.calls = []
+    
+    def fetch(self, ticker, start_date, end_date):
+        self.calls.append((start_date, end_date))
+        return super().fetch(ticker, start_date, end_date)
+
+
+def test_incremental_tail_refresh():
+    """Test that a refresh fetches only the missing tail and appends it."""
+    import tempfile
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        full = _random_walk_ohlc(n=200).rename_axis('Date')
+        full.to_csv(os.path.join(tmp, '^NSEI.csv'))
+        provider = _RecordingProvider(tmp)
+        local = os.path.join(tmp, 'cache', 'raw.csv')
+        os.makedirs(os.path.dirname(local))
+        
+        # Cold start downloads the requested range
+        head = fetch_data(start_date=None, end_date='2018-06-01', provider=provider, data_path=local)
+        assert len(head) == 110 and provider.calls == [(None, '2018-06-01')]
+        
+        # Refresh asks only for the days after the last cached bar
+        refreshed = fetch_data(start_date=None, end_date='2019-01-01', refresh=True,
+                               provider=provider, data_path=local)
+        assert provider.calls[-1] == (head.index[-1] + pd.Timedelta(days=1), '2019-01-01')
+        pd.testing.assert_frame_equal(refreshed, full.astype(float), check_freq=False)
+        pd.testing.assert_frame_equal(pd.read_csv(local, index_col=0, parse_dates=True), full, check_freq=False)
+        
+        # Up to date: nothing to fetch
+        fetch_data(start_date=None, end_date=str(full.index[-1].date()), refresh=True,
+                   provider=provider, data_path=local)
+        assert len(provider.calls) == 2
+    
+    print("✓ test_incremental_tail_refresh passed")
+
+
+class _SlowFlakyProvider(DataProvider):
+    """Fake provider with injected latency that fails the first call for some tickers."""
+    
+    def __init__(self, latency=0.05, flaky=()):
+        import threading
+        self.latency = latency
+        self.flaky = set(flaky)
+        self.calls = []
+        self.active = 0
+        self.peak = 0
+        self._lock = threading.Lock()
+    
+    def fetch(self, ticker, start_date, end_date):
+        import time
+        with self._lock:
+            self.calls.append(ticker)
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+        time.sleep(self.latency)
+        with self._lock:
+            self.active -= 1
+            if ticker in self.flaky:
+                self.flaky.discard(ticker)
+                raise ConnectionError(f"{ticker}: transient failure")
+        
+        data = _random_walk_ohlc(n=300, seed=int(ticker[1:])).rename_axis('Date')
+        mask = data.index <= pd.Timestamp(end_date)
+        if start_date is not None:
+            mask &= data.index >= pd.Timestamp(start_date)
+        return data[mask]
+
+
+def test_fetch_many_concurrent_with_retries():
+    """Test the bulk loader: bounded concurrency, retries, aligned panel output."""
+    import tempfile
+    
+    tickers = [f"S{i}" for i in range(12)]
+    provider = _SlowFlakyProvider(latency=0.05, flaky=['S2', 'S9'])
+    with tempfile.TemporaryDirectory() as tmp:
+        panel = fetch_many(tickers, '2018-01-01', '2018-12-31', provider=provider,
+                           max_workers=4, backoff=0.01, cache_dir=tmp)
+        
+        assert 1 < provider.peak <= 4                           # concurrent, but bounded
+        assert len(provider.calls) == len(tickers) + 2          # two retried tickers
+        assert list(panel['Close'].columns) == tickers
+        for ticker in ('S0', 'S9'):
+            expected = _random_walk_ohlc(n=300, seed=int(ticker[1:]))['2018-01-01':'2018-12-31']
+            np.testing.assert_array_equal(panel['Close'][ticker].values, expected['Close'].values)
+        
+        # Panel plugs straight into the panel backtester
+        metrics = PanelBacktester(panel).run_momentum(sma_window=20)['Metrics']
+        assert list(metrics.index) == tickers
+        
+        # Failures beyond the retry budget are reported
+        try:
+            fetch_many(['S99'], '2018-01-01', '2018-12-31', provider=_SlowFlakyProvider(latency=0, flaky=['S99']),
+                       retries=0, cache_dir=os.path.join(tmp, 'other'))
+            assert False, "exhausted retries should raise"
+        except RuntimeError:
+            pass
+    
+    print("✓ test_fetch_many_concurrent_with_retries passed")
+
+
+class _FakeYFTicker:
+    """Stand-in for yfinance.Ticker: exchange-tz daily bars, one random walk per symbol."""
+
+    adjusted = []
+
+    def __init__(self, ticker):
+        self.ticker = ticker
+
+    def history(self, start=None, end=None, **kwargs):
+        import time
+        self.adjusted.append(kwargs['auto_adjust'])
+        time.sleep(0.01)
+        data = _random_walk_ohlc(n=300, seed=int(self.ticker[1:]))
+        data = data[(data.index >= pd.Timestamp(start)) & (data.index < pd.Timestamp(end))]
+        data.index = data.index.tz_localize('Asia/Kolkata')
+        return data.assign(Dividends=0.0)
+
+
+def test_yfinance_provider_threads():
+    """Test that the default provider fetches each ticker on its own yf.Ticker, never through yf.download."""
+    import tempfile
+    from unittest import mock
+    import yfinance
+
+    tickers = [f"S{i}" for i in range(8)]
+    with tempfile.TemporaryDirectory() as tmp, \
+            mock.patch.object(yfinance, 'Ticker', _FakeYFTicker), \
+            mock.patch.object(yfinance, 'download', side_effect=AssertionError("yf.download is not thread-safe")):
+        panel = fetch_many(tickers, '2018-01-01', '2018-12-31', max_workers=4, retries=0, cache_dir=tmp)
+
+    assert panel.index.tz is None
+    for ticker in tickers:
+        expected = _random_walk_ohlc(n=300, seed=int(ticker[1:]))['2018-01-01':'2018-12-31']
+        np.testing.assert_array_equal(panel['Close'][ticker].values, expected['Close'].values)
+
+    # Unadjusted prices unless asked for, like the cached history
+    assert _FakeYFTicker.adjusted and not any(_FakeYFTicker.adjusted)
+    with mock.patch.object(yfinance, 'Ticker', _FakeYFTicker):
+        YFinanceProvider(auto_adjust=True).fetch('S0', '2018-01-01', '2018-01-31')
+    assert _FakeYFTicker.adjusted[-1] is True
+    _FakeYFTicker.adjusted.clear()
+
+    print("✓ test_yfinance_provider_threads passed")
+
+
+def test_data_quality_repairs():
+    """Test the data-quality stage: clean data passes through, each defect is fixed and counted."""
+    clean = _random_walk_ohlc(n=50)
+    same, report = clean_ohlcv(clean)
+    assert same is clean
+    assert format_quality_report(report) == []
+    
+    dirty = clean.copy()
+    dirty.iloc[3, dirty.columns.get_loc('Close')] = np.nan
+    dirty.iloc[5, dirty.columns.get_loc('Open')] = 0.0
+    dirty.iloc[7, [1, 2]] = dirty.iloc[7, [2, 1]].values            # High < Low
+    dirty.iloc[0, dirty.columns.get_loc('Close')] = np.nan           # nothing to fill from
+    dirty = pd.concat([dirty.iloc[20:], dirty.iloc[:20], dirty.iloc[[10]] * 1.01])
+    dirty = dirty.drop(dirty.index[[10, 11, 12, 13]])                # 4 missing weekdays
+    
+    fixed, report = clean_ohlcv(dirty)
+    assert fixed.index.is_monotonic_increasing and fixed.index.is_unique
+    assert report['Duplicate_Dates'] == 1 and report['Unsorted_Rows'] > 0
+    assert report['Invalid_Prices'] == 1 and report['Missing_Prices'] == 3
+    assert report['Rows_Dropped'] == 1 and report['High_Low_Swapped'] == 1
+    assert report['Gaps'] == 1 and report['Largest_Gap_Days'] == 4
+    assert report['Rows_Out'] == len(fixed) == 45
+    
+    prices = fixed[['Open', 'High', 'Low', 'Close']]
+    assert prices.notna().all().all() and (prices > 0).all().all()
+    assert (fixed['High'] >= fixed[['Open', 'Close']].max(axis=1)).all()
+    assert (fixed['Low'] <= fixed[['Open', 'Close']].min(axis=1)).all()
+    assert fixed['Close'].iloc[2] == fixed['Close'].iloc[1]          # forward-filled
+    assert fixed.loc[clean.index[10], 'Close'] == clean['Close'].iloc[10] * 1.01  # last duplicate wins
+    
+    filled, report = clean_ohlcv(dirty.assign(Note=1.0), fill_gaps=True)
+    assert report['Bars_Inserted'] == 4 and len(filled) == 49
+    new_bars = filled.index.difference(fixed.index)
+    assert len(new_bars) == 4 and (new_bars.dayofweek < 5).all()
+    previous_close = filled['Close'].shift(1).loc[new_bars[0]]
+    assert (filled.loc[new_bars, ['Open', 'High', 'Low', 'Close']] == previous_close).all().all()
+    assert (filled.loc[new_bars, 'Volume'] == 0).all() and filled.loc[new_bars, 'Note'].isna().all()
+    pd.testing.assert_frame_equal(filled.loc[fixed.index, fixed.columns], fixed, check_dtype=False, check_freq=False)
+    
+    sample = pd.read_csv(os.path.join(os.path.dirname(os.path.dirname(__file__)), 'sample_data',
+                                      'data_with_issues.csv'), index_col=0, parse_dates=True)
+    fixed, report = clean_ohlcv(sample)
+    assert report['Missing_Prices'] > 0 and fixed[['Open', 'High', 'Low', 'Close']].notna().all().all()
+    
+    print("✓ test_data_quality_repairs passed")
+
+
+def test_engine_imports_stay_light():
+    """Test that importing the engine modules does not load optional heavy dependencies or need a flat path."""
+    import subprocess
+    
+    src = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'src')
+    code = (f"import sys; sys.path.insert(0, {src!r}); "
+            "import backtester, metrics, data_loader, plots, panel, analysis, streaming, intraday, data_quality; "
+            "print(','.join(m for m in ('scipy', 'yfinance', 'matplotlib', 'seaborn') if m in sys.modules))")
+    out = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True)
+    assert out.stdout.strip() == '', f"heavy modules imported eagerly: {out.stdout.strip()}"
+    
+    # The library modules also import as the src package
+    code = ("import src.analysis, src.bootstrap, src.panel, src.streaming, src.intraday, "
+            "src.online_metrics, src.data_quality")
+    subprocess.run([sys.executable, '-c', code], cwd=os.path.dirname(src), capture_output=True, check=True)
+    
+    print("✓ test_engine_imports_stay_light passed")
+
+
+def test_tick_ingest_matches_resample():
+    """Test that chunked tick/minute ingest matches a single in-memory resample."""
+    import tempfile
+    
+    rng = np.random.default_rng(3)
+    n = 20000
+    seconds = np.sort(rng.integers(0, 90 * 86400, n))
+    ticks = pd.DataFrame({'Timestamp': pd.Timestamp('2021-01-01 09:15') + pd.to_timedelta(seconds, unit='s'),
+                          'Price': 100 + np.cumsum(rng.normal(0, 0.1, n)),
+                          'Volume': rng.integers(1, 50, n).astype(float)})
+    ticks.loc[rng.integers(0, n, 10), 'Price'] = np.nan
+    
+    def resample(frame, freq):
+        frame = frame.dropna(subset=['Price']).set_index('Timestamp')
+        bars = frame['Price'].resample(freq).agg(['first', 'max', 'min', 'last'])
+        bars['Volume'] = frame['Volume'].resample(freq).sum()
+        bars.columns = ['Open', 'High', 'Low', 'Close', 'Volume']
+        return bars.dropna()
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_path = os.path.join(tmp, 'ticks.csv')
+        ticks.to_csv(csv_path, index=False)
+        ticks = pd.read_csv(csv_path, parse_dates=['Timestamp'])
+        
+        # Small chunks put bar boundaries inside and across chunks
+        for freq in ['1D', '15min']:
+            store = ingest_ticks(csv_path, os.path.join(tmp, f'bars_{freq}.ohlcv'), freq=freq, chunksize=777)
+            bars, expected = store.frame(), resample(ticks, freq)
+            np.testing.assert_array_equal(bars.index.values, expected.index.values.astype(bars.index.dtype))
+            np.testing.assert_array_equal(bars.values, expected.values)
+        
+        # Daily bars go straight into the Backtester
+        daily = ingest_ticks(csv_path, os.path.join(tmp, 'daily.ohlcv'), chunksize=5000)
+        result = Backtester(daily.frame()).run_momentum(sma_window=5)
+        assert len(result) == len(daily)
+        
+        # Minute bars roll up to the same daily bars
+        minutes = resample(ticks, '1min')
+        minutes.rename_axis('Timestamp').to_csv(os.path.join(tmp, 'minutes.csv'))
+        rolled = ingest_ticks(os.path.join(tmp, 'minutes.csv'), os.path.join(tmp, 'rolled.ohlcv'), chunksize=500)
+        np.testing.assert_allclose(rolled.frame().values, daily.frame().values, rtol=1e-12)
+        
+        try:
+            ticks.iloc[::-1].to_csv(csv_path, index=False)
+            ingest_ticks(csv_path, os.path.join(tmp, 'bad.ohlcv'), chunksize=777)
+            assert False, "unordered ticks should be rejected"
+        except ValueError:
+            pass
+    
+    print("✓ test_tick_ingest_matches_resample passed")
+
+
+def test_dataset_fingerprint():
+    """Test that the fingerprint tracks content, not dtype or object identity, and reaches results."""
+    import tempfile
+    
+    data = _random_walk_ohlc(n=200).rename_axis('Date')
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_path = os.path.join(tmp, 'prices.csv')
+        data.assign(Volume=data['Volume'].astype(np.int64)).to_csv(csv_path)
+        from_csv = pd.read_csv(csv_path, index_col=0, parse_dates=True)
+        from_store = load_store_cached(csv_path).frame()
+        float_volume = from_csv.astype({'Volume': np.float64})
+        assert dataset_fingerprint(from_csv) == dataset_fingerprint(from_store) == dataset_fingerprint(float_volume)
+    
+    fingerprint = dataset_fingerprint(data)
+    edited = data.copy()
+    edited.iloc[100, edited.columns.get_loc('Close')] += 0.01
+    assert dataset_fingerprint(edited) != fingerprint
+    assert dataset_fingerprint(data.iloc[1:]) != fingerprint
+    
+    bt = Backtester(data)
+    assert bt.fingerprint == fingerprint
+    assert bt.run_momentum(sma_window=20).attrs['Data_Fingerprint'] == fingerprint
+    assert bt.run_rsi(columns=Backtester.METRIC_COLUMNS).attrs['Data_Fingerprint'] == fingerprint
+    
+    print("✓ test_dataset_fingerprint passed")
+
+
+def test_timeframe_cache():
+    """Test weekly/monthly/quarterly bars: pandas-equivalent, cached per fingerprint, used by Backtester."""
+    import tempfile
+    
+    data = _random_walk_ohlc(n=600)
+    aliases = {'W': 'W', 'M': 'ME', 'Q': 'QE'}
+    agg = {'Open': 'first', 'High': 'max', 'Low': 'min', 'Close': 'last', 'Volume': 'sum'}
+    for timeframe, alias in aliases.items():
+        bars = resample_ohlcv(data, timeframe)
+        expected = data.resample(alias).agg(agg).dropna()
+        np.testing.assert_array_equal(bars.values, expected.values)
+        # Labelled with the last trading day of each period
+        assert bars.index[-1] == data.index[-1] and bars.index.isin(data.index).all()
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        monthly = load_timeframe(data, 'M', cache_dir=tmp)
+        path = os.path.join(tmp, f"{dataset_fingerprint(data)}.M.ohlcv")
+        assert os.path.exists(path)
+        mtime = os.path.getmtime(path)
+        pd.testing.assert_frame_equal(load_timeframe(data.copy(), 'M', cache_dir=tmp), monthly)
+        assert os.path.getmtime(path) == mtime                  # served from the cache
+        
+        changed = data.copy()
+        changed.iloc[-1, changed.columns.get_loc('Close')] *= 1.1
+        assert load_timeframe(changed, 'M', cache_dir=tmp)['Close'].iloc[-1] == changed['Close'].iloc[-1]
+        
+        # Stores of old fingerprints are pruned beyond TIMEFRAME_CACHE_FILES
+        for i in range(TIMEFRAME_CACHE_FILES + 3):
+            load_timeframe(data * (1 + i / 100), 'Q', cache_dir=tmp)
+        assert len(os.listdir(tmp)) == TIMEFRAME_CACHE_FILES
+        
+        weekly = Backtester(data, timeframe='W', timeframe_cache_dir=tmp)
+        assert os.path.exists(os.path.join(tmp, f"{dataset_fingerprint(data)}.W.ohlcv"))
+    assert weekly.periods_per_year == 52
+    pd.testing.assert_frame_equal(weekly.data, resample_ohlcv(data, 'W'), check_freq=False)
+    result = weekly.run_momentum(sma_window=10)
+    expected = Backtester(resample_ohlcv(data, 'W'), dividend_yield=0.015 * 252 / 52).run_momentum(sma_window=10)
+    np.testing.assert_allclose(result['Strategy_Equity'].values, expected['Strategy_Equity'].values, rtol=1e-12)
+    
+    # No cache directory: resampled in memory, identical bars
+    in_memory = Backtester(data, timeframe='W', timeframe_cache_dir=None)
+    pd.testing.assert_frame_equal(in_memory.data, weekly.data)
+    
+    # Period tables compound per calendar period
+    daily = Backtester(data).run_momentum(sma_window=20)
+    annual = calculate_annual_returns(daily)
+    assert np.isclose(annual['Market_Return'].iloc[0],
+                      ((1 + daily['Market_Return'].loc['2018']).prod() - 1) * 100)
+    assert calculate_monthly_returns(daily).shape == (len(annual), 12)
+    
+    print("✓ test_timeframe_cache passed")
+
+
+def test_float32_policy_tolerance():
+    """
+    Test the float32 dtype policy against the float64 path.
+    
+    Documented tolerances for float32 prices/indicators/returns with float64
+    equity and metrics, on ~1000 daily bars:
+    - positions: identical on at least 99.9% of (bar, config) cells (a
+      float32 tie between price and indicator can move a flip by a bar)
+    - final equity where positions agree: relative error below 1e-4
+    - Sharpe, CAGR, Max_Drawdown of single runs: within 1e-4
+    """
+    data = _random_walk_ohlc(n=1000, seed=11)
+    runs = {}
+    for dtype in (np.float64, np.float32):
+        bt = Backtester(data, stop_loss=-0.05, take_profit=0.10, dtype=dtype, cache_indicators=False)
+        runs[dtype] = (bt.run_momentum_grid(range(5, 120)),
+                       bt.run_mean_reversion_grid(range(5, 60, 5), [1.5, 2.0, 2.5]),
+                       bt.run_rsi(columns=Backtester.METRIC_COLUMNS))
+    
+    for exact, approx in zip(runs[np.float64][:2], runs[np.float32][:2]):
+        assert approx['Position'].dtype == approx['Strategy_Return'].dtype == np.float32
+        assert approx['Strategy_Equity'].dtype == np.float64
+        same = (exact['Position'] == approx['Position'])
+        assert same.mean() >= 0.999
+        agree = same.all(axis=0)
+        rel = np.abs(approx['Strategy_Equity'][-1, agree] / exact['Strategy_Equity'][-1, agree] - 1)
+        assert rel.max() < 1e-4
+    
+    exact = calculate_advanced_metrics(runs[np.float64][2])
+    approx = calculate_advanced_metrics(runs[np.float32][2])
+    for key in ('Sharpe', 'CAGR', 'Max_Drawdown'):
+        assert abs(exact[key] - approx[key]) < 1e-4, key
+    
+    # Engine-wide default, overridable per call
+    previous = set_dtype('float32')
+    try:
+        assert get_dtype() == np.float32
+        assert Backtester(data).dtype == np.float32
+        assert Backtester(data, dtype=np.float64).dtype == np.float64
+        fields = {field: data[[field]].set_axis(['X'], axis=1) for field in ('Open', 'Close')}
+        panel = PanelBacktester(fields).run_momentum(20)
+        assert panel['Strategy_Return'].dtypes.iloc[0] == np.float32
+    finally:
+        set_dtype(previous)
+    assert get_dtype() == np.float64
+    
+    print("✓ test_float32_policy_tolerance passed")
+
+
+def test_fused_metrics_match_reference():
+    """
+    Test the fused metrics kernel against direct pandas formulas.
+    
+    calculate_all_metrics must return the union of the advanced, risk,
+    drawdown-recovery and trade metric dicts, each value matching the
+    textbook pandas computation (to float rounding).
+    """
+    bt = Backtester(_random_walk_ohlc(n=600, seed=3), stop_loss=-0.03, take_profit=0.05)
+    result = bt.run_mean_reversion(sma_window=20, std_dev=1.5)
+    result.loc[result.index[5], 'Strategy_Return'] = np.nan  # exercises the dropna path
+    metrics = calculate_all_metrics(result, bt.trades)
+    
+    for part in (calculate_advanced_metrics(result), calculate_additional_risk_metrics(result),
+                 calculate_drawdown_recovery(result), calculate_trade_metrics(bt.trades)):
+        for key, value in part.items():
+            assert metrics[key] == value, key
+    
+    r = result['Strategy_Return'].dropna()
+    cum_ret = (1 + r).cumprod()
+    drawdown = cum_ret / cum_ret.cummax() - 1
+    x = np.arange(len(result))
+    log_equity = np.log(result['Strategy_Equity'].values)
+    var_95 = np.percentile(r, 5)
+    equity = result['Strategy_Equity']
+    ulcer = np.sqrt(np.mean(((equity / equity.cummax() - 1) * 100) ** 2))
+    reference = {
+        'Volatility': r.std() * np.sqrt(252),
+        'Sharpe': (r.mean() * 252 - 0.06) / (r.std() * np.sqrt(252)),
+        'Sortino': (r.mean() * 252 - 0.06) / (r[r < 0].std() * np.sqrt(252)),
+        'Max_Drawdown': drawdown.min(),
+        'Stability': np.corrcoef(x, log_equity)[0, 1] ** 2,
+        'Skewness': r.skew(),
+        'Kurtosis': r.kurtosis(),
+        'Win_Rate_Daily': (r > 0).sum() / (r != 0).sum(),
+        'Market_Exposure': (result['Position'] > 0).mean(),
+        'VaR_95': var_95,
+        'CVaR_95': r[r <= var_95].mean(),
+        'Ulcer_Index': ulcer,
+        'Hit_Rate': (r > 0).mean(),
+    }
+    for key, value in reference.items():
+        assert abs(metrics[key] - value) < 1e-10 * max(1, abs(value)), key
+    
+    assert metrics['Trough_Date'] == drawdown.idxmin()
+    assert metrics['Peak_Date'] == cum_ret[:metrics['Trough_Date']].idxmax()
+    
+    # Buy & hold from the market columns: always invested
+    benchmark = calculate_all_metrics(result, returns_column='Market_Return',
+                                      equity_column='Market_Equity', position_column=None)
+    assert benchmark['Market_Exposure'] == 1.0
+    market_cum = (1 + result['Market_Return']).cumprod()
+    assert abs(benchmark['Max_Drawdown'] - (market_cum / market_cum.cummax() - 1).min()) < 1e-12
+    
+    print("✓ test_fused_metrics_match_reference passed")
+
+
+def test_rolling_metrics_match_brute_force():
+    """
+    Test the O(n) rolling metrics against per-window recomputation.
+    
+    Rolling_Max_DD must be the max drawdown of each trailing window's own
+    equity path, and several windows must come out of one call.
+    """
+    result = Backtester(_random_walk_ohlc(n=500, seed=5)).run_momentum(sma_window=20)
+    r = result['Strategy_Return']
+    windows = [1, 7, 30, 120]
+    rolling = calculate_rolling_metrics(result, windows)
+    
+    for w in windows:
+        vol = r.rolling(w).std() * np.sqrt(252)
+        compounded = (1 + r).rolling(w).apply(np.prod, raw=True) - 1
+        max_dd = np.full(len(r), np.nan)
+        for t in range(w - 1, len(r)):
+            cum_ret = np.cumprod(1 + r.values[t - w + 1:t + 1])
+            max_dd[t] = (cum_ret / np.maximum.accumulate(cum_ret) - 1).min()
+        
+        assert np.allclose(rolling[f'Rolling_Max_DD_{w}'], max_dd, rtol=0, atol=1e-12, equal_nan=True)
+        assert np.allclose(rolling[f'Rolling_Return_{w}'], compounded, rtol=0, atol=1e-12, equal_nan=True)
+        moving = vol > 1e-6  # flat windows: pandas leaves ~1e-10 noise, the engine returns 0
+        assert np.allclose(rolling[f'Rolling_Volatility_{w}'][moving], vol[moving], rtol=1e-8)
+        sharpe = (r.rolling(w).mean() * 252 - 0.06) / vol
+        assert np.allclose(rolling[f'Rolling_Sharpe_{w}'][moving], sharpe[moving], rtol=1e-8)
+    
+    # A single window keeps the plain column names
+    single = calculate_rolling_metrics(result, 30)
+    assert list(single.columns) == ['Rolling_Sharpe', 'Rolling_Volatility', 'Rolling_Return', 'Rolling_Max_DD']
+    assert single['Rolling_Max_DD'].equals(rolling['Rolling_Max_DD_30'].rename('Rolling_Max_DD'))
+    assert calculate_rolling_sharpe(result, window=30).equals(single['Rolling_Sharpe'])
+    
+    print("✓ test_rolling_metrics_match_brute_force passed")
+
+
+def test_matrix_metrics_match_single_series():
+    """Test that every row of the matrix metrics table equals calculate_all_metrics on that column."""
+    bt = Backtester(_random_walk_ohlc(n=500, seed=9), stop_loss=-0.04)
+    grid = bt.run_mean_reversion_grid([10, 20, 40], [1.0, 2.0])
+    returns = grid['Strategy_Return'].copy()
+    returns[[0, 7, 300], 1] = np.nan  # skipped per column, like dropna()
+    returns[:, 4] = np.nan            # an empty column reports zeros
+    
+    table = calculate_matrix_metrics(returns, grid['Strategy_Equity'], grid['Index'],
+                                     grid['Position'], labels=grid['Params'])
+    assert table.index.names == ['sma_window', 'std_dev']
+    
+    for j in range(returns.shape[1]):
+        single = pd.DataFrame({'Strategy_Return': returns[:, j],
+                               'Strategy_Equity': grid['Strategy_Equity'][:, j],
+                               'Position': grid['Position'][:, j]}, index=grid['Index'])
+        metrics = calculate_all_metrics(single)
+        for key in table.columns:
+            assert abs(table.iloc[j][key] - metrics[key]) < 1e-9 * max(1, abs(metrics[key])), (j, key)
+    assert (table.iloc[4] == 0).all()
+    
+    print("✓ test_matrix_metrics_match_single_series passed")
+
+
+def test_online_metrics_match_batch():
+    """
+    Test that the online accumulator tracks the batch metrics bar by bar
+    and resumes exactly from its saved state.
+    """
+    import tempfile
+    
+    result = Backtester(_random_walk_ohlc(n=600, seed=4), stop_loss=-0.03).run_rsi()
+    reference = calculate_all_metrics(result)
+    
+    acc = MetricsAccumulator()
+    for end in (3, 250, len(result)):
+        acc.replay(result.iloc[acc.equity_count:end])
+        batch = calculate_all_metrics(result.iloc[:end])
+        for key, value in acc.metrics().items():
+            assert abs(value - batch[key]) < 1e-10 * max(1, abs(batch[key])), (end, key)
+    
+    # Save mid-stream, resume in a fresh accumulator and finish the history
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'metrics_state.json')
+        MetricsAccumulator().replay(result.iloc[:400]).save(path)
+        resumed = MetricsAccumulator.load(path).replay(result.iloc[400:])
+    assert resumed.metrics() == acc.metrics()
+    assert abs(resumed.metrics()['Sharpe'] - reference['Sharpe']) < 1e-12
+    
+    print("✓ test_online_metrics_match_batch passed")
+
+
+def test_bootstrap_reproducible_and_consistent():
+    """
+    Test the bootstrap: seeded draws are reproducible for any worker count,
+    the path kernel matches calculate_all_metrics, and stationary paths are
+    made of contiguous blocks.
+    """
+    result = Backtester(_random_walk_ohlc(n=500, seed=8)).run_momentum(sma_window=20)
+    returns = result['Strategy_Return'].values
+    days = (result.index[-1] - result.index[0]).days
+    
+    # Identity path reproduces the point estimates
+    actual = path_metrics(returns[:, None], days)
+    reference = calculate_all_metrics(result)
+    for key, values in actual.items():
+        assert abs(values[0] - reference[key]) < 1e-12 * max(1, abs(reference[key])), key
+    
+    # Stationary block paths: successive bars continue a block except at block starts
+    idx = resample_indices(500, 200, 'stationary', block_size=10, rng=np.random.default_rng(0))
+    assert idx.shape == (500, 200) and idx.min() >= 0 and idx.max() < 500
+    continues = (np.diff(idx, axis=0) % 500) == 1
+    assert 0.85 < continues.mean() < 0.95  # new block with probability 1/10
+    
+    serial = bootstrap_samples(result, n_resamples=300, method='stationary', seed=42, chunk_size=64)
+    again = bootstrap_samples(result, n_resamples=300, method='stationary', seed=42, chunk_size=64)
+    pooled = bootstrap_samples(result, n_resamples=300, method='stationary', seed=42, chunk_size=64, workers=2)
+    assert len(serial) == 300
+    pd.testing.assert_frame_equal(serial, again)
+    pd.testing.assert_frame_equal(serial, pooled)
+    
+    ci = bootstrap_confidence_intervals(result, n_resamples=500, seed=1)
+    assert (ci['Lower'] <= ci['Upper']).all()
+    assert ci.loc['Sharpe', 'Lower'] < ci.loc['Sharpe', 'Estimate'] < ci.loc['Sharpe', 'Upper']
+    assert ci.loc['Sharpe', 'Estimate'] == reference['Sharpe']
+    
+    print("✓ test_bootstrap_reproducible_and_consistent passed")
+
+
 def run_all_tests():
     """Run all unit tests."""
     print("\n" + "="*60)
@@ -209,7 +1320,39 @@ def run_all_tests():
         test_empty_trades,
         test_profit_factor_calculation,
         test_backtester_trivial_strategy,
-        test_win_rate_definitions
+        test_win_rate_definitions,
+        test_stop_loss_take_profit_matches_loop,
+        test_stop_loss_take_profit_many_exits_in_one_segment,
+        test_trade_log_array_matches_frame,
+        test_grid_matches_single_runs,
+        test_rolling_std_long_trending_series,
+        test_latch_matches_state_machine,
+        test_slim_result_mode,
+        test_indicator_cache_reuse_and_eviction,
+        test_results_are_editable,
+        test_panel_matches_single_symbol,
+        test_panel_misaligned_calendars,
+        test_parallel_comparison_matches_serial,
+        test_streaming_matches_batch,
+        test_streaming_state_round_trip,
+        test_intraday_chunks_match_single_pass,
+        test_store_cache_revalidates_and_rebuilds,
+        test_fetch_data_unsorted_csv,
+        test_memmap_store_slices_without_copy,
+        test_incremental_tail_refresh,
+        test_fetch_many_concurrent_with_retries,
+        test_yfinance_provider_threads,
+        test_data_quality_repairs,
+        test_engine_imports_stay_light,
+        test_tick_ingest_matches_resample,
+        test_dataset_fingerprint,
+        test_timeframe_cache,
+        test_float32_policy_tolerance,
+        test_fused_metrics_match_reference,
+        test_rolling_metrics_match_brute_force,
+        test_matrix_metrics_match_single_series,
+        test_online_metrics_match_batch,
+        test_bootstrap_reproducible_and_consistent
     ]
     
     passed = 0